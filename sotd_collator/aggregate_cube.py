@@ -0,0 +1,124 @@
+import datetime
+import hashlib
+import inspect
+import os
+import pickle
+from pickle import UnpicklingError
+
+import pkg_resources
+from dateutil.relativedelta import relativedelta
+
+from sotd_collator import sotd_post_parser, user_sketch, utils
+from sotd_collator.base_alternate_namer import BatchResolverMixin
+from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.utils import get_rollup_shave_data, get_shave_cells, get_shave_table, get_sketch_cells
+
+
+class AggregateCube(object):
+    """
+    Shave cells - shaves per entity type, name and user - for each month, persisted under misc/cube/ so a month's
+    comments are only extracted and aggregated again when its comments, or the code extracting and naming one of
+    its entities, change. Only the entities that changed are redone - or all of them when the parser or the
+    aggregation code in utils and user_sketch changes.
+
+    Month, year and range reports are rollups over the months' cells. The cells keep who shaved with what, so unique
+    users across months come out exact, and this is the default. With sketch_users the cells keep a UserSketch per
+    name instead - about half the rows for a year, with unique users approximate for names with more than a few
+    hundred users (see UserSketch for the error bounds). It buys smaller cubes, not speed: a year rolls up no faster
+    from sketches than from per user cells (see aggregation_benchmark)
+    """
+
+    CACHE_DIR = pkg_resources.resource_filename('sotd_collator', '../misc/')
+    # bump when the cell format changes. the code building them is covered by pipeline_signature
+    VERSION = 2
+
+    def __init__(self, post_locator, entities, cache_dir=None, sketch_users=False):
+        # entities - dicts of name, extractor and renamer, as the runners list them
+        self.post_locator = post_locator
+        self.entities = entities
+        self.sketch_users = sketch_users
+        self.cache_dir = '{0}cube/'.format(cache_dir or self.CACHE_DIR)
+        self.refreshed = []
+        self.pipeline_signature = self._pipeline_signature()
+
+    @staticmethod
+    def _pipeline_signature():
+        # the source of what every entity's cells go through - parsing comments, the shave table and its cells, and
+        # the user sketches
+        sources = [inspect.getsource(x) for x in (sotd_post_parser, utils, user_sketch)]
+        return hashlib.sha1(repr(sources).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _code_signature(cls, obj):
+        # the source of everything that goes into naming an entity - the extractor or namer, its base classes and
+        # whatever it builds on (upstream extractors, the namers a combined namer uses)
+        sources = [
+            inspect.getsource(x) for x in type(obj).__mro__ if x.__module__.startswith('sotd_collator')
+        ]
+        if isinstance(obj, BaseNameExtractor):
+            sources.extend(cls._code_signature(x) for x in obj.upstream.values())
+            try:
+                sources.append(cls._code_signature(obj.alternative_namer))
+            except NotImplementedError:
+                pass
+        else:
+            sources.extend(cls._code_signature(x) for x in vars(obj).values() if isinstance(x, BatchResolverMixin))
+        return hashlib.sha1(repr(sources).encode('utf-8')).hexdigest()
+
+    def entity_signature(self, entity):
+        return (
+            self.VERSION, self.pipeline_signature, self.sketch_users, self._code_signature(entity['extractor']),
+            entity['renamer'] and self._code_signature(entity['renamer']),
+        )
+
+    def _cell_path(self, given_month):
+        return '{0}{1}.cube'.format(self.cache_dir, given_month.strftime('%Y-%m'))
+
+    def get_month_cells(self, given_month):
+        comments = self.post_locator.get_comments_for_given_month_cached(given_month)
+        signature = getattr(comments, 'signature', None)
+        path = self._cell_path(given_month)
+
+        # {entity type: (entity signature, cells)}, kept while the month's comments are as they were
+        stored = {}
+        try:
+            with open(path, 'rb') as f_cube:
+                cube = pickle.load(f_cube)
+            if signature is not None and cube['signature'] == signature:
+                stored = cube['cells']
+        except (FileNotFoundError, UnpicklingError, EOFError):
+            pass
+
+        stale = [x for x in self.entities if stored.get(x['name'], (None,))[0] != self.entity_signature(x)]
+        if stale:
+            table = get_shave_table(comments, stale)
+            for entity in stale:
+                cells = get_shave_cells(table[table['entity_type'] == entity['name']])
+                if self.sketch_users:
+                    cells = get_sketch_cells(cells)
+                stored[entity['name']] = (self.entity_signature(entity), cells)
+            self.refreshed.append((given_month, [x['name'] for x in stale]))
+
+            # comments that arent stored (a future month) could be anything next time
+            if signature is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'wb') as f_cube:
+                    pickle.dump({'signature': signature, 'cells': stored}, f_cube)
+                os.replace(path + '.tmp', path)
+
+        return [stored[x['name']][1] for x in self.entities]
+
+    def get_range(self, first_month, last_month, name_fallback=True):
+        # every entity's shave data over first_month to last_month inclusive, see utils.get_entity_slice
+        cells = []
+        month = first_month.replace(day=1)
+        while month <= last_month:
+            cells.extend(self.get_month_cells(month))
+            month += relativedelta(months=1)
+        return get_rollup_shave_data(cells, name_fallback)
+
+    def get_month(self, given_month, name_fallback=True):
+        return self.get_range(given_month, given_month, name_fallback)
+
+    def get_year(self, given_year, name_fallback=True):
+        return self.get_range(datetime.date(given_year, 1, 1), datetime.date(given_year, 12, 1), name_fallback)
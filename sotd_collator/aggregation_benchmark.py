@@ -0,0 +1,129 @@
+# time the shave data aggregation on a synthetic year - the old row by row apply version vs utils' vectorised one
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from sotd_collator.utils import (
+    _get_usage_stats, get_entity_shave_data, get_rollup_shave_data, get_shave_cells, get_shave_table, get_sketch_cells,
+)
+
+SHAVES = 400000
+NAMES = 40000
+USERS = 6000
+
+
+def legacy_usage_stats(names, user_ids):
+    # the aggregation as it was, kept here as the baseline
+    df = pd.DataFrame({'name': names, 'user_id': user_ids})
+    df = df.groupby('name').agg({"user_id": ['count', 'nunique']}).reset_index()
+    df.columns = ['name', 'shaves', 'unique users']
+    df = df[df.apply(lambda x: x['name'].lower() != 'none', axis=1)]
+    df.loc[:, 'avg shaves per user'] = df.apply(lambda x: '{0:.2f}'.format(x['shaves'] / x['unique users']), axis=1)
+    df.loc[:, 'rank'] = df['shaves'].rank(method='dense', ascending=False)
+    return df
+
+
+def synthetic_year(seed=0):
+    # a long tail of names, a few very popular, and the odd None name the extractors let through
+    rng = random.Random(seed)
+    names = [
+        'None' if rng.random() < 0.01 else 'Entity {0}'.format(
+            int(rng.paretovariate(1.0)) if rng.random() < 0.5 else rng.randrange(NAMES)
+        ) for _ in range(SHAVES)
+    ]
+    user_ids = ['user{0}'.format(rng.randrange(USERS)) for _ in range(SHAVES)]
+    return pd.Series(names), pd.Series(user_ids)
+
+
+def run_benchmark():
+    names, user_ids = synthetic_year()
+    print('{0} shaves, {1} distinct names'.format(len(names), names.nunique()))
+
+    start = time.perf_counter()
+    legacy = legacy_usage_stats(names, user_ids)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = _get_usage_stats(names, user_ids)
+    current_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(legacy, current)
+    print('legacy {0:7.3f}s  vectorised {1:7.3f}s  speedup {2:5.1f}x'.format(
+        legacy_time, current_time, legacy_time / max(current_time, 1e-9),
+    ))
+
+
+def run_rollup_benchmark():
+    # a year rolled up from twelve months of per user cells vs of sketch cells, and how far the sketches are out
+    names, user_ids = synthetic_year()
+    table = pd.DataFrame({
+        'entity_type': 'Razor', 'entity_name': names, 'principal_name': names, 'unlinked': False, 'user_id': user_ids,
+    })
+    months = [table.iloc[x::12] for x in range(12)]
+    cells = [get_shave_cells(x) for x in months]
+    sketch_cells = [get_sketch_cells(x) for x in cells]
+    print('{0} per user cells, {1} sketch cells'.format(sum(map(len, cells)), sum(map(len, sketch_cells))))
+
+    start = time.perf_counter()
+    exact = get_rollup_shave_data(cells)
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sketched = get_rollup_shave_data(sketch_cells)
+    sketch_time = time.perf_counter() - start
+
+    error = (sketched['unique users'] / exact['unique users'] - 1).abs()
+    print('exact {0:7.3f}s  sketched {1:7.3f}s  unique users max error {2:.2%}, exact for {3:.1%} of names'.format(
+        exact_time, sketch_time, error.max(), (error == 0).mean(),
+    ))
+
+
+class NameIsComment(object):
+    # stands in for an extractor, comments here are just the name
+    def get_name(self, comment):
+        return comment
+
+
+def legacy_shave_table(comments, entities):
+    # get_shave_table as it was, plain strings in object columns
+    rows = []
+    for i, (comment, user_id) in enumerate(comments):
+        for entity in entities:
+            entity_name = entity['extractor'].get_name(comment)
+            if entity_name is not None:
+                rows.append((i, user_id, entity['name'], entity_name))
+    table = pd.DataFrame(rows, columns=['comment', 'user_id', 'entity_type', 'entity_name'])
+    table['principal_name'] = pd.Series([None] * len(table), index=table.index, dtype=object)
+    table.loc[:, 'unlinked'] = ~table['principal_name'].astype(bool)
+    return table
+
+
+def run_memory_benchmark():
+    # building and aggregating a year's shave table from plain strings vs dictionary encoded. each row's strings are
+    # fresh objects, as they would be read back from the comment store
+    names, user_ids = synthetic_year()
+    comments = [(''.join(x), ''.join(y)) for x, y in zip(names, user_ids)]
+    entities = [{'name': 'Razor', 'extractor': NameIsComment(), 'renamer': None}]
+
+    for label, build in [('legacy', legacy_shave_table), ('encoded', get_shave_table)]:
+        start = time.perf_counter()
+        get_entity_shave_data(build(comments, entities))
+        elapsed = time.perf_counter() - start
+
+        # timed untraced, tracemalloc slows every allocation
+        tracemalloc.start()
+        table = build(comments, entities)
+        get_entity_shave_data(table)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{0:8} table {1:6.1f}MB  peak {2:6.1f}MB  {3:7.3f}s'.format(
+            label, table.memory_usage(deep=True).sum() / 2 ** 20, peak / 2 ** 20, elapsed,
+        ))
+
+
+if __name__ == '__main__':
+    run_benchmark()
+    run_rollup_benchmark()
+    run_memory_benchmark()
@@ -0,0 +1,55 @@
+from collections import deque
+
+
+class AhoCorasick(object):
+    """
+    Find which of a set of keywords occur in a piece of text with a single pass over the text
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+
+        # build the keyword trie
+        goto = [{}]
+        outputs = [set()]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                if char not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            outputs[state].add(keyword_id)
+
+        # breadth first, work out where to fall back to on a mismatch and fold those fallbacks into the
+        # transitions so scanning never has to walk failure links
+        fail = [0] * len(goto)
+        self._transitions = [dict(x) for x in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0) if state else 0
+                outputs[next_state] |= outputs[fail[next_state]]
+
+            for char, next_state in self._transitions[fail[state]].items():
+                self._transitions[state].setdefault(char, next_state)
+
+        self._outputs = [frozenset(x) for x in outputs]
+
+    def find(self, text):
+        # returns the ids (positions in self.keywords) of every keyword found in text
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        found = set()
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
@@ -1,13 +1,61 @@
-import re
 from collections import OrderedDict
-from functools import lru_cache, cached_property
+from functools import cached_property
 
+import numpy as np
+import pandas as pd
 
-class BaseAlternateNamer(object):
+from sotd_collator.pattern_table import PatternTable
+from sotd_collator.resolution_cache import ResolutionCache
+from sotd_collator.resolution_store import ResolutionStore
+
+
+class BatchResolverMixin(object):
+    """
+    Resolve a whole column of raw names, looking each distinct name up once
+    """
+
+    def get_principal_names(self, names):
+        # takes any iterable of names or a pandas Series, gives back a list or a Series (same index) to match
+        series = names if isinstance(names, pd.Series) else pd.Series(list(names), dtype=object)
+        codes, uniques = pd.factorize(series)
+        # code -1 (a missing name) picks up the trailing None
+        resolved = np.array([self.get_principal_name(x) for x in uniques] + [None], dtype=object)[codes]
+
+        if isinstance(names, pd.Series):
+            return pd.Series(resolved, index=names.index, dtype=object)
+        return list(resolved)
+
+
+class BaseAlternateNamer(BatchResolverMixin):
     """
     Amalgamate names
     """
 
+    # compiled pattern tables keyed on (namer class, table name) so they are built once per class
+    # rather than once per instance or, worse, once per lookup
+    _pattern_tables = {}
+
+    # raw name -> principal name caches, one per namer class and shared by all its instances. a year of
+    # comments throws up tens of thousands of distinct raw names so this wants to be comfortably bigger than that
+    RESOLUTION_CACHE_SIZE = 65536
+    _resolution_caches = {}
+
+    # optional disk backed resolutions, see use_resolution_store. bump RESOLUTION_VERSION when the code side of
+    # resolving a name changes (eg a fixup), it discards everything persisted for the namer
+    RESOLUTION_VERSION = 1
+    _resolution_stores = {}
+
+    # the rule recorded for names coerced by _fixup, which is tried before any pattern table
+    FIXUP_RULE = ('fixup', None, None)
+
+    def __init__(self, match_engine='prefilter'):
+        # prefilter only searches the patterns whose required literals appear in the name, sequential tries
+        # each compiled pattern in turn, combined scans with a handful of grouped alternations.
+        # all give the same principal name
+        if match_engine not in PatternTable.MATCH_ENGINES:
+            raise ValueError('match_engine must be one of {0}'.format(', '.join(PatternTable.MATCH_ENGINES)))
+        self.match_engine = match_engine
+
     @cached_property
     def all_entity_names(self):
         unique = set()
@@ -25,12 +73,100 @@ class BaseAlternateNamer(object):
                 output[alternate_name] = main_name
         return output
 
-    @lru_cache(maxsize=1024)
+    def _get_pattern_table(self, table_name, builder):
+        key = (type(self), table_name)
+        try:
+            return self._pattern_tables[key]
+        except KeyError:
+            self._pattern_tables[key] = builder()
+            return self._pattern_tables[key]
+
+    @property
+    def pattern_table(self):
+        return self._get_pattern_table('mapper', lambda: PatternTable.from_mapper(self._mapper))
+
+    @classmethod
+    def resolution_cache(cls):
+        try:
+            return cls._resolution_caches[cls]
+        except KeyError:
+            cls._resolution_caches[cls] = ResolutionCache(cls.RESOLUTION_CACHE_SIZE)
+            return cls._resolution_caches[cls]
+
+    @classmethod
+    def set_resolution_cache_size(cls, maxsize):
+        cls.resolution_cache().resize(maxsize)
+
+    @classmethod
+    def resolution_cache_stats(cls):
+        return cls.resolution_cache().stats()
+
+    @classmethod
+    def use_resolution_store(cls, cache_dir=None):
+        """
+        Persist resolutions for this namer class between runs. Call save_resolution_stores once done
+        """
+        namer = cls()
+        store = ResolutionStore(
+            cls.__name__, namer.priority_rules(), cls.RESOLUTION_VERSION, namer._normalise, cache_dir
+        )
+        cls._resolution_stores[cls] = store.load()
+        return store
+
+    @classmethod
+    def save_resolution_stores(cls):
+        for store in cls._resolution_stores.values():
+            store.save()
+
     def get_principal_name(self, name):
-        for alt_name_re in sorted(self._mapper.keys(), key=len, reverse=True):
-            if re.search(alt_name_re, name, re.IGNORECASE):
-                return self._mapper[alt_name_re]
+        return self.resolution_cache().get_or_resolve(name, self._lookup)
+
+    def _lookup(self, name):
+        store = self._resolution_stores.get(type(self))
+        if store is not None and name in store:
+            return store[name]
+
+        principal_name, rule = self._resolve_rule(name)
+        if store is not None:
+            store.record(name, principal_name, rule)
+        return principal_name
+
+    def _resolve(self, name):
+        # uncached lookup
+        return self._resolve_rule(name)[0]
+
+    def _rule_tables(self):
+        # (table name, PatternTable) in the order they are tried
+        return [('mapper', self.pattern_table)]
+
+    def priority_rules(self):
+        return [
+            (table_name, alt_name_re.pattern, principal_name)
+            for table_name, table in self._rule_tables()
+            for alt_name_re, principal_name in table.entries
+        ]
+
+    def _normalise(self, name):
+        return name
+
+    def _fixup(self, name):
+        # hook for subclasses that coerce names in code before any pattern gets a look in
         return None
 
+    def _resolve_rule(self, name):
+        # returns the principal name and the rule that produced it
+        name = self._normalise(name)
+        principal_name = self._fixup(name)
+        if principal_name:
+            return principal_name, self.FIXUP_RULE
+
+        for table_name, table in self._rule_tables():
+            i = table.match_index(name, self.match_engine)
+            if i is not None:
+                alt_name_re, principal_name = table.entries[i]
+                return principal_name, (table_name, alt_name_re.pattern, principal_name)
+
+        return None, None
+
     _raw = OrderedDict({})
 
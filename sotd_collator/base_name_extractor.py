@@ -1,7 +1,10 @@
 import functools
+import inspect
 import re
-import unicodedata
+from functools import cached_property
 
+from sotd_collator.extraction_store import ExtractionStore
+from sotd_collator.sotd_post_parser import SotdPost, normalise_comment
 
 
 
@@ -10,20 +13,25 @@ class BaseNameExtractor(object):
     Subclass this to extract specific entities - razors, blades, brushes etc
     """
 
+    # extractors this one derives its name from, eg {'razor': RazorNameExtractor}. their results are memoised
+    # on the parsed post so each only runs once per comment, however many extractors build on it
+    UPSTREAM = {}
+
+    # optional disk backed extractions, see use_extraction_store
+    _extraction_stores = {}
+
     @property
     def alternative_namer(self):
         raise NotImplementedError('subclass must implement alternative_namer')
 
     @property
     def detect_regexps(self):
+        # FieldDetectors, see sotd_post_parser
         raise NotImplementedError('subclass must implement detect_regexps')
 
     @staticmethod
     def _to_ascii(str_val):
-        if str_val is None:
-            return None
-        else:
-            return unicodedata.normalize('NFKD', str_val).encode('ascii', 'ignore').strip().decode('ascii')
+        return normalise_comment(str_val)
 
     @staticmethod
     def post_process_name(callback):
@@ -31,32 +39,104 @@ class BaseNameExtractor(object):
         @functools.wraps(callback)
         def wrapped(inst, *args, **kwargs):
             entity_name = callback(inst, *args, **kwargs)
-            replacements = [
-                ('|', ''),
-                ('&#39;', "'"),
-                ('&quot;', '"'),
-                ('&amp;', '&'),
-            ]
+            # html entities are already decoded, see normalise_comment
             if entity_name:
-                for replacement in replacements:
-                    entity_name = entity_name.replace(*replacement)
                 return re.sub(r'[\t|]', '', entity_name)
             else:
                 return entity_name
         return wrapped
 
-    def get_name(self, comment_text):
-        # generally this gets overwritten by subclasses since they have entity type specific fixups
-        comment_text = self._to_ascii(comment_text)
-        # try to extract entity name using regexps - ie SOTD is in a common format
+    @staticmethod
+    def memoise_on_post(callback):
+        # decorator that keeps what an extractor worked out for a comment on its parsed post, keyed on the
+        # extractor class. wrapped methods are handed the post rather than the raw comment text
+        @functools.wraps(callback)
+        def wrapped(inst, comment_text):
+            post = SotdPost.of(comment_text)
+            key = (type(inst), callback.__name__)
+            try:
+                return post.memo[key]
+            except KeyError:
+                post.memo[key] = callback(inst, post)
+                return post.memo[key]
+        return wrapped
+
+    @staticmethod
+    def stored_extraction(callback):
+        # decorator for get_detected_name, answering from the extractor's extraction store where it has one
+        @functools.wraps(callback)
+        def wrapped(inst, post):
+            store = inst._extraction_stores.get(type(inst))
+            if store is None:
+                return callback(inst, post)
+
+            try:
+                return store[post.digest]
+            except KeyError:
+                name = callback(inst, post)
+                store.record(post.digest, name)
+                return name
+        return wrapped
+
+    @classmethod
+    def use_extraction_store(cls, cache_dir=None):
+        """
+        Persist detected names for this extractor class between runs. Call save_extraction_stores once done
+        """
+        store = ExtractionStore(cls.__name__, cls().detect_regexps, cls.extraction_sources(), cache_dir)
+        cls._extraction_stores[cls] = store.load()
+        return store
+
+    @classmethod
+    def extraction_sources(cls):
+        # the source of the extractor and the extractor classes it derives from - get_detected_name's fixups (eg
+        # dropping blade counts) and whatever they use - along with the parser that normalises comments and splits
+        # them in to fields, so changing any of it discards the persisted extractions
+        sources = [inspect.getsource(x) for x in cls.__mro__ if issubclass(x, BaseNameExtractor)]
+        sources.append(inspect.getsource(inspect.getmodule(SotdPost)))
+        return sources
+
+    @classmethod
+    def save_extraction_stores(cls):
+        for store in cls._extraction_stores.values():
+            store.save()
+
+    @cached_property
+    def upstream(self):
+        return {name: extractor_class() for name, extractor_class in self.UPSTREAM.items()}
+
+    @memoise_on_post
+    def get_resolved_name(self, post):
+        # extracted name, swapped for its principal name where the alternative namer knows one
+        name = self.get_name(post)
+        if not name:
+            return name
+
+        principal_name = self.alternative_namer.get_principal_name(name)
+        return principal_name if principal_name else name
+
+    @memoise_on_post
+    @stored_extraction
+    def get_detected_name(self, post):
+        # try to extract entity name using regexps - ie SOTD is in a common format. this is the part of extraction
+        # the extraction store persists, so it must not depend on the alternate namers
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             if res:
                 return res.group(1).strip()
 
+        return None
+
+    @memoise_on_post
+    def get_name(self, post):
+        # generally this gets overwritten by subclasses since they have entity type specific fixups
+        detected_name = self.get_detected_name(post)
+        if detected_name is not None:
+            return detected_name
+
         # if we cant find the the entity by looking for it in common SOTD formats,
         # try and find any common entity name within the comment
-        principal_name = self.alternative_namer.get_principal_name(comment_text)
+        principal_name = self.alternative_namer.get_principal_name(post.text)
         if principal_name:
             return principal_name
 
@@ -1,9 +1,7 @@
 import re
 from functools import cached_property
-from sotd_collator.blade_alternate_namer import BladeAlternateNamer
 from sotd_collator.base_name_extractor import BaseNameExtractor
 from sotd_collator.blade_name_extractor import BladeNameExtractor
-from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 from sotd_collator.razor_name_extractor import RazorNameExtractor
 
 class BladeFormatExtractor(BaseNameExtractor):
@@ -74,10 +72,10 @@ class BladeFormatExtractor(BaseNameExtractor):
 
     }
 
-    razor_name_extractor = RazorNameExtractor()
-    razor_alternate_namer = RazorAlternateNamer()
-    blade_name_extractor = BladeNameExtractor()
-    blade_alternate_namer = BladeAlternateNamer()
+    UPSTREAM = {
+        'blade': BladeNameExtractor,
+        'razor': RazorNameExtractor,
+    }
 
 
     def _get_format_from_blade_name(self, blade_name):
@@ -86,24 +84,18 @@ class BladeFormatExtractor(BaseNameExtractor):
                 return b_format
 
 
+    @BaseNameExtractor.memoise_on_post
     @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
-        blade_name = self.blade_name_extractor.get_name(comment_text)
+    def get_name(self, post):
+        blade_name = self.upstream['blade'].get_resolved_name(post)
         if blade_name:
-            renamed_blade = self.blade_alternate_namer.get_principal_name(blade_name)
-            blade_name = renamed_blade if renamed_blade else blade_name
-
             bf = self._get_format_from_blade_name(blade_name)
             if bf:
                 return bf
 
         # fall back to using razor name
-        razor_name = self.razor_name_extractor.get_name(comment_text)
+        razor_name = self.upstream['razor'].get_resolved_name(post)
         if razor_name:
-            renamed_razor = self.razor_alternate_namer.get_principal_name(razor_name)
-            razor_name = renamed_razor if renamed_razor else razor_name
-
             try:
                 return self.NON_DE_RAZORS[razor_name]
             except KeyError:
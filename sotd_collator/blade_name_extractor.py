@@ -2,6 +2,7 @@ import re
 from functools import cached_property
 from sotd_collator.blade_alternate_namer import BladeAlternateNamer
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 
 
 class BladeNameExtractor(BaseNameExtractor):
@@ -18,24 +19,34 @@ class BladeNameExtractor(BaseNameExtractor):
         blade_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~"""
 
         return [
-            re.compile(r'^[*\s\-+/]*blade\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*blade\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
+            FieldDetector(re.compile(r'^[*\s\-+/]*blade\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['blade'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*blade\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['blade'], FieldDetector.INLINE),  # sgrddy
             # re.compile(r'^\*\*Safety Razor\*\*\s*-\s*([{0}]+)[+,\n]'.format(blade_name_re),
             #            re.MULTILINE | re.IGNORECASE),  # **Safety Razor** - RazoRock - Gamechanger 0.84P   variant
 
         ]
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             if res:
                 # remove blade count - eg Astra (3)
                 return re.sub(r'[()\d]', '', res.group(1)).strip()
 
-        principal_name = self.alternative_namer.get_principal_name(comment_text)
+        return None
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        detected_name = self.get_detected_name(post)
+        if detected_name is not None:
+            return detected_name
+
+        principal_name = self.alternative_namer.get_principal_name(post.text)
         if principal_name:
             return principal_name
 
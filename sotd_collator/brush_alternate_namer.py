@@ -1,10 +1,11 @@
 import copy
 import re
 from collections import OrderedDict
-from functools import lru_cache, cached_property
+from functools import cached_property
 from pprint import pprint
 
 from sotd_collator.base_alternate_namer import BaseAlternateNamer
+from sotd_collator.pattern_table import PatternTable
 
 
 class BrushAlternateNamer(BaseAlternateNamer):
@@ -180,12 +181,29 @@ class BrushAlternateNamer(BaseAlternateNamer):
                         raw[maker_name] = [regexp + '.*' + pattern]
         return raw
 
-    @lru_cache(maxsize=1024)
-    def get_principal_name(self, name):
+    @property
+    def apply_first_table(self):
+        # ordered on brush name length, then on the declared order of each brush's patterns
+        return self._get_pattern_table('apply_first', lambda: PatternTable([
+            (pattern, brush_name)
+            for brush_name in sorted(self.apply_first.keys(), key=len, reverse=True)
+            for pattern in self.apply_first[brush_name]
+        ]))
+
+    def _rule_tables(self):
+        # initial regexs (Dec batches etc - apply first because they are short matches and otherwise would be
+        # applied last), then fall down to standard makers
+        return [('apply_first', self.apply_first_table), ('mapper', self.pattern_table)]
+
+    def priority_rules(self):
+        return [self.FIXUP_RULE] + super().priority_rules()
+
+    def _normalise(self, name):
+        return name.lower().replace('semouge', 'semogue')
+
+    def _fixup(self, name):
         # Standardise omega / semogues - dont want to list out every model number above,
         # but coerce them into a standard format
-        name = name.lower().replace('semouge', 'semogue')
-
         omse_brand = re.search(r'(omega|semogue)', name, re.IGNORECASE)
         omse_model = re.search(r'(omega|semogue)[^]\n\d]+(c\d{1,3}|\d{3,6})', name, re.IGNORECASE)
         omse_model_num = None
@@ -206,22 +224,6 @@ class BrushAlternateNamer(BaseAlternateNamer):
         if res:
             return 'Zenith {0}'.format(res.group(1).upper())
 
-
-
-        #initial regexs (Dec batches etc - apply first because they are short matches and otherwise would be applied last)
-        for brush_name in sorted(self.apply_first.keys(), key=len, reverse=True):
-            for pattern in self.apply_first[brush_name]:
-                if re.search(pattern, name, re.IGNORECASE):
-                    return brush_name
-
-        # fall down to standard makers
-        for alt_name_re in sorted(self._mapper.keys(), key=len, reverse=True):
-            try:
-                if re.search(alt_name_re, name, re.IGNORECASE):
-                    return self._mapper[alt_name_re]
-            except:
-                print('Failing input >{0}<'.format(alt_name_re))
-                raise
         return None
 
 
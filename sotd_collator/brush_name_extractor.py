@@ -2,6 +2,7 @@ import re
 from functools import cached_property
 from sotd_collator.brush_alternate_namer import BrushAlternateNamer
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 
 
 class BrushNameExtractor(BaseNameExtractor):
@@ -18,17 +19,18 @@ class BrushNameExtractor(BaseNameExtractor):
         blade_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~+"""
 
         return [
-            re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*brush\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
+            FieldDetector(re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['brush'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*brush\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['brush'], FieldDetector.INLINE),  # sgrddy
 
         ]
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
 
             # catch case where some jerk writes ❧ Brush Notes or similar
             # at some point this can be genericised in to a block words / phrases list to catch razorock too
@@ -38,11 +40,16 @@ class BrushNameExtractor(BaseNameExtractor):
             if res:
                 return res.group(1).strip()
 
-        principal_name = self.alternative_namer.get_principal_name(comment_text)
-        if principal_name == 'Semogue 2022':
-            print(comment_text)
-            print(res.group(1))
+        return None
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        detected_name = self.get_detected_name(post)
+        if detected_name is not None:
+            return detected_name
 
+        principal_name = self.alternative_namer.get_principal_name(post.text)
         if principal_name:
             return principal_name
 
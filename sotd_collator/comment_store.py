@@ -0,0 +1,256 @@
+import datetime
+import json
+import mmap
+import os
+import shutil
+from array import array
+from collections import namedtuple
+
+from sotd_collator.sotd_post_parser import SotdComment
+
+
+CommentRecord = namedtuple(
+    'CommentRecord', ['body', 'author', 'thread', 'day', 'comment_id', 'author_name'], defaults=[None],
+)
+
+
+class StoredComments(object):
+    """
+    One month of comments stored column by column on disk. String columns are a utf-8 blob plus the offset each
+    value starts at, day is the date ordinal (0 where the day isnt known). Opening a store only reads its meta.
+    Columns are memory mapped the first time they are read, and a comment is only decoded when it is asked for.
+
+    Mappings are held until close() - or the end of a full pass by iterating, records() or column() - so any
+    number of stores can be chained without running out of file descriptors. Usable as a context manager.
+
+    Iterates as (body, author id) pairs like the old pickled caches, with bodies as SotdComments carrying their
+    stored normalised text. records() gives every column.
+    """
+
+    VERSION = 2
+    # version 1 stores, which have no author_name column, still read - as blank author names
+    READABLE_VERSIONS = [1, 2]
+    STRING_COLUMNS = ['body', 'text', 'author', 'thread', 'comment_id', 'author_name']
+    _COLUMN_FILES = {x: ('{0}.data'.format(x), '{0}.offsets'.format(x)) for x in STRING_COLUMNS}
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f_meta:
+            meta = json.load(f_meta)
+        if meta['version'] not in self.READABLE_VERSIONS:
+            raise ValueError('{0} is a version {1} comment store, expected {2}'.format(path, meta['version'], self.VERSION))
+
+        self._len = meta['rows']
+        self.meta = meta
+        # file name -> (mmap, typed view of it), filled in as columns are first read
+        self._mapped = {}
+
+    def _map(self, file_name, typecode):
+        if file_name not in self._mapped:
+            path = os.path.join(self.path, file_name)
+            if not os.path.exists(path):
+                # column added after this store was written
+                self._mapped[file_name] = (None, None)
+            else:
+                with open(path, 'rb') as f_column:
+                    if not os.fstat(f_column.fileno()).st_size:
+                        # cant map an empty file
+                        self._mapped[file_name] = (None, memoryview(array(typecode)))
+                    else:
+                        mapped = mmap.mmap(f_column.fileno(), 0, access=mmap.ACCESS_READ)
+                        self._mapped[file_name] = (mapped, memoryview(mapped).cast(typecode))
+        return self._mapped[file_name][1]
+
+    def close(self):
+        # unmap every column read so far, each mapping holds a file descriptor. reading again maps them afresh
+        mapped, self._mapped = self._mapped, {}
+        for mm, view in mapped.values():
+            if view is not None:
+                view.release()
+            if mm is not None:
+                mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def signature(self):
+        # changes whenever the store is rewritten with different comments, eg a month in progress refreshed
+        return os.path.basename(self.path), self._len, json.dumps(self.meta, sort_keys=True)
+
+    def will_need(self):
+        # have the kernel start reading the store in ahead of it being iterated, where the platform allows. advised
+        # on the files rather than through mappings, so nothing is left open
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        for file_name in os.listdir(self.path):
+            fd = os.open(os.path.join(self.path, file_name), os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+    @classmethod
+    def exists(cls, path):
+        # meta.json goes in last, so a store without one was never finished
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    @property
+    def partial(self):
+        # a month still in progress, stored with the high water marks to carry on fetching from
+        return 'thread_marks' in self.meta
+
+    @classmethod
+    def write(cls, path, records, meta=None):
+        """
+        Write records - CommentRecords or plain (body, author, thread, day, comment_id[, author_name]) tuples - as a
+        store at path, along with any extra meta, eg the thread_marks of a partial month
+        """
+        records = [CommentRecord(*x) for x in records]
+        bodies = [x.body if isinstance(x.body, SotdComment) else SotdComment(x.body) for x in records]
+        columns = {
+            'body': bodies,
+            'text': [x.text for x in bodies],
+            'author': [x.author or '' for x in records],
+            'thread': [x.thread or '' for x in records],
+            'comment_id': [x.comment_id or '' for x in records],
+            'author_name': [x.author_name or '' for x in records],
+        }
+
+        # build alongside then swap in, so an interrupted write cant leave a half written store behind
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        for name in cls.STRING_COLUMNS:
+            offsets = array('q', [0])
+            with open(os.path.join(tmp_path, '{0}.data'.format(name)), 'wb') as f_data:
+                for value in columns[name]:
+                    encoded = str(value).encode('utf-8')
+                    f_data.write(encoded)
+                    offsets.append(offsets[-1] + len(encoded))
+            with open(os.path.join(tmp_path, '{0}.offsets'.format(name)), 'wb') as f_offsets:
+                offsets.tofile(f_offsets)
+
+        with open(os.path.join(tmp_path, 'day.data'), 'wb') as f_days:
+            array('i', [x.day.toordinal() if x.day else 0 for x in records]).tofile(f_days)
+
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f_meta:
+            json.dump(dict(meta or {}, version=cls.VERSION, rows=len(records)), f_meta)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def __len__(self):
+        return self._len
+
+    def _string(self, name, i):
+        data_file, offsets_file = self._COLUMN_FILES[name]
+        data = self._map(data_file, 'B')
+        if data is None:
+            return ''
+        offsets = self._map(offsets_file, 'q')
+        return bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def _day(self, i):
+        day = self._map('day.data', 'i')[i]
+        return datetime.date.fromordinal(day) if day else None
+
+    def __getitem__(self, i):
+        if not -self._len <= i < self._len:
+            raise IndexError('comment index out of range')
+        i %= self._len
+        return SotdComment(self._string('body', i), self._string('text', i)), self._string('author', i)
+
+    def __iter__(self):
+        try:
+            for i in range(self._len):
+                yield SotdComment(self._string('body', i), self._string('text', i)), self._string('author', i)
+        finally:
+            self.close()
+
+    def column(self, name):
+        # every value of one column, eg column('author') for unique user counts without touching the bodies
+        with self:
+            if name == 'day':
+                return [self._day(i) for i in range(self._len)]
+            return [self._string(name, i) for i in range(self._len)]
+
+    def records(self):
+        try:
+            for i in range(self._len):
+                yield CommentRecord(
+                    SotdComment(self._string('body', i), self._string('text', i)),
+                    self._string('author', i),
+                    self._string('thread', i),
+                    self._day(i),
+                    self._string('comment_id', i),
+                    self._string('author_name', i),
+                )
+        finally:
+            self.close()
+
+
+class CommentChain(object):
+    """
+    Several stores of comments read one after another, eg the threads of a month or the months of a year, without
+    pulling them in to one list. Each stored part is closed once it has been read, so only one is mapped at a time
+    """
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+
+    def __len__(self):
+        return sum(len(x) for x in self.parts)
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+            self._close_part(part)
+
+    @staticmethod
+    def _close_part(part):
+        if isinstance(part, (StoredComments, CommentChain)):
+            part.close()
+
+    def close(self):
+        for part in self.parts:
+            self._close_part(part)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def column(self, name):
+        values = []
+        for part in self.parts:
+            values.extend(part.column(name))
+            self._close_part(part)
+        return values
+
+    @property
+    def signature(self):
+        # None where any part isnt stored, ie cant be told apart from a different set of comments later
+        signatures = [x.signature if isinstance(x, (StoredComments, CommentChain)) else None for x in self.parts]
+        return None if None in signatures else tuple(signatures)
+
+    def will_need(self):
+        for part in self.parts:
+            if isinstance(part, (StoredComments, CommentChain)):
+                part.will_need()
+
+    def records(self):
+        for part in self.parts:
+            if isinstance(part, (StoredComments, CommentChain)):
+                yield from part.records()
+                part.close()
+            else:
+                # comments fetched but not stored, eg the current month
+                for body, author in part:
+                    yield CommentRecord(body, author, None, None, None)
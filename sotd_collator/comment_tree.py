@@ -0,0 +1,81 @@
+import functools
+from collections import deque
+
+from praw.endpoints import API_PATH
+from praw.models import MoreComments
+
+
+class CommentTree(object):
+    """
+    Flattens a thread's comments with every MoreComments expanded, iteratively rather than recursively. Outstanding
+    MoreComments are queued and their comment ids expanded through /api/morechildren up to MORECHILDREN_BATCH at a
+    time, instead of a request per MoreComments. api_calls counts the requests the thread cost, loading it included.
+
+    flatten does the lot in turn - take the result of every request, then make whatever requests gives back, until
+    it gives back nothing. A praw.Reddit isnt safe to share between threads, so a tree's requests all go through the
+    one instance it was given, one at a time; concurrent callers flatten several trees, each with its own instance
+    """
+
+    # most ids reddit expands in one morechildren request
+    MORECHILDREN_BATCH = 100
+
+    def __init__(self, thread, reddit):
+        self.thread = thread
+        self.reddit = reddit
+        self.comments = []
+        self.api_calls = 0
+        # whether flatten got to the end, rather than stopping part way with comments still to expand
+        self.complete = False
+        self._pending = deque()
+
+    def load(self):
+        return list(self.thread.comments)
+
+    def take(self, items):
+        # the result of one request, either load or one of requests
+        self.api_calls += 1
+        for x in items:
+            if isinstance(x, MoreComments):
+                self._pending.append(x)
+            else:
+                self.comments.append(x)
+
+    def requests(self):
+        """
+        Calls that expand every MoreComments queued so far, one api request each
+        """
+        calls = []
+        children = []
+        while self._pending:
+            more = self._pending.popleft()
+            if more.children:
+                children.extend(more.children)
+            else:
+                # continue this thread links cant be batched, they load the comment they hang off
+                calls.append(more.comments)
+
+        for i in range(0, len(children), self.MORECHILDREN_BATCH):
+            calls.append(functools.partial(self._morechildren, children[i:i + self.MORECHILDREN_BATCH]))
+
+        return calls
+
+    def _morechildren(self, children):
+        things = self.reddit.post(API_PATH['morechildren'], data={
+            'children': ','.join(children),
+            'link_id': self.thread.fullname,
+            'sort': self.thread.comment_sort,
+        })
+        # each id comes back with its replies listed alongside it, only top level comments are shaves
+        return [x for x in things if x.parent_id == self.thread.fullname]
+
+    def flatten(self, request_bucket=None):
+        calls = [self.load]
+        while calls:
+            for call in calls:
+                if request_bucket:
+                    request_bucket.acquire()
+                self.take(call())
+            calls = self.requests()
+
+        self.complete = True
+        return self.comments
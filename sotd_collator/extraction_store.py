@@ -0,0 +1,70 @@
+import hashlib
+import os
+import pickle
+from pickle import UnpicklingError
+
+import pkg_resources
+
+
+class ExtractionStore(object):
+    """
+    Disk backed comment -> extracted entity name map for one extractor. Only covers the regexp side of
+    extraction, ie what the extractor pulls out of a comment before any alternate namer gets involved, so
+    editing the namers leaves it intact. Changing the extractor's detect regexps, its code or the comment
+    parser (see BaseNameExtractor.extraction_sources) throws the lot away.
+    """
+
+    CACHE_DIR = pkg_resources.resource_filename('sotd_collator', '../misc/')
+
+    def __init__(self, extractor_name, detectors, sources, cache_dir=None):
+        self.path = '{0}{1}.extractions'.format(cache_dir or self.CACHE_DIR, extractor_name)
+        self.fingerprint = hashlib.sha1(repr((
+            sources,
+            [(x.pattern, x.detect_re.flags, x.labels, x.layout) for x in detectors],
+        )).encode('utf-8')).hexdigest()
+        self.invalidated = 0
+        self._extracted = {}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._extracted)
+
+    def __contains__(self, digest):
+        return digest in self._extracted
+
+    def __getitem__(self, digest):
+        return self._extracted[digest]
+
+    def record(self, digest, name):
+        self._extracted[digest] = name
+        self._dirty = True
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f_store:
+                stored = pickle.load(f_store)
+        except (FileNotFoundError, UnpicklingError, EOFError):
+            return self
+
+        if stored['fingerprint'] == self.fingerprint:
+            self._extracted = stored['extracted']
+        else:
+            # detect regexps or extraction code changed, any stored extraction could be wrong
+            self.invalidated = len(stored['extracted'])
+            self._dirty = True
+
+        return self
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        # write then rename so an interrupted run cant leave a truncated store behind
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f_store:
+            pickle.dump({
+                'fingerprint': self.fingerprint,
+                'extracted': self._extracted,
+            }, f_store)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
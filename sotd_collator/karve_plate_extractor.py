@@ -1,6 +1,7 @@
 import re
 from functools import cached_property
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 
 
@@ -21,22 +22,24 @@ class KarvePlateExtractor(BaseNameExtractor):
         razor_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~"""
 
         return [
-            re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(razor_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*Razor\*:.*\*\*([{0}]+)\*\*'.format(razor_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
-            re.compile(r'^\*\*Safety Razor\*\*\s*-\s*([{0}]+)[+,\n]'.format(razor_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # **Safety Razor** - RazoRock - Gamechanger 0.84P   variant
+            FieldDetector(re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(razor_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['razor'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*Razor\*:.*\*\*([{0}]+)\*\*'.format(razor_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['razor'], FieldDetector.INLINE),  # sgrddy
+            FieldDetector(re.compile(r'^\*\*Safety Razor\*\*\s*-\s*([{0}]+)[+,\n]'.format(razor_name_re),
+                                     re.MULTILINE | re.IGNORECASE),
+                          ['safety'], FieldDetector.LEAD),  # **Safety Razor** - RazoRock - Gamechanger 0.84P   variant
 
         ]
 
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         extracted_name = None
 
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             # catch case where some jerk writes ❧ Razor and Blade Notes or similar
             # at some point this can be genericised in to a block words / phrases list to catch razorock too
             if res and 'and blade note' in res.group(1).lower():
@@ -46,6 +49,12 @@ class KarvePlateExtractor(BaseNameExtractor):
             if res and not (len(res.group(1)) >= 3 and res.group(1)[0:3] == 'ock'):
                 extracted_name = res.group(1)
 
+        return extracted_name
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        extracted_name = self.get_detected_name(post)
         if not extracted_name or not self.alternative_namer.get_principal_name(extracted_name) == 'Karve CB':
             return None
 
@@ -1,6 +1,7 @@
 import re
 from functools import cached_property
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 
 
 class KnotSizeExtractor(BaseNameExtractor):
@@ -13,19 +14,20 @@ class KnotSizeExtractor(BaseNameExtractor):
         brush_size_re = r"""\d{2}\s*mm"""
 
         return [
-            re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+[^:]*({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*brush\*:.*\*\*[^:]({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
+            FieldDetector(re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+[^:]*({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE),
+                          ['brush'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*brush\*:.*\*\*[^:]({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE),
+                          ['brush'], FieldDetector.INLINE),  # sgrddy
             # if we cant find it in a specific brush line, search the entire post
-           re.compile(r'({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE),
+            FieldDetector(re.compile(r'({0})'.format(brush_size_re), re.MULTILINE | re.IGNORECASE)),
 
        ]
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             if res:
                 raw_size = res.group(1)
                 num_mm = int(re.search('\d+', raw_size).group(0))
@@ -35,3 +37,8 @@ class KnotSizeExtractor(BaseNameExtractor):
                 return re.sub('\s+', '', raw_size.strip().lower())
 
         return None
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        return self.get_detected_name(post)
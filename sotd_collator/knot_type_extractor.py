@@ -1,6 +1,7 @@
 import re
 from functools import cached_property
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 
 
@@ -30,20 +31,21 @@ class KnotTypeExtractor(BaseNameExtractor):
         blade_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~"""
 
         return [
-            re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*brush\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
+            FieldDetector(re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(blade_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['brush'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*brush\*:.*\*\*([{0}]+)\*\*'.format(blade_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['brush'], FieldDetector.INLINE),  # sgrddy
 
         ]
 
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         extracted_name = None
 
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             if res:
                 extracted_name = res.group(1)
 
@@ -56,3 +58,7 @@ class KnotTypeExtractor(BaseNameExtractor):
 
         return None
 
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        return self.get_detected_name(post)
@@ -1,6 +1,4 @@
 import praw
-import prawcore
-from praw.models import MoreComments
 
 from sotd_collator.sotd_post_locator import SotdPostLocator
 
@@ -37,31 +35,19 @@ class LatherGamesPostLocator(SotdPostLocator):
         ]
 
     def get_comments_for_theme(self, theme_name):
-
-        def _get_comments(comment_list):
-            # compatible with recursion / more comments objects
-            collected_comments = []
-            for x in comment_list:
-                if isinstance(x, MoreComments):
-                    collected_comments.extend(_get_comments(x.comments()))
-                else:
-                    try:
-                        author = x.author.id if x.author else ''
-                        if self.SOTD_COMMENT_PATTERN in x.body and len(x.body) >= self.MIN_COMMENT_CHARS:
-                            collected_comments.append((x.body, author))
-                    except prawcore.exceptions.NotFound:
-                        print('Missing comment')
-                        pass
-
-            return collected_comments
+        # through the thread cache, so threads already fetched by day or month arent fetched again
+        threads = self.get_threads_for_given_theme(theme_name)
+        for thread in threads:
+            print('Reading from thread: {0}'.format(thread.title))
+        cached = self._cache_threads(threads)
 
         comments = []
-        for thread in self.get_threads_for_given_theme(theme_name):
-            print('Reading from thread: {0}'.format(thread.title))
-            try:
-                comments.extend(_get_comments(thread.comments))
-            except AttributeError:
-                pass
+        for thread in threads:
+            if thread.id not in cached:
+                continue
+            for body, author in cached[thread.id]:
+                if self.SOTD_COMMENT_PATTERN in body and len(body) >= self.MIN_COMMENT_CHARS:
+                    comments.append((body, author))
 
         return comments
 
@@ -0,0 +1,46 @@
+# time filling a month's comment cache offline, against a generated subreddit or a recorded cassette, for different
+# numbers of fetch workers. every run starts from an empty cache, so it is the fetch strategy alone being timed
+import datetime
+import sys
+import tempfile
+import time
+
+from sotd_collator.rate_limiter import TokenBucket
+from sotd_collator.reddit_transport import Cassette, SyntheticReddit, replay_reddit
+from sotd_collator.sotd_post_locator import SotdPostLocator
+
+BENCHMARK_MONTH = datetime.date(2021, 5, 1)
+# roughly what a request to reddit takes
+LATENCY = 0.15
+JITTER = 0.1
+WORKERS = [1, 2, 4, 8]
+
+
+def time_month_fetch(backend, max_workers, given_month):
+    # an unlimited bucket - the point is what the strategy costs, not how reddit's budget paces it
+    pl = SotdPostLocator(
+        replay_reddit(backend, latency=LATENCY, jitter=JITTER, seed=0),
+        max_workers=max_workers,
+        request_bucket=TokenBucket(1e6, 1e6),
+        # each worker its own instance, replaying the same backend
+        reddit_factory=lambda: replay_reddit(backend, latency=LATENCY, jitter=JITTER, seed=0),
+    )
+    pl.CACHE_DIR = tempfile.mkdtemp() + '/'
+
+    start = time.perf_counter()
+    comments = pl.get_comments_for_given_month_cached(given_month)
+    return time.perf_counter() - start, len(comments), sum(backend.served.values())
+
+
+def run_benchmark(make_backend, given_month):
+    for max_workers in WORKERS:
+        elapsed, comments, requests = time_month_fetch(make_backend(), max_workers, given_month)
+        print('workers {0:2}  {1:6} comments  {2:4} requests  {3:7.2f}s'.format(max_workers, comments, requests, elapsed))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # a cassette recorded from the real thing with reddit_transport.recording_reddit
+        run_benchmark(lambda: Cassette(sys.argv[1]).load(), BENCHMARK_MONTH)
+    else:
+        run_benchmark(lambda: SyntheticReddit(BENCHMARK_MONTH, 31, seed=0), BENCHMARK_MONTH)
@@ -0,0 +1,101 @@
+# time alternate name lookups over a month of cached comments - old style lookups (re-sort the raw pattern
+# strings and re.search each one on every call) vs the precompiled, ordered pattern tables under each match engine
+import datetime
+import re
+import time
+
+import praw
+
+from sotd_collator.blade_alternate_namer import BladeAlternateNamer
+from sotd_collator.blade_name_extractor import BladeNameExtractor
+from sotd_collator.brush_alternate_namer import BrushAlternateNamer
+from sotd_collator.brush_name_extractor import BrushNameExtractor
+from sotd_collator.pattern_table import PatternTable
+from sotd_collator.razor_alternate_namer import RazorAlternateNamer
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.sotd_post_locator import SotdPostLocator
+from sotd_collator.sotd_post_parser import SotdPost
+
+BENCHMARK_MONTH = datetime.date(2023, 1, 1)
+
+
+def legacy_principal_name(namer, name):
+    # the lookup as it was before pattern tables, kept here as the baseline
+    for alt_name_re in sorted(namer._mapper.keys(), key=len, reverse=True):
+        if re.search(alt_name_re, name, re.IGNORECASE):
+            return namer._mapper[alt_name_re]
+    return None
+
+
+def legacy_brush_principal_name(namer, name):
+    name = name.lower().replace('semouge', 'semogue')
+    omse_brand = re.search(r'(omega|semogue)', name, re.IGNORECASE)
+    omse_model = re.search(r'(omega|semogue)[^]\n\d]+(c\d{1,3}|\d{3,6})', name, re.IGNORECASE)
+    if omse_brand and omse_model:
+        return '{0} {1}'.format(omse_brand.group(1).title(), omse_model.group(2))
+
+    res = re.search(r'Zenith.*([A-Za-z]\d{1,3})', name, re.IGNORECASE)
+    if res:
+        return 'Zenith {0}'.format(res.group(1).upper())
+
+    for brush_name in sorted(namer.apply_first.keys(), key=len, reverse=True):
+        for pattern in namer.apply_first[brush_name]:
+            if re.search(pattern, name, re.IGNORECASE):
+                return brush_name
+
+    return legacy_principal_name(namer, name)
+
+
+def current_principal_name(namer, name):
+    # skip the namer's resolution cache, we want to time the matching itself
+    return namer._resolve(name)
+
+
+def prime_tables(namer):
+    # build the compiled tables up front, for every engine, so one off build time - compiling the alternations,
+    # building the literal index automaton - isnt counted against the lookups
+    tables = [namer.pattern_table]
+    if hasattr(namer, 'apply_first_table'):
+        tables.append(namer.apply_first_table)
+    for table in tables:
+        table.combined
+        table.literal_index
+
+
+def time_lookups(lookup, namer, names):
+    start = time.perf_counter()
+    results = [lookup(namer, name) for name in names]
+    return time.perf_counter() - start, results
+
+
+def run_benchmark(comments):
+    entities = [
+        ('Razor', RazorNameExtractor(), RazorAlternateNamer, legacy_principal_name),
+        ('Blade', BladeNameExtractor(), BladeAlternateNamer, legacy_principal_name),
+        ('Brush', BrushNameExtractor(), BrushAlternateNamer, legacy_brush_principal_name),
+    ]
+
+    print('{0} comments'.format(len(comments)))
+    for entity_name, extractor, namer_class, legacy_lookup in entities:
+        names = [x for x in (extractor.get_name(comment) for comment, user_id in comments) if x]
+        # the whole comment fallback used by the extractors when no SOTD line is found
+        bodies = [SotdPost.of(comment).text for comment, user_id in comments]
+
+        for label, inputs in (('names', names), ('whole comments', bodies)):
+            legacy_time, legacy_res = time_lookups(legacy_lookup, namer_class(), inputs)
+            for engine in PatternTable.MATCH_ENGINES:
+                namer = namer_class(match_engine=engine)
+                prime_tables(namer)
+                current_time, current_res = time_lookups(current_principal_name, namer, inputs)
+                if legacy_res != current_res:
+                    raise AssertionError('{0} {1} lookups differ from the legacy implementation'.format(entity_name, engine))
+
+                print('{0:6} {1:15} n={2:5}  legacy {3:7.3f}s  {4:10} {5:7.3f}s  speedup {6:5.1f}x'.format(
+                    entity_name, label, len(inputs), legacy_time, engine, current_time,
+                    legacy_time / max(current_time, 1e-9),
+                ))
+
+
+if __name__ == '__main__':
+    pl = SotdPostLocator(praw.Reddit('standard_creds', user_agent='arach'))
+    run_benchmark(pl.get_comments_for_given_month_cached(BENCHMARK_MONTH))
@@ -0,0 +1,153 @@
+import re
+
+from sotd_collator.aho_corasick import AhoCorasick
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    # python < 3.11
+    import sre_parse
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, 'POSSESSIVE_REPEAT', None))
+
+
+def required_literals(pattern, flags=0):
+    """
+    Literal fragments that any match of pattern must contain - eg gil.*et.*goodwill needs gil, et and goodwill
+    """
+    def _walk(parsed):
+        runs = []
+        current = []
+        for op, av in parsed:
+            if op is sre_parse.LITERAL:
+                current.append(chr(av))
+                continue
+
+            if current:
+                runs.append(''.join(current))
+                current = []
+
+            if op is sre_parse.SUBPATTERN:
+                runs.extend(_walk(av[-1]))
+            elif op in _REPEATS and av[0] >= 1:
+                # the repeated item has to turn up at least once
+                runs.extend(_walk(av[2]))
+            # anything else (branches, character sets, optional repeats) gives us nothing we can rely on
+
+        if current:
+            runs.append(''.join(current))
+        return runs
+
+    return _walk(sre_parse.parse(pattern, flags))
+
+
+class PatternTable(object):
+    """
+    Alternate name patterns compiled once and held in match priority order
+    """
+
+    # how many patterns go into each combined alternation. small groups mean less wasted work re-checking
+    # a group that matched, timings on a month of names were flat between 10 and 25
+    COMBINED_CHUNK_SIZE = 16
+
+    MATCH_ENGINES = ('prefilter', 'sequential', 'combined')
+
+    def __init__(self, entries, flags=re.IGNORECASE):
+        # entries is an ordered list of (pattern, principal_name), highest priority first
+        self.flags = flags
+        self.entries = []
+        for pattern, principal_name in entries:
+            try:
+                self.entries.append((re.compile(pattern, flags), principal_name))
+            except re.error:
+                print('Failing input >{0}<'.format(pattern))
+                raise
+        self._combined = None
+        self._literal_index = None
+
+    @classmethod
+    def from_mapper(cls, mapper):
+        # longest patterns are the most specific, so try them first. sorted is stable so patterns of equal
+        # length keep their declared order
+        return cls(sorted(mapper.items(), key=lambda x: len(x[0]), reverse=True))
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def combined(self):
+        """
+        Fold the table into small groups, each scanned with a single alternation of its patterns. A group whose
+        alternation finds nothing can be skipped in one scan, the first group that does match is then walked
+        pattern by pattern so we still return the highest priority match
+        """
+        if self._combined is None:
+            self._combined = []
+            for chunk_start in range(0, len(self.entries), self.COMBINED_CHUNK_SIZE):
+                chunk = self.entries[chunk_start:chunk_start + self.COMBINED_CHUNK_SIZE]
+                self._combined.append((
+                    re.compile('|'.join('(?:{0})'.format(alt_name_re.pattern) for alt_name_re, _ in chunk), self.flags),
+                    chunk_start,
+                    chunk,
+                ))
+        return self._combined
+
+    @property
+    def literal_index(self):
+        """
+        Key each pattern on the longest literal it requires, and build one automaton over all the keys. A pattern
+        whose key doesnt appear in the (lowercased) name can never match, so only the remaining candidates need
+        to be searched. Patterns without a usable literal are always candidates.
+        """
+        if self._literal_index is None:
+            keywords = {}
+            by_keyword = []
+            always = []
+            for i, (alt_name_re, principal_name) in enumerate(self.entries):
+                # ignore case matching of non ascii literals can reach ascii characters (eg the kelvin sign
+                # matches k) so only trust ascii literals
+                literals = [
+                    x.lower() for x in required_literals(alt_name_re.pattern, alt_name_re.flags) if x.isascii()
+                ]
+                if not literals:
+                    always.append(i)
+                    continue
+                keyword = max(literals, key=len)
+                if keyword not in keywords:
+                    keywords[keyword] = len(by_keyword)
+                    by_keyword.append([])
+                by_keyword[keywords[keyword]].append(i)
+
+            self._literal_index = (AhoCorasick(keywords), by_keyword, always)
+        return self._literal_index
+
+    def first_match(self, name, engine='prefilter'):
+        i = self.match_index(name, engine)
+        return None if i is None else self.entries[i][1]
+
+    def match_index(self, name, engine='prefilter'):
+        # position in self.entries of the highest priority pattern matching name, None if nothing does
+        # lowercasing is only a faithful stand in for ignore case matching on ascii input
+        if engine == 'prefilter' and name.isascii():
+            automaton, by_keyword, candidates = self.literal_index
+            candidates = list(candidates)
+            for keyword_id in automaton.find(name.lower()):
+                candidates.extend(by_keyword[keyword_id])
+            # evaluate in priority order so the first hit is still the best match
+            for i in sorted(candidates):
+                if self.entries[i][0].search(name):
+                    return i
+            return None
+
+        if engine == 'combined':
+            for combined_re, chunk_start, chunk in self.combined:
+                if combined_re.search(name):
+                    for i, (alt_name_re, principal_name) in enumerate(chunk, start=chunk_start):
+                        if alt_name_re.search(name):
+                            return i
+            return None
+
+        for i, (alt_name_re, principal_name) in enumerate(self.entries):
+            if alt_name_re.search(name):
+                return i
+        return None
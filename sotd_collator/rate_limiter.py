@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket - holds up to capacity tokens, refilled at rate tokens a second. Everything that
+    hits reddit takes a token first, so however many threads are fetching we stay inside the request budget
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0 or capacity < 1:
+            raise ValueError('rate must be positive and capacity at least 1')
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        # block until a token is free, then take it
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.waited += wait
+            self._sleep(wait)
+
+    def stats(self):
+        return {'acquired': self.acquired, 'waited': self.waited}
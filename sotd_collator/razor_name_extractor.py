@@ -2,6 +2,7 @@ import re
 from functools import cached_property
 from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 
 
 class RazorNameExtractor(BaseNameExtractor):
@@ -18,20 +19,22 @@ class RazorNameExtractor(BaseNameExtractor):
         razor_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~"""
 
         return [
-            re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(razor_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*Razor\*:.*\*\*([{0}]+)\*\*'.format(razor_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
-            re.compile(r'^\*\*Safety Razor\*\*\s*-\s*([{0}]+)[+,\n]'.format(razor_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # **Safety Razor** - RazoRock - Gamechanger 0.84P   variant
-            re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*\[*([{0}]+)(?:\+|,|\n|$|]\()'.format(razor_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS style with link to eg imgur
+            FieldDetector(re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|,|\n|$)'.format(razor_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['razor'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*Razor\*:.*\*\*([{0}]+)\*\*'.format(razor_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['razor'], FieldDetector.INLINE),  # sgrddy
+            FieldDetector(re.compile(r'^\*\*Safety Razor\*\*\s*-\s*([{0}]+)[+,\n]'.format(razor_name_re),
+                                     re.MULTILINE | re.IGNORECASE),
+                          ['safety'], FieldDetector.LEAD),  # **Safety Razor** - RazoRock - Gamechanger 0.84P   variant
+            FieldDetector(re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*\[*([{0}]+)(?:\+|,|\n|$|]\()'.format(razor_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['razor'], FieldDetector.LEAD),  # TTS style with link to eg imgur
         ]
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             # catch case where some jerk writes ❧ Razor and Blade Notes or similar
             # at some point this can be genericised in to a block words / phrases list to catch razorock too
             if res and 'and blade note' in res.group(1).lower():
@@ -41,7 +44,16 @@ class RazorNameExtractor(BaseNameExtractor):
             if res and not (len(res.group(1)) >= 3 and res.group(1)[0:3] == 'ock'):
                 return res.group(1).strip()
 
-        principal_name = self.alternative_namer.get_principal_name(comment_text)
+        return None
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        detected_name = self.get_detected_name(post)
+        if detected_name is not None:
+            return detected_name
+
+        principal_name = self.alternative_namer.get_principal_name(post.text)
         if principal_name:
             return principal_name
 
@@ -1,8 +1,9 @@
 from collections import OrderedDict
 from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 from sotd_collator.blade_alternate_namer import BladeAlternateNamer
+from sotd_collator.base_alternate_namer import BatchResolverMixin
 
-class RazorPlusBladeAlternateNamer(object):
+class RazorPlusBladeAlternateNamer(BatchResolverMixin):
     """
     Amalgamate names
     """
@@ -3,19 +3,21 @@ from sotd_collator.razor_name_extractor import RazorNameExtractor
 from sotd_collator.base_name_extractor import BaseNameExtractor
 
 
-class RazorPlusBladeNameExtractor(object):
+class RazorPlusBladeNameExtractor(BaseNameExtractor):
     """
     From a given comment, extract the combined razor + blade name
     """
 
-    def __init__(self):
-        self.bne = BladeNameExtractor()
-        self.rne = RazorNameExtractor()
+    UPSTREAM = {
+        'razor': RazorNameExtractor,
+        'blade': BladeNameExtractor,
+    }
 
+    @BaseNameExtractor.memoise_on_post
     @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        razor_name = self.rne.get_name(comment_text)
-        blade_name = self.bne.get_name(comment_text)
+    def get_name(self, post):
+        razor_name = self.upstream['razor'].get_name(post)
+        blade_name = self.upstream['blade'].get_name(post)
 
         if razor_name and blade_name:
             return '{razor}\001{blade}'.format(
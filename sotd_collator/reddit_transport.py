@@ -0,0 +1,354 @@
+import datetime
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter
+from urllib.parse import parse_qsl, urlsplit
+
+import praw
+import prawcore
+import requests
+from requests.structures import CaseInsensitiveDict
+
+"""
+Pluggable transport for the locators, so they can be benchmarked and tested without a network. praw is handed a
+requestor that either records every real response to a cassette on disk, or answers from a backend - a cassette
+recorded earlier or a SyntheticReddit - with configurable latency. The locators dont know the difference.
+
+    reddit = recording_reddit(Cassette('misc/june.cassette'))
+    ... run as normal, then cassette.save()
+
+    reddit = replay_reddit(Cassette('misc/june.cassette').load(), latency=0.2)
+    reddit = replay_reddit(SyntheticReddit(datetime.date(2021, 6, 1), 30), latency=0.2)
+
+tts_scraper's page fetch goes through the same backends via recording_urlopen / backend.urlopen
+"""
+
+
+def _is_token_request(url):
+    # oauth token requests carry credentials, they are never recorded and always answered locally
+    return urlsplit(url).path.rstrip('/').endswith('access_token')
+
+
+def _request_key(method, url, params=None, data=None):
+    # reddit is keyed by path alone, since praw talks to it over whichever of its hosts suits
+    split = urlsplit(url)
+    location = split.path if split.netloc.endswith('reddit.com') else '{0}://{1}{2}'.format(split.scheme, split.netloc, split.path)
+    params = dict(params or {}, **dict(parse_qsl(split.query)))
+    return json.dumps([
+        method.upper(),
+        location.rstrip('/'),
+        sorted((k, str(v)) for k, v in params.items()),
+        sorted((k, str(v)) for k, v in dict(data or {}).items()),
+    ])
+
+
+def _make_response(url, status, headers, body):
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = body
+    return response
+
+
+class ReplayBackend(object):
+    """
+    Something that can answer requests - respond gives (status, headers, body bytes). Counts what it served by path
+    """
+
+    def __init__(self):
+        self.served = Counter()
+        self._lock = threading.Lock()
+
+    def respond(self, method, url, params=None, data=None):
+        with self._lock:
+            self.served[urlsplit(url).path.rstrip('/')] += 1
+            return self._respond(method, url, params, data)
+
+    def _respond(self, method, url, params, data):
+        raise NotImplementedError
+
+    def urlopen(self, url):
+        # stand in for urllib.request.urlopen
+        status, headers, body = self.respond('GET', url)
+        return io.BytesIO(body)
+
+
+class Cassette(ReplayBackend):
+    """
+    Responses recorded from the real thing, keyed by request. A request made more than once replays its responses in
+    the order they were recorded, the last repeating once they run out
+    """
+
+    # rate limit headers would have prawcore pace the replay like the real thing
+    DROPPED_HEADERS = ['x-ratelimit-remaining', 'x-ratelimit-used', 'x-ratelimit-reset', 'content-encoding', 'content-length']
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.responses = {}
+        self._played = Counter()
+
+    def load(self):
+        with open(self.path) as f_cassette:
+            self.responses = json.load(f_cassette)
+        return self
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w') as f_cassette:
+            json.dump(self.responses, f_cassette)
+
+    def record(self, method, url, params, data, status, headers, body):
+        with self._lock:
+            self.responses.setdefault(_request_key(method, url, params, data), []).append({
+                'status': status,
+                'headers': {k: v for k, v in headers.items() if k.lower() not in self.DROPPED_HEADERS},
+                'body': body.decode('utf-8'),
+            })
+
+    def _respond(self, method, url, params, data):
+        key = _request_key(method, url, params, data)
+        if key not in self.responses:
+            raise KeyError('nothing recorded for {0}'.format(key))
+
+        recorded = self.responses[key]
+        played = recorded[min(self._played[key], len(recorded) - 1)]
+        self._played[key] += 1
+        return played['status'], played['headers'], played['body'].encode('utf-8')
+
+
+class RecordingRequestor(prawcore.Requestor):
+    """
+    Requestor passing everything through to reddit, recording each response to cassette as it goes
+    """
+
+    def __init__(self, *args, cassette=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cassette = cassette
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        if not _is_token_request(url):
+            self.cassette.record(
+                method, url, kwargs.get('params'), kwargs.get('data'),
+                response.status_code, response.headers, response.content,
+            )
+        return response
+
+
+class ReplayRequestor(prawcore.Requestor):
+    """
+    Requestor answering from backend instead of reddit, each request taking latency seconds plus up to jitter more
+    """
+
+    TOKEN = {'access_token': 'replay', 'expires_in': 86400, 'scope': '*', 'token_type': 'bearer'}
+
+    def __init__(self, *args, backend=None, latency=0.0, jitter=0.0, seed=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backend = backend
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def request(self, method, url, *args, **kwargs):
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if _is_token_request(url):
+            return _make_response(url, 200, {}, json.dumps(self.TOKEN).encode('utf-8'))
+
+        status, headers, body = self.backend.respond(method, url, kwargs.get('params'), kwargs.get('data'))
+        return _make_response(url, status, headers, body)
+
+
+def recording_reddit(cassette, site_name='standard_creds'):
+    return praw.Reddit(
+        site_name, user_agent='arach', requestor_class=RecordingRequestor, requestor_kwargs={'cassette': cassette},
+    )
+
+
+def replay_reddit(backend, latency=0.0, jitter=0.0, seed=None):
+    return praw.Reddit(
+        client_id='replay',
+        client_secret='replay',
+        user_agent='sotd_collator replay',
+        check_for_updates=False,
+        requestor_class=ReplayRequestor,
+        requestor_kwargs={'backend': backend, 'latency': latency, 'jitter': jitter, 'seed': seed},
+    )
+
+
+def recording_urlopen(cassette):
+    # urllib.request.urlopen, recording what it reads
+    def _urlopen(url):
+        with urllib.request.urlopen(url) as response:
+            body = response.read()
+            cassette.record('GET', url, None, None, response.status, dict(response.headers), body)
+        return io.BytesIO(body)
+
+    return _urlopen
+
+
+class SyntheticReddit(ReplayBackend):
+    """
+    Generated r/wetshaving - a SOTD thread a day from first_day, each with a few hundred top level shaves (plus
+    replies) by a pool of users picking hardware zipf style. Like reddit, a thread loads with its first
+    INITIAL_COMMENTS top level comments and a MoreComments holding the rest, which morechildren expands along with
+    their replies. Search understands the month and year in a query, the locators narrow down days themselves.
+    Deterministic for a given seed
+    """
+
+    INITIAL_COMMENTS = 200
+    MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+    HARDWARE = {
+        'Razor': ['Karve CB', 'Gillette Tech', 'Rockwell 6S', 'Blackland Blackbird', 'Merkur 34C', 'Yaqi Mellow'],
+        'Blade': ['Astra SP', 'Feather', 'Personna Lab Blue', 'Gillette Nacet', 'Voskhod'],
+        'Brush': ['Semogue 620', 'Simpson Chubby 2', 'Omega 10049', 'Yaqi Tuxedo', 'Declaration B2'],
+        'Lather': ['Barrister and Mann Seville', 'Stirling Executive Man', 'Declaration Grooming Sellout', 'Tabac'],
+    }
+
+    def __init__(self, first_day, days, comments_per_thread=(150, 450), users=600, reply_rate=0.3, seed=0):
+        super().__init__()
+        self._random = random.Random(seed)
+        self.users = ['shaver{0}'.format(x) for x in range(users)]
+        self.threads = []
+        self.comments = {}
+        self._comment_ids = 0
+
+        for i in range(days):
+            day = first_day + datetime.timedelta(days=i)
+            title = '{0} - {1}'.format(
+                'Lather Games {0} - Day {1}'.format(day.year, day.day) if day.month == 6 else 'SOTD Thread',
+                day.strftime('%b %d, %Y'),
+            )
+            thread_id = 's{0:x}'.format(day.toordinal())
+            created_utc = datetime.datetime(day.year, day.month, day.day, 0, 5, tzinfo=datetime.timezone.utc).timestamp()
+            top_level = [
+                self._make_comment(thread_id, 't3_' + thread_id, created_utc, reply_rate)
+                for _ in range(self._random.randint(*comments_per_thread))
+            ]
+            self.threads.append({
+                'id': thread_id,
+                'name': 't3_' + thread_id,
+                'title': title,
+                'link_flair_text': 'SOTD',
+                'author': 'AutoModerator',
+                'subreddit': 'wetshaving',
+                'created_utc': created_utc,
+                'num_comments': len(top_level) + sum(len(self.comments[x]['replies']) for x in top_level),
+                'permalink': '/r/wetshaving/comments/{0}/'.format(thread_id),
+                'top_level': top_level,
+            })
+
+        # newest first, like a listing sorted by new
+        self.threads.reverse()
+        self._by_name = {x['name']: x for x in self.threads}
+
+    def _pick(self, options):
+        # zipf-ish, the first few options are by far the most popular
+        return options[min(int(self._random.paretovariate(1.2)) - 1, len(options) - 1)]
+
+    def _make_comment(self, thread_id, parent_id, created_utc, reply_rate):
+        self._comment_ids += 1
+        comment_id = 'c{0:x}'.format(self._comment_ids)
+        author = self._pick(self.users) if self._random.random() < 0.3 else self._random.choice(self.users)
+        if parent_id.startswith('t3_'):
+            body = '\n'.join('* **{0}:** {1}'.format(k, self._pick(v)) for k, v in self.HARDWARE.items())
+        else:
+            body = 'Nice shave!'
+
+        self.comments[comment_id] = {
+            'id': comment_id,
+            'name': 't1_' + comment_id,
+            'body': body,
+            'author': author,
+            'author_fullname': 't2_{0}'.format(author),
+            'created_utc': created_utc + self._comment_ids,
+            'parent_id': parent_id,
+            'link_id': 't3_' + thread_id,
+            'subreddit': 'wetshaving',
+            'replies': [],
+        }
+        if parent_id.startswith('t3_') and self._random.random() < reply_rate:
+            self.comments[comment_id]['replies'] = [
+                self._make_comment(thread_id, 't1_' + comment_id, created_utc, 0)
+                for _ in range(self._random.randint(1, 3))
+            ]
+        return comment_id
+
+    @staticmethod
+    def _listing(children, after=None):
+        return {'kind': 'Listing', 'data': {'children': children, 'after': after, 'before': None}}
+
+    def _thread_thing(self, thread):
+        return {'kind': 't3', 'data': {k: v for k, v in thread.items() if k != 'top_level'}}
+
+    def _comment_thing(self, comment_id, nested=True):
+        # nested - replies inline as a thread load gives them, else left for morechildren to list alongside
+        comment = self.comments[comment_id]
+        data = dict(comment, replies='')
+        if nested and comment['replies']:
+            data['replies'] = self._listing([self._comment_thing(x) for x in comment['replies']])
+        return {'kind': 't1', 'data': data}
+
+    def _search(self, params):
+        query = params.get('q', '').lower()
+        months = [i + 1 for i, x in enumerate(self.MONTHS) if re.search(r'\b{0}'.format(x), query)]
+        years = [int(x) for x in re.findall(r'\b(\d{4})\b', query)]
+
+        matched = []
+        for thread in self.threads:
+            day = datetime.datetime.utcfromtimestamp(thread['created_utc']).date()
+            if (not months or day.month in months) and (not years or day.year in years):
+                matched.append(thread)
+
+        names = [x['name'] for x in matched]
+        start = names.index(params['after']) + 1 if params.get('after') in names else 0
+        page = matched[start:start + int(params.get('limit', 25))]
+        after = page[-1]['name'] if page and start + len(page) < len(matched) else None
+        return self._listing([self._thread_thing(x) for x in page], after)
+
+    def _load_thread(self, thread):
+        top_level = thread['top_level']
+        children = [self._comment_thing(x) for x in top_level[:self.INITIAL_COMMENTS]]
+        rest = top_level[self.INITIAL_COMMENTS:]
+        if rest:
+            children.append({'kind': 'more', 'data': {
+                'id': rest[0], 'name': 't1_' + rest[0], 'parent_id': thread['name'], 'depth': 0,
+                'count': len(rest), 'children': rest,
+            }})
+        return [self._listing([self._thread_thing(thread)]), self._listing(children)]
+
+    def _morechildren(self, data):
+        things = []
+        for comment_id in data['children'].split(','):
+            things.append(self._comment_thing(comment_id, nested=False))
+            things.extend(self._comment_thing(x, nested=False) for x in self.comments[comment_id]['replies'])
+        return {'json': {'errors': [], 'data': {'things': things}}}
+
+    def _respond(self, method, url, params, data):
+        path = urlsplit(url).path.strip('/')
+        params = dict(params or {})
+        data = dict(data or {})
+
+        if path == 'r/wetshaving/search':
+            body = self._search(params)
+        elif path == 'api/info':
+            body = self._listing([self._thread_thing(self._by_name[x]) for x in params['id'].split(',') if x in self._by_name])
+        elif path == 'api/morechildren':
+            body = self._morechildren(data)
+        elif path.startswith('comments/') and 't3_' + path.split('/')[1] in self._by_name:
+            body = self._load_thread(self._by_name['t3_' + path.split('/')[1]])
+        else:
+            return 404, {}, b'{"message": "Not Found", "error": 404}'
+
+        return 200, {'content-type': 'application/json'}, json.dumps(body).encode('utf-8')
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+
+class ResolutionCache(object):
+    """
+    Bounded LRU of raw entity name -> principal name, counting hits, misses and evictions
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._resolved = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._resolved)
+
+    def __contains__(self, name):
+        return name in self._resolved
+
+    def get_or_resolve(self, name, resolver):
+        # None is a perfectly good answer (no principal name) so look up via KeyError rather than .get
+        try:
+            principal_name = self._resolved[name]
+        except KeyError:
+            self.misses += 1
+            principal_name = self._resolved[name] = resolver(name)
+            self._evict()
+            return principal_name
+
+        self.hits += 1
+        self._resolved.move_to_end(name)
+        return principal_name
+
+    def _evict(self):
+        while len(self._resolved) > self.maxsize:
+            self._resolved.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        self._evict()
+
+    def clear(self):
+        self._resolved.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._resolved),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': 1.0 * self.hits / lookups if lookups else 0.0,
+        }
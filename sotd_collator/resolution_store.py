@@ -0,0 +1,115 @@
+import hashlib
+import os
+import pickle
+import re
+from pickle import UnpicklingError
+
+import pkg_resources
+
+
+class ResolutionStore(object):
+    """
+    Disk backed raw entity name -> principal name map for one namer. Each resolution remembers the rule
+    (table, pattern, principal name) that produced it, so when the namer's patterns change we only throw away
+    the names the change could affect rather than the lot.
+    """
+
+    CACHE_DIR = pkg_resources.resource_filename('sotd_collator', '../misc/')
+
+    def __init__(self, namer_name, rules, version, normalise, cache_dir=None):
+        # rules are the namer's (table, pattern, principal name) tuples in match priority order
+        self.path = '{0}{1}.resolutions'.format(cache_dir or self.CACHE_DIR, namer_name)
+        self.rules = [tuple(x) for x in rules]
+        self.version = version
+        self.normalise = normalise
+        self.fingerprint = hashlib.sha1(repr((self.version, self.rules)).encode('utf-8')).hexdigest()
+        self.invalidated = 0
+        self._resolved = {}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._resolved)
+
+    def __contains__(self, name):
+        return name in self._resolved
+
+    def __getitem__(self, name):
+        return self._resolved[name][0]
+
+    def record(self, name, principal_name, rule):
+        self._resolved[name] = (principal_name, rule)
+        self._dirty = True
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f_store:
+                stored = pickle.load(f_store)
+        except (FileNotFoundError, UnpicklingError, EOFError):
+            return self
+
+        if stored['fingerprint'] == self.fingerprint:
+            self._resolved = stored['resolved']
+        elif stored['version'] == self.version:
+            self._resolved = self._still_valid(stored['rules'], stored['resolved'])
+            self._dirty = True
+        else:
+            # resolution code changed, nothing stored can be trusted
+            self.invalidated = len(stored['resolved'])
+            self._dirty = True
+
+        return self
+
+    def _still_valid(self, old_rules, resolved):
+        """
+        A stored resolution stands unless its rule has gone, or a rule that now ranks above it (new, or moved
+        up past it) matches the name
+        """
+        old_rank = {rule: i for i, rule in enumerate(old_rules)}
+        new_rank = {rule: i for i, rule in enumerate(self.rules)}
+        compiled = {}
+
+        def _threats(rule):
+            # rules that could now beat rule. a None rule (no match) can only be beaten by rules it never saw
+            if rule is None:
+                return [x for x in self.rules if x not in old_rank]
+            return [
+                x for x in self.rules[:new_rank[rule]] if x not in old_rank or old_rank[x] > old_rank[rule]
+            ]
+
+        threats_for_rule = {}
+        kept = {}
+        for name, (principal_name, rule) in resolved.items():
+            if rule is not None and rule not in new_rank:
+                self.invalidated += 1
+                continue
+
+            if rule not in threats_for_rule:
+                threats_for_rule[rule] = _threats(rule)
+
+            normalised = self.normalise(name)
+            for threat in threats_for_rule[rule]:
+                if threat[1] not in compiled:
+                    compiled[threat[1]] = re.compile(threat[1], re.IGNORECASE)
+                if compiled[threat[1]].search(normalised):
+                    self.invalidated += 1
+                    break
+            else:
+                kept[name] = (principal_name, rule)
+
+        return kept
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        # write then rename so an interrupted run cant leave a truncated store behind
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f_store:
+            pickle.dump({
+                'fingerprint': self.fingerprint,
+                'version': self.version,
+                'rules': self.rules,
+                'resolved': self._resolved,
+            }, f_store)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -6,6 +6,9 @@ import pandas as pd
 import praw
 from dateutil.relativedelta import relativedelta
 
+from sotd_collator.aggregate_cube import AggregateCube
+from sotd_collator.base_alternate_namer import BaseAlternateNamer
+from sotd_collator.base_name_extractor import BaseNameExtractor
 from sotd_collator.blade_alternate_namer import BladeAlternateNamer
 from sotd_collator.blade_format_extractor import BladeFormatExtractor
 from sotd_collator.blade_name_extractor import BladeNameExtractor
@@ -19,12 +22,22 @@ from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 from sotd_collator.razor_plus_blade_alternate_namer import RazorPlusBladeAlternateNamer
 from sotd_collator.razor_plus_blade_name_extractor import RazorPlusBladeNameExtractor
 from sotd_collator.sotd_post_locator import SotdPostLocator
-from sotd_collator.utils import add_ranking_delta, get_shave_data_for_month, get_shaving_histogram, get_entity_histogram
+from sotd_collator.utils import (
+    add_ranking_delta, get_entity_slice, get_shaving_histogram, get_entity_histogram,
+)
 
 pr = praw.Reddit('standard_creds', user_agent='arach')
 pl = SotdPostLocator(pr)
 inf_engine = inflect.engine()
 
+# remember raw name -> principal name resolutions between runs, only names touched by namer edits get re-resolved
+for namer_class in (RazorAlternateNamer, BladeAlternateNamer, BrushAlternateNamer):
+    namer_class.use_resolution_store()
+
+# remember what the detect regexps pull out of each comment between runs, so tuning the namers skips re-extraction
+for extractor_class in (RazorNameExtractor, BladeNameExtractor, BrushNameExtractor, KnotSizeExtractor, KarvePlateExtractor):
+    extractor_class.use_extraction_store()
+
 MAX_ENTITIES = 50
 MIN_SHAVES = 5
 
@@ -97,10 +110,22 @@ Welcome to your SOTD Hardware Report for {0}
 
 """.format(stats_month.strftime('%b %Y')))
 
+# every entity type, razor plus blade included, aggregated together - one pass over each period's comments
+razor_plus_blade = {
+    'name': 'Razor Plus Blade',
+    'extractor': RazorPlusBladeNameExtractor(),
+    'renamer': RazorPlusBladeAlternateNamer(),
+}
+# months already aggregated are read back from misc/cube/ unless their comments or the entity code changed
+cube = AggregateCube(pl, process_entities + [razor_plus_blade])
+usage_by_entity = cube.get_month(stats_month)
+pm_usage_by_entity = cube.get_month(previous_month)
+py_usage_by_entity = cube.get_month(previous_year)
+
 for entity in process_entities:
-    usage = get_shave_data_for_month(stats_month, pl, entity['extractor'], entity['renamer'])
-    pm_usage = get_shave_data_for_month(previous_month, pl, entity['extractor'], entity['renamer'])
-    py_usage = get_shave_data_for_month(previous_year, pl, entity['extractor'], entity['renamer'])
+    usage = get_entity_slice(usage_by_entity, entity['name'])
+    pm_usage = get_entity_slice(pm_usage_by_entity, entity['name'])
+    py_usage = get_entity_slice(py_usage_by_entity, entity['name'])
 
     usage = add_ranking_delta(usage, pm_usage, previous_month.strftime('%b %Y'))
     usage = add_ranking_delta(usage, py_usage, previous_year.strftime('%b %Y'))
@@ -129,8 +154,8 @@ for entity in process_entities:
 print('## Most Used Blades in Most Used Razors\n')
 
 # do razor plus blade combo, filtered on most popular razors...
-razor_usage = get_shave_data_for_month(stats_month, pl, RazorNameExtractor(), RazorAlternateNamer())
-rpb_usage = get_shave_data_for_month(stats_month, pl, RazorPlusBladeNameExtractor(), RazorPlusBladeAlternateNamer())
+razor_usage = get_entity_slice(usage_by_entity, 'Razor')
+rpb_usage = get_entity_slice(usage_by_entity, 'Razor Plus Blade')
 razor_usage.sort_values(['shaves', 'unique users'], ascending=False, inplace=True)
 
 # get most popular razors in use this month
@@ -158,5 +183,5 @@ print('\n')
 # print(get_shaving_histogram(stats_month, pl).to_markdown(index=False))
 # print('\n')
 
-
-
+BaseAlternateNamer.save_resolution_stores()
+BaseNameExtractor.save_extraction_stores()
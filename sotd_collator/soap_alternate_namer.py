@@ -3,6 +3,7 @@ from functools import cached_property
 from pprint import pprint
 import pickle
 
+from sotd_collator.base_alternate_namer import BatchResolverMixin
 from sotd_collator.tts_scraper import TtsScraper
 import pandas as pd
 from scipy.spatial.distance import cosine
@@ -13,7 +14,7 @@ def cosim(X, Y):
     return 1 - cosine(X[0].toarray(), Y[0].toarray())
 
 
-class SoapAlternateNamer(object):
+class SoapAlternateNamer(BatchResolverMixin):
 
     COSIM_FILE = '/tmp/san_tmp.pickle'
     MIN_COSIM = 0.8
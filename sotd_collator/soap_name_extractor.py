@@ -2,6 +2,7 @@ import re
 import unicodedata
 from functools import cached_property
 from sotd_collator.base_name_extractor import BaseNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector
 
 
 class SoapNameExtractor(BaseNameExtractor):
@@ -133,18 +134,19 @@ class SoapNameExtractor(BaseNameExtractor):
         soap_name_re = r"""\w\t ./\-_()#;&\'\"|<>:$~,!+"""
 
         return [
-            re.compile(r'^[*\s\-+/]*(?:Lather|Soap)\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|\n|$)'.format(soap_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS and similar
-            re.compile(r'\*(?:Lather|Soap)\*:.*\*\*([{0}]+)\*\*'.format(soap_name_re), re.MULTILINE | re.IGNORECASE),  # sgrddy
-            re.compile(r'^[*\s\-+/]*(?:Lather|Soap)\s*[:*\-\\+\s/]+\s*\[*([{0}]+)(?:\+|\n|$|]\()'.format(soap_name_re),
-                       re.MULTILINE | re.IGNORECASE),  # TTS style with link to eg imgur
+            FieldDetector(re.compile(r'^[*\s\-+/]*(?:Lather|Soap)\s*[:*\-\\+\s/]+\s*([{0}]+)(?:\+|\n|$)'.format(soap_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['lather', 'soap'], FieldDetector.LEAD),  # TTS and similar
+            FieldDetector(re.compile(r'\*(?:Lather|Soap)\*:.*\*\*([{0}]+)\*\*'.format(soap_name_re), re.MULTILINE | re.IGNORECASE),
+                          ['lather', 'soap'], FieldDetector.INLINE),  # sgrddy
+            FieldDetector(re.compile(r'^[*\s\-+/]*(?:Lather|Soap)\s*[:*\-\\+\s/]+\s*\[*([{0}]+)(?:\+|\n|$|]\()'.format(soap_name_re),
+                                     re.MULTILINE | re.IGNORECASE), ['lather', 'soap'], FieldDetector.LEAD),  # TTS style with link to eg imgur
         ]
 
-    @BaseNameExtractor.post_process_name
-    def get_name(self, comment_text):
-        comment_text = self._to_ascii(comment_text)
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.stored_extraction
+    def get_detected_name(self, post):
         for detector in self.detect_regexps:
-            res = detector.search(comment_text)
+            res = detector.search(post)
             if res:
                 # remove trailing - soap / cream
                 name = re.sub(r'\s*-*\s*(?:Soap|Cream|Soap \(Vegan\)|Soap \(LE\))\s*$', '', res.group(1), flags=re.IGNORECASE)
@@ -211,3 +213,8 @@ class SoapNameExtractor(BaseNameExtractor):
                     return name.strip()
 
         return None
+
+    @BaseNameExtractor.memoise_on_post
+    @BaseNameExtractor.post_process_name
+    def get_name(self, post):
+        return self.get_detected_name(post)
@@ -1,4 +1,11 @@
+import glob
+import os
 import pickle
+import re
+import shutil
+import threading
+from calendar import monthrange
+from concurrent.futures import ThreadPoolExecutor
 from pickle import UnpicklingError
 from pprint import pprint
 import inflect
@@ -9,7 +16,13 @@ import datetime
 
 import prawcore
 from dateutil.relativedelta import *
-from praw.models import MoreComments
+
+from sotd_collator.comment_store import CommentChain, CommentRecord, StoredComments
+from sotd_collator.comment_tree import CommentTree
+from sotd_collator.rate_limiter import TokenBucket
+from sotd_collator.sotd_post_parser import SotdComment
+from sotd_collator.thread_cache import ThreadCache
+from sotd_collator.thread_index import ThreadIndex
 
 eng = inflect.engine()
 
@@ -22,8 +35,40 @@ class SotdPostLocator(object):
     SOTD_THREAD_PATTERNS = ['sotd thread', 'lather games']
     CACHE_DIR = pkg_resources.resource_filename('sotd_collator', '../misc/')
 
-    def __init__(self, praw):
+    # reddit allows 100 requests a minute per oauth client. every locator in the process shares one bucket
+    # unless given its own
+    REQUESTS_PER_MINUTE = 100
+    REQUEST_BURST = 10
+    _shared_request_bucket = None
+
+    THREAD_INDEX_FILE = 'sotd_threads.json'
+    # the date in a thread title, eg Jun 05, 2021 or June 5th, 2021
+    TITLE_DATE_RE = re.compile(r'\b([a-z]{3})[a-z]* (\d{1,2})(?:st|nd|rd|th)?,? (\d{4})', re.IGNORECASE)
+    # reddit serves listings this many items a request, whatever limit is asked for
+    LISTING_PAGE = 100
+
+    def __init__(self, praw, max_workers=1, request_bucket=None, reddit_factory=None):
+        # max_workers > 1 fetches that many threads at once when filling a month. praw.Reddit isnt safe to share
+        # between threads - its token refresh and rate limit state arent locked - so each worker gets its own
+        # instance from reddit_factory, eg lambda: praw.Reddit('standard_creds', user_agent='arach')
+        if max_workers > 1 and reddit_factory is None:
+            raise ValueError('max_workers > 1 needs a reddit_factory to give each worker its own praw.Reddit')
         self.praw = praw
+        self.max_workers = max_workers
+        self.reddit_factory = reddit_factory
+        self.request_bucket = request_bucket or self.shared_request_bucket()
+        # thread id -> api requests its comments took to fetch
+        self.thread_api_calls = {}
+        # author name -> id, for the odd comment whose listing doesnt carry its author's fullname
+        self._author_ids = {}
+        self._thread_index = None
+        self._discovered = False
+
+    @classmethod
+    def shared_request_bucket(cls):
+        if SotdPostLocator._shared_request_bucket is None:
+            SotdPostLocator._shared_request_bucket = TokenBucket(cls.REQUESTS_PER_MINUTE / 60, cls.REQUEST_BURST)
+        return SotdPostLocator._shared_request_bucket
 
     @property
     def last_month(self):
@@ -63,159 +108,492 @@ class SotdPostLocator(object):
         Return list of threads from previous month
         :return:
         """
-        rec = self.get_x_most_recent_threads(120)
-        return [x for x in rec if datetime.datetime.utcfromtimestamp(x.created_utc).month == self.last_month.month]
+        return self.get_threads_for_given_month(self.last_month)
 
-    def get_threads_for_given_month(self, given_month):
+    @property
+    def thread_index(self):
+        if self._thread_index is None:
+            self._thread_index = ThreadIndex('{0}{1}'.format(self.CACHE_DIR, self.THREAD_INDEX_FILE)).load()
+        return self._thread_index
+
+    def _get_indexed_thread_ids(self, first_day, last_day):
         """
-        Return list of threads from previous month
-        :return:
+        Ids of the threads posted first_day to last_day, both in the same month, from the thread index. New threads
+        are discovered once per locator, the first time a lookup reaches past the newest indexed day. Days the index
+        cant vouch for get their whole month indexed by one month search
         """
-        if not isinstance(given_month, datetime.date):
-            raise AttributeError('Must pass in a datetime.date object')
+        index = self.thread_index
+        if not self._discovered and (not index or last_day.isoformat() >= max(x['day'] for x in index.threads.values())):
+            added = index.discover(self._paced(
+                self.praw.subreddit('wetshaving').search(query='flair_name:SOTD', sort='new', limit=None)
+            ))
+            print('{0} new threads indexed'.format(added))
+            self._discovered = True
 
+        if not index.covers_day(first_day):
+            index.index_month(first_day, self._search_month_threads(first_day))
+
+        index.save()
+        return index.threads_for(first_day, last_day)
+
+    def _paced(self, listing):
+        """
+        Iterate a listing taking a request bucket token before each page is fetched, for listings long enough to
+        run to several requests. A listing ending exactly on a page boundary costs a token it may not have needed
+        """
+        listing = iter(listing)
+        i = 0
+        while True:
+            if i % self.LISTING_PAGE == 0:
+                self.request_bucket.acquire()
+            try:
+                item = next(listing)
+            except StopIteration:
+                return
+            yield item
+            i += 1
+
+    def _search_month_threads(self, given_month):
+        self.request_bucket.acquire()
         rec = self.praw.subreddit('wetshaving').search(
             query=self._get_sotd_month_query_str(given_month),
             sort='hot',
             limit=100,
         )
+        return [x for x in rec if datetime.datetime.utcfromtimestamp(x.created_utc).month == given_month.month]
 
-        return [
-            x for x in rec if datetime.datetime.utcfromtimestamp(x.created_utc).month == given_month.month and [
-                # filter out threads with SOTD flair that arent true SOTD threads
-                y for y in self.SOTD_THREAD_PATTERNS if y in x.title.lower()
-            ]
-        ]
+    def _get_submissions(self, thread_ids):
+        # info fetches up to 100 submissions a request, with num_comments fresh for the incremental refresh
+        submissions = []
+        for i in range(0, len(thread_ids), 100):
+            self.request_bucket.acquire()
+            submissions.extend(self.praw.info(fullnames=['t3_{0}'.format(x) for x in thread_ids[i:i + 100]]))
+        return submissions
 
-    def get_threads_for_given_day(self, given_day, **options):
+    def _is_sotd_title(self, title):
+        # filter out threads with SOTD flair that arent true SOTD threads
+        return [y for y in self.SOTD_THREAD_PATTERNS if y in title.lower()]
+
+    def get_threads_for_given_month(self, given_month):
         """
-        Return list of threads from previous month
+        Return list of threads from given month, looked up in the thread index
         :return:
         """
-        if not isinstance(given_day, datetime.date):
+        if not isinstance(given_month, datetime.date):
             raise AttributeError('Must pass in a datetime.date object')
 
-        print(self._get_sotd_day_query_str(given_day))
-        rec = self.praw.subreddit('wetshaving').search(
-            query=self._get_sotd_day_query_str(given_day),
-            limit=10,
-        )
+        first_day = given_month.replace(day=1)
+        last_day = first_day.replace(day=monthrange(first_day.year, first_day.month)[1])
+        titles = self.thread_index.threads
+        return self._get_submissions([
+            x for x in self._get_indexed_thread_ids(first_day, last_day) if self._is_sotd_title(titles[x]['title'])
+        ])
 
-        # print(list(rec)
+    def get_threads_for_given_day(self, given_day, **options):
+        """
+        Return list of threads from given day, looked up in the thread index
+        :return:
+        """
+        if not isinstance(given_day, datetime.date):
+            raise AttributeError('Must pass in a datetime.date object')
 
         output = list()
-
-        for x in rec:
-            if 'filter_pattern' in options and options['filter_pattern'].lower() not in x.title.lower():
+        titles = self.thread_index.threads
+        for x in self._get_indexed_thread_ids(given_day, given_day):
+            title = titles[x]['title'].lower()
+            if 'filter_pattern' in options and options['filter_pattern'].lower() not in title:
                 continue
-            elif (
-                    datetime.datetime.utcfromtimestamp(x.created_utc).month == given_day.month
-                and
-                    datetime.datetime.utcfromtimestamp(x.created_utc).day == given_day.day
-                and
-                    datetime.datetime.utcfromtimestamp(x.created_utc).year == given_day.year
-                and
-                    [
-                    # filter out threads with SOTD flair that arent true SOTD threads
-                    y for y in self.SOTD_THREAD_PATTERNS if y in x.title.lower()
-                ]
-            ):
+            elif self._is_sotd_title(title):
                 output.append(x)
+
+        output = self._get_submissions(output)
         for x in output:
             print(x.title)
         return output
 
-    def get_comments_for_given_month_cached(self, given_month):
-        # be kind to reddit, persist results to disk so we dont hit it everytime we change the razor cleanup / processing
+    @classmethod
+    def _get_title_day(cls, title, day):
+        # the day a thread is for by its title, falling back on the day it was posted
+        match = cls.TITLE_DATE_RE.search(title)
+        if match:
+            try:
+                return datetime.datetime.strptime(' '.join(match.groups()), '%b %d %Y').date()
+            except ValueError:
+                pass
+        return datetime.date.fromisoformat(day)
+
+    def audit_month(self, given_month):
+        """
+        Check the cached threads of a month - the month's view, else the thread index - have one thread for every day
+        that is over. Threads are put on days by the date in their title. {'missing': [days], 'duplicates': {day: [thread
+        ids]}}
+        """
+        first_day = given_month.replace(day=1)
+        last_day = min(
+            first_day.replace(day=monthrange(first_day.year, first_day.month)[1]),
+            datetime.date.today() - datetime.timedelta(days=1),
+        )
 
-        def _get_comments(comment_list):
-            # compatible with recursion / more comments objects
-            collected_comments = []
-            for x in comment_list:
-                if isinstance(x, MoreComments):
-                    collected_comments.extend(_get_comments(x.comments()))
-                else:
-                    try:
-                        author = x.author.id if x.author else ''
-                        comments.append((x.body, author))
-                    except prawcore.exceptions.NotFound:
-                        print('Missing comment')
-                        pass
+        view = self.thread_cache.get_view('months', first_day.strftime('%Y-%m'))
+        if view:
+            threads = view['threads']
+        else:
+            index = self.thread_index
+            threads = {
+                x: index.threads[x] for x in index.threads_for(first_day, last_day)
+                if self._is_sotd_title(index.threads[x]['title'])
+            }
+
+        by_day = {}
+        for thread_id, thread in threads.items():
+            by_day.setdefault(self._get_title_day(thread['title'], thread['day']), []).append(thread_id)
+
+        days = [first_day + datetime.timedelta(days=x) for x in range((last_day - first_day).days + 1)]
+        return {
+            'missing': [x for x in days if x not in by_day],
+            'duplicates': {k: v for k, v in sorted(by_day.items()) if len(v) > 1},
+        }
+
+    def fill_month_gaps(self, given_month):
+        """
+        Search for the threads of just the days audit_month finds missing, and merge any found in to the thread index,
+        the thread cache and the month's view. Returns the audit as it stands afterwards
+        """
+        found = []
+        for missing_day in self.audit_month(given_month)['missing']:
+            self.request_bucket.acquire()
+            rec = self.praw.subreddit('wetshaving').search(query=self._get_sotd_day_query_str(missing_day), limit=10)
+            found.extend(
+                x for x in rec if self._is_sotd_title(x.title) and self._get_title_day(
+                    x.title, datetime.datetime.utcfromtimestamp(x.created_utc).date().isoformat(),
+                ) == missing_day
+            )
+
+        if found:
+            for x in found:
+                self.thread_index.add(x)
+            self.thread_index.save()
+            self._cache_threads(found)
+
+            month_key = given_month.strftime('%Y-%m')
+            view = self.thread_cache.get_view('months', month_key)
+            if view:
+                self.thread_cache.put_view(
+                    'months', month_key, dict(view['threads'], **self._thread_entries(found)), view['complete'],
+                )
+
+        return self.audit_month(given_month)
+
+    @classmethod
+    def _read_cache(cls, cache_file):
+        # caches written before comment bodies were cached as SotdComments get upgraded in place on first read
+        with open(cache_file, 'rb') as f_cache:
+            comments = pickle.load(f_cache)
+
+        if not all(isinstance(x[0], SotdComment) for x in comments):
+            comments = [(SotdComment(x[0]),) + tuple(x[1:]) for x in comments]
+            cls._write_cache(cache_file, comments)
+
+        return comments
+
+    @staticmethod
+    def _write_cache(cache_file, comments):
+        with open(cache_file, 'wb') as f_cache:
+            pickle.dump(comments, f_cache)
+
+    def upgrade_comment_caches(self):
+        """
+        Upgrade every comment cache to SotdComment bodies now rather than as each is next read
+        """
+        for cache_file in glob.glob('{0}*.cache'.format(self.CACHE_DIR)):
+            self._read_cache(cache_file)
+
+    def _get_month_store_path(self, given_month):
+        return '{0}comments/{1}-{2:02d}'.format(self.CACHE_DIR, given_month.year, given_month.month)
 
-            return collected_comments
+    @property
+    def thread_cache(self):
+        return ThreadCache(self.CACHE_DIR)
+
+    def get_comments_for_given_month_cached(self, given_month, incremental=True):
+        # be kind to reddit, persist results to disk so we dont hit it everytime we change the razor cleanup / processing.
+        # comments are cached per thread, with the month a view over its threads. once the month is over the view is
+        # complete and served without asking reddit anything. until then each thread keeps a high water mark, so the
+        # next run only fetches what is new. incremental=False refetches them from scratch
+        store_path = self._get_month_store_path(given_month)
+        if StoredComments.exists(store_path):
+            stored = StoredComments(store_path)
+            if not stored.partial:
+                # a month stored whole, from before comments were cached per thread
+                return stored
+            self._split_month_store(stored)
+        else:
+            # not yet converted from the old pickled cache
+            cache_file = '{0}{1}{2}.cache'.format(self.CACHE_DIR, given_month.year, given_month.month)
+            try:
+                return self._convert_month_cache(cache_file, store_path)
+            except (FileNotFoundError, UnpicklingError):
+                pass
+
+        month_key = given_month.strftime('%Y-%m')
+        view = self.thread_cache.get_view('months', month_key)
+        if view and view['complete']:
+            return self.thread_cache.comments(view['threads'])
+
+        threads = self.get_threads_for_given_month(given_month)
+        cached = self._cache_threads(threads, incremental)
+
+        this_month = datetime.date.today().replace(day=1)
+        if threads and given_month.replace(day=1) <= this_month:
+            # dont cache future months
+            # a thread that didnt load leaves the month to be tried again
+            complete = given_month.replace(day=1) < this_month and all(x.id in cached for x in threads)
+            self.thread_cache.put_view('months', month_key, self._thread_entries(threads), complete)
+
+        return CommentChain(cached[x.id] for x in threads if x.id in cached)
+
+    def _split_month_store(self, stored):
+        # a month in progress stored whole, before comments were cached per thread. each thread carries on from its mark
+        by_thread = {}
+        for x in stored.records():
+            by_thread.setdefault(x.thread, []).append(x)
+        for thread_id, mark in stored.meta['thread_marks'].items():
+            self.thread_cache.put_thread(thread_id, by_thread.get(thread_id, []), {'num_comments': mark['num_comments']})
+        shutil.rmtree(stored.path)
+
+    @staticmethod
+    def _thread_entries(threads):
+        # what views keep of each thread - enough to pick a day's threads and filter them by title without reddit
+        return {
+            x.id: {
+                'title': x.title,
+                'day': datetime.datetime.utcfromtimestamp(x.created_utc).date().isoformat(),
+            } for x in threads
+        }
+
+    def _cache_threads(self, threads, incremental=True):
+        """
+        Every thread's comments from the thread cache, fetching only threads that arent cached or have had comments
+        since - and of those only the comments not already stored. {thread id: StoredComments}
+        """
+        cached = {}
+        stale = []
+        for thread in threads:
+            stored = self.thread_cache.get_thread(thread.id) if incremental else None
+            if stored is not None and thread.num_comments <= stored.meta['mark']['num_comments']:
+                cached[thread.id] = stored
+            else:
+                stale.append((thread, stored))
+
+        fetched = self._fetch_thread_comments([x for x, _ in stale])
+        for thread, stored in stale:
+            if thread.id in fetched:
+                tree = fetched[thread.id]
+                cached[thread.id] = self._store_thread(thread, tree.comments, stored, complete=tree.complete)
+            elif stored is not None:
+                # didnt load this time, make do with what we had
+                cached[thread.id] = stored
+
+        return cached
+
+    def _store_thread(self, thread, comments, stored=None, complete=True):
+        # add every comment stored doesnt have yet, or all of them if nothing was stored. comments are told apart by
+        # id alone - one approved late or missed last time can be older than anything stored. comments from a fetch
+        # that stopped part way are kept, but the mark stays as it was so the thread is fetched again next time
+        records = list(stored.records()) if stored else []
+        seen_ids = set(x.comment_id for x in records)
+
+        thread_day = datetime.datetime.utcfromtimestamp(thread.created_utc).date()
+        for x in comments:
+            if x.id in seen_ids:
+                continue
+            try:
+                author_id, author_name = self._get_author(x)
+                records.append(CommentRecord(SotdComment(x.body), author_id, thread.id, thread_day, x.id, author_name))
+            except prawcore.exceptions.NotFound:
+                print('Missing comment')
+                pass
+
+        if complete:
+            mark = {'num_comments': thread.num_comments}
+        else:
+            mark = stored.meta['mark'] if stored else {'num_comments': 0}
+        return self.thread_cache.put_thread(thread.id, records, mark)
+
+    def _fetch_thread_comments(self, threads):
+        """
+        The CommentTree of each thread that loaded, MoreComments expanded - {thread id: tree}. With max_workers > 1 threads
+        are spread over that many workers, each waiting its turn on the request bucket for every request. A worker
+        loads its threads again through its own praw.Reddit, so everything fetched while walking a thread - its
+        MoreComments and their expansions - stays with that worker's instance. Either way a thread that doesnt load is
+        left out, and one that stops part way comes back with complete unset
+        """
+        if self.max_workers == 1:
+            trees = [self._flatten_thread(thread, self.praw) for thread in threads]
+        else:
+            worker = threading.local()
+
+            def _fetch(thread):
+                if not hasattr(worker, 'reddit'):
+                    worker.reddit = self.reddit_factory()
+                # lazy, loading its comments is the one request it costs - same as the thread we were given
+                return self._flatten_thread(worker.reddit.submission(id=thread.id), worker.reddit)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                trees = list(pool.map(_fetch, threads))
+
+        # threads that never loaded took no calls
+        loaded = [x for x in trees if x.api_calls]
+        for tree in loaded:
+            self._record_api_calls(tree)
+        return {x.thread.id: x for x in loaded}
+
+    def _flatten_thread(self, thread, reddit):
+        tree = CommentTree(thread, reddit)
+        try:
+            tree.flatten(self.request_bucket)
+        except AttributeError:
+            # didnt load, or stopped part way and isnt complete - whatever came back is kept
+            pass
+        return tree
 
+    def _get_author(self, comment):
+        """
+        (author id, author name) from what the comment listing already carries - the author's fullname and the
+        name praw builds its Redditor from - so the Redditor never gets fetched. ('', '') for deleted authors
+        """
+        if not comment.author:
+            return '', ''
+
+        name = comment.author.name
+        # read from the instance so a missing fullname cant trigger a lazy load of the comment either
+        fullname = comment.__dict__.get('author_fullname')
+        if fullname:
+            return fullname.split('_', 1)[1], name
+
+        # only looked up once per name, however many comments they made
+        if name not in self._author_ids:
+            self.request_bucket.acquire()
+            self._author_ids[name] = self.praw.redditor(name).id
+        return self._author_ids[name], name
+
+    def _record_api_calls(self, tree):
+        self.thread_api_calls[tree.thread.id] = tree.api_calls
+        print('{0}: {1} comments, {2} api calls'.format(tree.thread.id, len(tree.comments), tree.api_calls))
+
+    @staticmethod
+    def _convert_month_cache(cache_file, store_path):
+        # old month caches only kept body and author id, so thread, day and comment id are left blank
+        with open(cache_file, 'rb') as f_cache:
+            comments = pickle.load(f_cache)
+
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        return StoredComments.write(store_path, [(body, author, None, None, None) for body, author in comments])
+
+    def convert_month_caches(self):
+        """
+        One shot conversion of every old pickled month cache (misc/<year><month>.cache) to a comment store.
+        The pickles are left in place
+        """
+        converted = []
+        for cache_file in sorted(glob.glob('{0}*.cache'.format(self.CACHE_DIR))):
+            match = re.fullmatch(r'(\d{4})(\d{1,2})\.cache', os.path.basename(cache_file))
+            if not match:
+                # day caches, which stay pickled
+                continue
 
-        cache_file = '{0}{1}{2}.cache'.format(self.CACHE_DIR, given_month.year, given_month.month)
+            given_month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+            converted.append(self._convert_month_cache(cache_file, self._get_month_store_path(given_month)))
 
-        try:
-            with open(cache_file, 'rb') as f_cache:
-                return pickle.load(f_cache)
-        except (FileNotFoundError, UnpicklingError):
-            comments = []
-            for thread in self.get_threads_for_given_month(given_month):
-                print('Iterate day')
-                try:
-                    comments.extend(_get_comments(thread.comments))
-                except AttributeError:
-                    pass
-                print(len(comments))
-
-            # dont cache current / future months
-            if len(comments) > 2 and datetime.date.today().replace(day=1) > given_month.replace(day=1):
-                with open(cache_file, 'wb') as f_cache:
-                    pickle.dump(comments, f_cache)
-
-            return comments
+        return converted
 
     def get_comments_for_given_day_cached(self, given_day, **options):
-        # be kind to reddit, persist results to disk so we dont hit it everytime we change the razor cleanup / processing
-
-        def _get_comments(comment_list):
-            # compatible with recursion / more comments objects
-            collected_comments = []
-            for x in comment_list:
-                if isinstance(x, MoreComments):
-                    collected_comments.extend(_get_comments(x.comments()))
-                else:
-                    try:
-                        if 'use_author_name' in options:
-                            author = x.author.name if x.author else ''
-                        else:
-                            author = x.author.id if x.author else ''
-                        comments.append((x.body, author))
-                    except prawcore.exceptions.NotFound:
-                        print('Missing comment')
-                        pass
-
-            return collected_comments
-
-        cache_file = '{0}{1}{2}{3}.cache'.format(
-            self.CACHE_DIR, given_day.year, str(given_day.month).zfill(2), str(given_day.day).zfill(2)
-        )
-
-        try:
-            with open(cache_file, 'rb') as f_cache:
-                return pickle.load(f_cache)
-        except (FileNotFoundError, UnpicklingError):
-            comments = []
-            for thread in self.get_threads_for_given_day(given_day, **options):
-                try:
-                    comments.extend(_get_comments(thread.comments))
-                except AttributeError:
-                    pass
-
-            if len(comments) > 2:
-                with open(cache_file, 'wb') as f_cache:
-                    pickle.dump(comments, f_cache)
-
-            return comments
+        # be kind to reddit, persist results to disk so we dont hit it everytime we change the razor cleanup / processing.
+        # served from the thread cache - from the month's view if the month has been fetched, else the day's own
+        author_field = 'author_name' if 'use_author_name' in options else 'author'
+
+        threads = self.thread_cache.get_day_threads(given_day)
+        if threads is None:
+            cache_file = '{0}{1}{2}{3}.cache'.format(
+                self.CACHE_DIR, given_day.year, str(given_day.month).zfill(2), str(given_day.day).zfill(2)
+            )
+            try:
+                comments = self._read_cache(cache_file)
+                # old day caches, either (body, author id, author name) or (body, author) with whichever the run that
+                # wrote them asked for
+                author_index = 2 if 'use_author_name' in options else 1
+                return [(x[0], x[author_index]) if len(x) == 3 else x for x in comments]
+            except (FileNotFoundError, UnpicklingError):
+                threads = self._fetch_day_threads(given_day)
+
+        if 'filter_pattern' in options:
+            threads = [k for k, v in threads.items() if options['filter_pattern'].lower() in v['title'].lower()]
+
+        return [(x.body, getattr(x, author_field)) for x in self.thread_cache.comments(threads).records()]
+
+    def _fetch_day_threads(self, given_day):
+        # every sotd thread of the day, unfiltered - filter patterns are applied to the titles in the view
+        threads = self.get_threads_for_given_day(given_day)
+        cached = self._cache_threads(threads)
+
+        index = self._thread_entries(threads)
+        if threads:
+            complete = given_day < datetime.date.today() and all(x.id in cached for x in threads)
+            self.thread_cache.put_view('days', given_day.isoformat(), index, complete)
+        return index
+
+    def iter_comments(self, start, end, filter=None):
+        """
+        Stream the CommentRecords of every comment posted start to end inclusive, one record at a time, whatever the
+        span. Months wholly in the range come from their month cache, the odd days either end from their threads.
+        filter - optional predicate on records, only those it passes are yielded. Each month's store is read ahead
+        in the background while the month before is being worked through
+        """
+        month = start.replace(day=1)
+        while month <= end:
+            month_end = month.replace(day=monthrange(month.year, month.month)[1])
+            next_month = month + relativedelta(months=1)
+            if start <= month and month_end <= end:
+                comments = self.get_comments_for_given_month_cached(month)
+            else:
+                comments = self._get_cached_days(max(start, month), min(end, month_end))
+
+            if next_month <= end:
+                self._read_ahead(next_month)
+
+            for record in comments.records():
+                if filter is None or filter(record):
+                    yield record
+
+            month = next_month
+
+    def _get_cached_days(self, first_day, last_day):
+        # first_day to last_day of one month, as the threads of each day
+        thread_ids = []
+        for i in range((last_day - first_day).days + 1):
+            given_day = first_day + datetime.timedelta(days=i)
+            threads = self.thread_cache.get_day_threads(given_day)
+            if threads is None:
+                threads = self._fetch_day_threads(given_day)
+            thread_ids.extend(threads)
+        return self.thread_cache.comments(thread_ids)
+
+    def _read_ahead(self, given_month):
+        # only what is already stored - a month still to be fetched waits its turn
+        store_path = self._get_month_store_path(given_month)
+        if StoredComments.exists(store_path):
+            StoredComments(store_path).will_need()
+            return
+
+        view = self.thread_cache.get_view('months', given_month.strftime('%Y-%m'))
+        if view and view['complete']:
+            self.thread_cache.comments(view['threads']).will_need()
 
     def get_comments_for_given_year_cached(self, given_year):
-        collected_comments = []
-        for m in range(1,13):
-            collected_comments.extend(self.get_comments_for_given_month_cached(datetime.date(given_year, m, 1)))
-
-        return collected_comments
+        # months are read as they are iterated rather than pulled in to one big list
+        return CommentChain(
+            self.get_comments_for_given_month_cached(datetime.date(given_year, m, 1)) for m in range(1, 13)
+        )
 
 
 if __name__ == '__main__':
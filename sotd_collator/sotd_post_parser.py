@@ -0,0 +1,186 @@
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from functools import cached_property, lru_cache
+
+
+def to_ascii(str_val):
+    if str_val is None:
+        return None
+    else:
+        return unicodedata.normalize('NFKD', str_val).encode('ascii', 'ignore').strip().decode('ascii')
+
+
+# html entities reddit leaves in comment bodies, decoded in this order
+HTML_ENTITIES = [
+    ('&#39;', "'"),
+    ('&quot;', '"'),
+    ('&amp;', '&'),
+]
+
+
+def normalise_comment(comment_text):
+    # what the extractors search - ascii, stripped and with html entities decoded. entities are decoded before
+    # anything is matched, so the namers' whole comment fallback sees B&M rather than B&amp;M too
+    text = to_ascii(comment_text)
+    if text:
+        for entity in HTML_ENTITIES:
+            text = text.replace(*entity)
+    return text
+
+
+class SotdComment(str):
+    """
+    A comment body as SotdPostLocator caches it. Behaves as the raw body everywhere, but carries its normalised
+    text so that is worked out once, when the comment is cached, rather than on every run
+    """
+
+    def __new__(cls, body, text=None):
+        comment = super().__new__(cls, body)
+        comment.text = normalise_comment(body) if text is None else text
+        return comment
+
+    def __reduce__(self):
+        return SotdComment, (str(self), self.text)
+
+
+class SotdPost(object):
+    """
+    A SOTD comment normalised (see normalise_comment) and split, in one pass, into the lines each field label (razor, blade,
+    brush, lather etc) appears on. Extractors look for their fields on those lines rather than rescanning the
+    whole comment. Nothing is worked out until asked for, so a comment whose extractions are all stored is
+    never parsed.
+    """
+
+    # how many parsed comments to keep. each extractor makes its own pass over a month (or year) of comments,
+    # so this wants to comfortably hold all the comments a runner is working on
+    CACHE_SIZE = 65536
+
+    # TTS and similar - label leads the line, behind any markdown bullets or bold. also covers **Safety Razor** -
+    LEAD_LABEL_RE = re.compile(r'[*\s\-+/]*(\w+)([:*\-\\+\s/]*)(.*)')
+    # sgrddy - *Razor*: **Karve CB**, with any number of fields on the one line
+    INLINE_LABEL_RE = re.compile(r'\*(\w+)\*:')
+
+    def __init__(self, comment_text):
+        self.comment_text = comment_text
+        # results worked out from this post - detector matches, extracted and resolved names - so each is only
+        # worked out once however many extractors need it
+        self.memo = {}
+
+    @cached_property
+    def digest(self):
+        # identifies the comment for the extraction stores, without having to parse it
+        return hashlib.sha1((self.comment_text or '').encode('utf-8')).hexdigest()
+
+    @cached_property
+    def text(self):
+        if isinstance(self.comment_text, SotdComment):
+            return self.comment_text.text
+        return normalise_comment(self.comment_text)
+
+    @cached_property
+    def _lines(self):
+        # label -> start offsets of the lines it leads
+        lead_lines = defaultdict(list)
+        # label -> start offset of the first line it appears on sgrddy style
+        inline_lines = {}
+        # label -> what follows the label on each line it leads
+        fields = defaultdict(list)
+
+        line_start = 0
+        for line in self.text.split('\n'):
+            res = self.LEAD_LABEL_RE.match(line)
+            if res:
+                label = res.group(1).lower()
+                lead_lines[label].append(line_start)
+                if res.group(2):
+                    fields[label].append(res.group(3).strip())
+
+            if '*' in line:
+                for label in self.INLINE_LABEL_RE.findall(line):
+                    inline_lines.setdefault(label.lower(), line_start)
+
+            line_start += len(line) + 1
+
+        return lead_lines, inline_lines, fields
+
+    @property
+    def lead_lines(self):
+        return self._lines[0]
+
+    @property
+    def inline_lines(self):
+        return self._lines[1]
+
+    @property
+    def fields(self):
+        return self._lines[2]
+
+    @classmethod
+    def of(cls, comment):
+        # extractors accept either raw comment text or an already parsed post
+        if isinstance(comment, cls):
+            return comment
+        return _parse(comment)
+
+    def field(self, label):
+        # value of the first line led by label, eg field('razor') -> 'Karve CB (Plate C)'
+        values = self.fields.get(label.lower())
+        return values[0] if values else None
+
+
+@lru_cache(maxsize=SotdPost.CACHE_SIZE)
+def _parse(comment_text):
+    return SotdPost(comment_text)
+
+
+class FieldDetector(object):
+    """
+    A detect regexp plus where in a post it can possibly match, so it only gets run against the lines that
+    carry its labels. Matches are exactly those of detect_re.search over the whole post.
+    """
+
+    LEAD = 'lead'  # ^ anchored, label first on the line
+    INLINE = 'inline'  # *label*: anywhere on the line
+    ANYWHERE = 'anywhere'  # no label to go on, search the whole post
+
+    def __init__(self, detect_re, labels=(), layout=ANYWHERE):
+        if layout != self.ANYWHERE and not labels:
+            raise ValueError('{0} detectors need at least one label'.format(layout))
+        self.detect_re = detect_re
+        self.labels = tuple(x.lower() for x in labels)
+        self.layout = layout
+
+    @property
+    def pattern(self):
+        return self.detect_re.pattern
+
+    def search(self, post):
+        # detectors with the same regexp find the same thing whichever extractor they belong to
+        key = ('detect', self.detect_re.pattern, self.detect_re.flags)
+        try:
+            return post.memo[key]
+        except KeyError:
+            post.memo[key] = self._search(post)
+            return post.memo[key]
+
+    def _search(self, post):
+        if self.layout == self.LEAD:
+            # a match that starts on a bullet only line above the label line has the same groups as one
+            # starting on the label line, so trying each label line in order finds what search would
+            positions = sorted(pos for label in self.labels for pos in post.lead_lines.get(label, ()))
+            for pos in positions:
+                res = self.detect_re.match(post.text, pos)
+                if res:
+                    return res
+            return None
+
+        if self.layout == self.INLINE:
+            # every match starts at a *label*:, so nothing before the first one can match
+            positions = [post.inline_lines[x] for x in self.labels if x in post.inline_lines]
+            if not positions:
+                return None
+            return self.detect_re.search(post.text, min(positions))
+
+        return self.detect_re.search(post.text)
@@ -0,0 +1,120 @@
+import datetime
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import pandas as pd
+
+from sotd_collator.aggregate_cube import AggregateCube
+from sotd_collator.blade_alternate_namer import BladeAlternateNamer
+from sotd_collator.blade_name_extractor import BladeNameExtractor
+from sotd_collator.comment_store import StoredComments
+from sotd_collator.knot_size_extractor import KnotSizeExtractor
+from sotd_collator.razor_alternate_namer import RazorAlternateNamer
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.utils import get_entity_shave_data, get_shave_table
+
+
+class FakeLocator(object):
+
+    def __init__(self, cache_dir, months):
+        self.cache_dir = cache_dir
+        self.requested = []
+        for month, records in months.items():
+            self.put_month(month, records)
+
+    def put_month(self, given_month, records):
+        StoredComments.write(
+            os.path.join(self.cache_dir, given_month.strftime('%Y-%m')), [x + (None, None, None) for x in records],
+        )
+
+    def get_comments_for_given_month_cached(self, given_month):
+        self.requested.append(given_month)
+        return StoredComments(os.path.join(self.cache_dir, given_month.strftime('%Y-%m')))
+
+
+class TestAggregateCube(TestCase):
+
+    jan = datetime.date(2022, 1, 1)
+    feb = datetime.date(2022, 2, 1)
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.locator = FakeLocator(cache_dir, {
+            self.jan: [
+                ('* **Razor:** Karve CB\n* **Blade:** Astra SP\n* **Brush:** Maggard 24mm synthetic', 'u1'),
+                ('* **Razor:** Gillette Tech\n* **Blade:** Feather', 'u2'),
+            ],
+            self.feb: [
+                ('* **Razor:** Karve Christopher Bradley\n* **Blade:** Astra Superior Platinum', 'u1'),
+                ('* **Razor:** Karve CB\n* **Blade:** Feather', 'u3'),
+                ('no hardware here', 'u2'),
+            ],
+        })
+        self.entities = [
+            {'name': 'Razor', 'extractor': RazorNameExtractor(), 'renamer': RazorAlternateNamer()},
+            {'name': 'Blade', 'extractor': BladeNameExtractor(), 'renamer': BladeAlternateNamer()},
+            {'name': 'Knot Size', 'extractor': KnotSizeExtractor(), 'renamer': None},
+        ]
+        self.cube = AggregateCube(self.locator, self.entities, cache_dir=cache_dir + '/')
+
+    def expected(self, *months):
+        comments = [x for month in months for x in self.locator.get_comments_for_given_month_cached(month)]
+        return get_entity_shave_data(get_shave_table(comments, self.entities))
+
+    def assert_same_usage(self, expected, actual):
+        key = ['entity_type', 'name']
+        pd.testing.assert_frame_equal(
+            expected.sort_values(key).reset_index(drop=True), actual.sort_values(key).reset_index(drop=True),
+            check_dtype=False,
+        )
+
+    def test_rollup(self):
+        self.assert_same_usage(self.expected(self.jan), self.cube.get_month(self.jan))
+
+        # users across both months counted once - u1 shaved a Karve CB in each
+        rollup = self.cube.get_range(self.jan, self.feb)
+        self.assert_same_usage(self.expected(self.jan, self.feb), rollup)
+        karve = rollup[(rollup['entity_type'] == 'Razor') & (rollup['name'] == 'Karve CB')]
+        self.assertEqual([3, 2], [karve['shaves'].iloc[0], karve['unique users'].iloc[0]])
+
+    def test_refresh(self):
+        self.cube.get_range(self.jan, self.feb)
+        self.assertEqual(2, len(self.cube.refreshed))
+
+        # a new cube reads both months back without extracting anything
+        cube = AggregateCube(self.locator, self.entities, cache_dir=self.cube.cache_dir[:-len('cube/')])
+        cube.get_range(self.jan, self.feb)
+        self.assertEqual([], cube.refreshed)
+
+        # a month whose comments changed is redone, the other isnt
+        self.locator.put_month(self.feb, [('* **Razor:** Gillette Tech', 'u4')])
+        self.assert_same_usage(self.expected(self.jan, self.feb), cube.get_range(self.jan, self.feb))
+        self.assertEqual([(self.feb, ['Razor', 'Blade', 'Knot Size'])], cube.refreshed)
+
+    def test_entity_changed(self):
+        self.cube.get_month(self.jan)
+
+        # only the entity whose code differs is extracted again
+        entities = self.entities[:2] + [{'name': 'Knot Size', 'extractor': KnotSizeExtractor(), 'renamer': BladeAlternateNamer()}]
+        cube = AggregateCube(self.locator, entities, cache_dir=self.cube.cache_dir[:-len('cube/')])
+        cube.get_month(self.jan)
+        self.assertEqual([(self.jan, ['Knot Size'])], cube.refreshed)
+
+    def test_pipeline_changed(self):
+        self.cube.get_month(self.jan)
+
+        # a change to parsing or aggregation redoes every entity
+        with mock.patch.object(AggregateCube, '_pipeline_signature', return_value='changed'):
+            cube = AggregateCube(self.locator, self.entities, cache_dir=self.cube.cache_dir[:-len('cube/')])
+        cube.get_month(self.jan)
+        self.assertEqual([(self.jan, ['Razor', 'Blade', 'Knot Size'])], cube.refreshed)
+
+    def test_sketch_users(self):
+        cube = AggregateCube(
+            self.locator, self.entities, cache_dir=self.cube.cache_dir[:-len('cube/')], sketch_users=True,
+        )
+        # so few users the sketches are exact
+        self.assert_same_usage(self.expected(self.jan, self.feb), cube.get_range(self.jan, self.feb))
@@ -0,0 +1,231 @@
+import datetime
+import random
+import shutil
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+import pandas as pd
+
+from sotd_collator.aho_corasick import AhoCorasick
+from sotd_collator.base_alternate_namer import BaseAlternateNamer
+from sotd_collator.blade_alternate_namer import BladeAlternateNamer
+from sotd_collator.blade_name_extractor import BladeNameExtractor
+from sotd_collator.comment_store import StoredComments
+from sotd_collator.brush_alternate_namer import BrushAlternateNamer
+from sotd_collator.brush_name_extractor import BrushNameExtractor
+from sotd_collator.pattern_table import PatternTable, required_literals
+from sotd_collator.razor_alternate_namer import RazorAlternateNamer
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.resolution_cache import ResolutionCache
+from sotd_collator.sotd_post_locator import SotdPostLocator
+
+
+class TestBaseAlternateNamer(TestCase):
+
+    # year to check the matching engines against - made up, and from the cache where it has been cached
+    PARITY_YEAR = 2022
+
+    namers = [
+        (RazorAlternateNamer, RazorNameExtractor),
+        (BladeAlternateNamer, BladeNameExtractor),
+        (BrushAlternateNamer, BrushNameExtractor),
+    ]
+
+    sample_names = [
+        'Karve CB (Plate C)',
+        'Maggard MR5 w/ V2 OC',
+        'Gillette Nacet (3)',
+        'Declaration Grooming - Jefferson Unicorn Ivory B9A',
+        'Omega 10049 Boar',
+        'Zenith B35 boar',
+        'Stirling 26mm Kong',
+        'semogue soc boar',
+        'Washington Blue Steel B6',
+        'some razor nobody has heard of',
+        '',
+    ]
+
+    def _assert_engine_parity(self, namer_class, names):
+        # the plain longest-pattern-first loop is the reference, every other engine must agree with it
+        sequential = namer_class(match_engine='sequential')
+        for engine in PatternTable.MATCH_ENGINES:
+            namer = namer_class(match_engine=engine)
+            # resolve directly, the shared resolution cache would otherwise hand every engine the same answer
+            for name in names:
+                self.assertEqual(
+                    sequential._resolve(name),
+                    namer._resolve(name),
+                    '{0} {1} engine disagrees on >{2}<'.format(namer_class.__name__, engine, name)
+                )
+
+    def test_engine_parity_on_known_names(self):
+        for namer_class, extractor_class in self.namers:
+            namer = namer_class()
+            # every principal name and every raw pattern string is a plausible looking entity name
+            self._assert_engine_parity(namer_class, self.sample_names + namer.all_entity_names)
+
+    def _assert_engine_parity_on_comments(self, comments):
+        comments = list(comments)
+        for namer_class, extractor_class in self.namers:
+            extractor = extractor_class()
+            names = set()
+            for comment, user_id in comments:
+                names.add(extractor.get_name(comment))
+                # the whole comment fallback extractors use when no SOTD line is found
+                names.add(extractor._to_ascii(comment))
+            names.discard(None)
+            self._assert_engine_parity(namer_class, names)
+
+    def test_engine_parity_on_synthetic_year(self):
+        # a made up year of shaves, 5 to 10 a day, that between them name everything the namers know in SOTD format
+        rng = random.Random(0)
+        hardware = {}
+        for entity_type, (namer_class, extractor_class) in zip(['Razor', 'Blade', 'Brush'], self.namers):
+            hardware[entity_type] = self.sample_names + namer_class().all_entity_names
+            rng.shuffle(hardware[entity_type])
+
+        comments = []
+        for day in range(365):
+            for _ in range(rng.randint(5, 10)):
+                i = len(comments)
+                comments.append(('\n'.join(
+                    '* **{0}:** {1}'.format(k, v[i % len(v)]) for k, v in hardware.items()
+                ), 'u{0}'.format(rng.randrange(300))))
+
+        self.assertGreater(len(comments), max(len(x) for x in hardware.values()))
+        self._assert_engine_parity_on_comments(comments)
+
+    def test_engine_parity_on_cached_year(self):
+        # the real thing, where every month of PARITY_YEAR has been cached
+        spl = SotdPostLocator(None)
+        for month in range(1, 13):
+            given_month = datetime.date(self.PARITY_YEAR, month, 1)
+            store_path = spl._get_month_store_path(given_month)
+            view = spl.thread_cache.get_view('months', given_month.strftime('%Y-%m'))
+            if not (StoredComments.exists(store_path) and not StoredComments(store_path).partial) and not (
+                view and view['complete']
+            ):
+                self.skipTest('{0} comments not cached'.format(given_month.strftime('%Y-%m')))
+
+        records = spl.iter_comments(datetime.date(self.PARITY_YEAR, 1, 1), datetime.date(self.PARITY_YEAR, 12, 31))
+        self._assert_engine_parity_on_comments((x.body, x.author) for x in records)
+
+    def test_required_literals(self):
+        self.assertEqual(['gil', 'et', 'goodwill'], required_literals('gil.*et.*goodwill'))
+        self.assertEqual(['WR', '1'], required_literals('WR-*1'))
+        self.assertEqual(['b', 'lzano'], required_literals('b(o|a)lzano'))
+        self.assertEqual(['y', '921'], required_literals('(yates|ypm).*921'))
+        self.assertEqual([], required_literals('(atlas|bamboo)?'))
+
+    def test_aho_corasick(self):
+        ac = AhoCorasick(['gil', 'gillette', 'lett', 'tech', 'he'])
+        found = ac.find('gillette tech')
+        self.assertEqual({'gil', 'gillette', 'lett', 'tech'}, {ac.keywords[x] for x in found})
+        self.assertEqual(set(), ac.find('karve'))
+
+    def test_resolution_cache_shared_between_instances(self):
+        BladeAlternateNamer.resolution_cache().clear()
+        self.assertEqual('Gillette Nacet', BladeAlternateNamer().get_principal_name('Gillette Nacet (3)'))
+        self.assertEqual('Gillette Nacet', BladeAlternateNamer().get_principal_name('Gillette Nacet (3)'))
+        # no principal name is cached too
+        self.assertIsNone(BladeAlternateNamer().get_principal_name('zzz'))
+        self.assertIsNone(BladeAlternateNamer().get_principal_name('zzz'))
+
+        stats = BladeAlternateNamer.resolution_cache_stats()
+        self.assertEqual((2, 2, 0), (stats['hits'], stats['misses'], stats['evictions']))
+        # caches are per namer class
+        self.assertIsNot(BladeAlternateNamer.resolution_cache(), RazorAlternateNamer.resolution_cache())
+
+    def test_resolution_cache_eviction(self):
+        cache = ResolutionCache(maxsize=2)
+        for name in ('a', 'b', 'a', 'c'):
+            cache.get_or_resolve(name, str.upper)
+        # b was least recently used
+        self.assertNotIn('b', cache)
+        self.assertEqual({'size': 2, 'hits': 1, 'misses': 3, 'evictions': 1}, {
+            x: cache.stats()[x] for x in ('size', 'hits', 'misses', 'evictions')
+        })
+        cache.resize(1)
+        self.assertEqual(2, cache.evictions)
+
+    def _make_toy_namer(self, raw):
+        # a fresh class each time, standing in for edits to a namer's _raw between runs
+        namer_class = type('ToyAlternateNamer', (BaseAlternateNamer,), {'_raw': OrderedDict(raw)})
+        self.addCleanup(self._forget_namer, namer_class)
+        return namer_class
+
+    @staticmethod
+    def _forget_namer(namer_class):
+        # drop what the namer left in the class level registries shared by every namer
+        for key in [x for x in BaseAlternateNamer._pattern_tables if x[0] is namer_class]:
+            del BaseAlternateNamer._pattern_tables[key]
+        BaseAlternateNamer._resolution_caches.pop(namer_class, None)
+        BaseAlternateNamer._resolution_stores.pop(namer_class, None)
+
+    def test_resolution_store_selective_invalidation(self):
+        cache_dir = tempfile.mkdtemp() + '/'
+        self.addCleanup(shutil.rmtree, cache_dir)
+        names = ['Karve CB', 'Gillette Tech', 'Rockwell 6C', 'Gillette Slim']
+
+        v1 = self._make_toy_namer({'Karve CB': ['karve'], 'Gillette Tech': ['gillette.*tech'], 'Gillette': ['gillette']})
+        v1.use_resolution_store(cache_dir)
+        self.assertEqual(['Karve CB', 'Gillette Tech', None, 'Gillette'], [v1().get_principal_name(x) for x in names])
+        v1.save_resolution_stores()
+
+        # unchanged patterns keep everything
+        self.assertEqual(4, len(self._make_toy_namer(v1._raw).use_resolution_store(cache_dir)))
+
+        # a new pattern only knocks out the names it matches, and a higher priority pattern only the names
+        # it would now win
+        v2 = self._make_toy_namer({
+            'Karve CB': ['karve'], 'Gillette Tech': ['gillette.*tech'], 'Gillette': ['gillette'],
+            'Rockwell 6C': ['rockwell'], 'Gillette Slim Adjustable': ['gillette.*slim'],
+        })
+        store = v2.use_resolution_store(cache_dir)
+        self.assertEqual(2, store.invalidated)
+        self.assertEqual({'Karve CB', 'Gillette Tech'}, {x for x in names if x in store})
+        self.assertEqual(
+            ['Karve CB', 'Gillette Tech', 'Rockwell 6C', 'Gillette Slim Adjustable'],
+            [v2().get_principal_name(x) for x in names],
+        )
+        v2.save_resolution_stores()
+
+        # dropping a pattern invalidates the names it resolved
+        v3 = self._make_toy_namer({
+            'Karve CB': ['karve'], 'Gillette': ['gillette'],
+            'Rockwell 6C': ['rockwell'], 'Gillette Slim Adjustable': ['gillette.*slim'],
+        })
+        store = v3.use_resolution_store(cache_dir)
+        self.assertEqual(1, store.invalidated)
+        self.assertNotIn('Gillette Tech', store)
+        self.assertEqual('Gillette', v3().get_principal_name('Gillette Tech'))
+
+    def test_toy_namers_forgotten(self):
+        cache_dir = tempfile.mkdtemp() + '/'
+        self.addCleanup(shutil.rmtree, cache_dir)
+        namer_class = self._make_toy_namer({'Karve CB': ['karve']})
+        namer_class.use_resolution_store(cache_dir)
+        self.assertEqual('Karve CB', namer_class().get_principal_name('Karve CB'))
+        self.doCleanups()
+        self.assertNotIn(namer_class, BaseAlternateNamer._resolution_stores)
+        self.assertNotIn(namer_class, BaseAlternateNamer._resolution_caches)
+        self.assertEqual([], [x for x in BaseAlternateNamer._pattern_tables if x[0] is namer_class])
+
+    def test_get_principal_names(self):
+        BladeAlternateNamer.resolution_cache().clear()
+        names = ['Gillette Nacet (3)', 'zzz', 'Gillette Nacet (3)', None, 'Astra SP']
+        expected = ['Gillette Nacet', None, 'Gillette Nacet', None, 'Astra SP (Green)']
+
+        self.assertEqual(expected, BladeAlternateNamer().get_principal_names(iter(names)))
+        # each distinct name is only resolved once
+        self.assertEqual(3, BladeAlternateNamer.resolution_cache_stats()['misses'])
+
+        series = pd.Series(names, index=[5, 4, 3, 2, 1])
+        resolved = BladeAlternateNamer().get_principal_names(series)
+        self.assertEqual(list(series.index), list(resolved.index))
+        self.assertEqual(expected, list(resolved))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            RazorAlternateNamer(match_engine='dfa')
@@ -2,6 +2,8 @@ from unittest import TestCase
 
 
 from blade_format_extractor import BladeFormatExtractor
+from sotd_collator.blade_name_extractor import BladeNameExtractor
+from sotd_collator.sotd_post_parser import SotdPost
 
 
 class TestBladeFormatExtractor(TestCase):
@@ -27,3 +29,11 @@ class TestBladeFormatExtractor(TestCase):
         for case in self.blade_format_cases:
             bf = bfe.get_name(case['comment'])
             self.assertEqual(case['expected_result'], bf)
+
+
+    def test_upstream_memoised(self):
+        post = SotdPost(self.blade_format_cases[0]['comment'])
+        self.assertEqual('AC', BladeFormatExtractor().get_name(post))
+        # the blade name worked out on the way is there for the blade extractor to reuse
+        self.assertIn((BladeNameExtractor, 'get_name'), post.memo)
+        self.assertEqual(post.memo[(BladeNameExtractor, 'get_name')], BladeNameExtractor().get_name(post))
@@ -0,0 +1,96 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from sotd_collator.comment_store import CommentChain, CommentRecord, StoredComments
+from sotd_collator.sotd_post_parser import SotdComment
+
+
+class TestCommentStore(TestCase):
+
+    records = [
+        ('* Razor: Karve CB\n* Blade: Astra', 'u1', 't1', datetime.date(2021, 3, 1), 'c1', 'shaver1'),
+        ('* Lather: Café B&amp;M', 'u2', 't1', datetime.date(2021, 3, 1), 'c2'),
+        ('no author', '', None, None, None),
+    ]
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.path = os.path.join(cache_dir, 'comments', '2021-03')
+
+    def test_round_trip(self):
+        self.assertFalse(StoredComments.exists(self.path))
+        StoredComments.write(self.path, self.records)
+        self.assertTrue(StoredComments.exists(self.path))
+
+        stored = StoredComments(self.path)
+        stored.will_need()
+        self.assertEqual(3, len(stored))
+        self.assertEqual([(x[0], x[1]) for x in self.records], list(stored))
+        self.assertEqual(['u1', 'u2', ''], stored.column('author'))
+        self.assertEqual([datetime.date(2021, 3, 1), datetime.date(2021, 3, 1), None], stored.column('day'))
+        self.assertEqual(
+            CommentRecord('no author', '', '', None, '', ''), list(stored.records())[2],
+        )
+        self.assertEqual(['shaver1', '', ''], stored.column('author_name'))
+
+        body, author = stored[1]
+        self.assertIsInstance(body, SotdComment)
+        self.assertEqual('* Lather: Cafe B&M', body.text)
+        self.assertEqual(stored[-1], stored[2])
+        with self.assertRaises(IndexError):
+            stored[3]
+
+    def test_version_1_store(self):
+        StoredComments.write(self.path, self.records)
+        os.remove(os.path.join(self.path, 'author_name.data'))
+        os.remove(os.path.join(self.path, 'author_name.offsets'))
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f_meta:
+            json.dump({'version': 1, 'rows': 3}, f_meta)
+
+        stored = StoredComments(self.path)
+        self.assertEqual(['', '', ''], stored.column('author_name'))
+        self.assertEqual('u1', stored[0][1])
+
+    def test_empty(self):
+        StoredComments.write(self.path, [])
+        self.assertEqual([], list(StoredComments(self.path)))
+
+    def test_chain(self):
+        chain = CommentChain([StoredComments.write(self.path, self.records), [(SotdComment('fetched'), 'u3')]])
+        self.assertEqual(4, len(chain))
+        self.assertEqual(['u1', 'u2', '', 'u3'], [author for body, author in chain])
+        self.assertEqual(CommentRecord('fetched', 'u3', None, None, None), list(chain.records())[3])
+
+    def test_mapped_lazily_and_released(self):
+        stored = StoredComments.write(self.path, self.records)
+        # opening reads only the meta
+        self.assertEqual({}, stored._mapped)
+
+        self.assertEqual('u2', stored[1][1])
+        self.assertIn('author.data', stored._mapped)
+        with stored:
+            stored.will_need()
+        self.assertEqual({}, stored._mapped)
+
+        # a full pass releases what it mapped, and the store reads again after
+        self.assertEqual(3, len(list(stored.records())))
+        self.assertEqual({}, stored._mapped)
+        self.assertEqual(['u1', 'u2', ''], stored.column('author'))
+        self.assertEqual({}, stored._mapped)
+
+    def test_chain_releases_parts(self):
+        parts = [
+            StoredComments.write(os.path.join(os.path.dirname(self.path), str(i)), self.records) for i in range(3)
+        ]
+        chain = CommentChain([parts[0], CommentChain(parts[1:])])
+        seen = []
+        for body, author in chain:
+            # only the part being read is mapped
+            seen.append(sum(1 for x in parts if x._mapped))
+        self.assertEqual([1] * 9, seen)
+        self.assertEqual([{}, {}, {}], [x._mapped for x in parts])
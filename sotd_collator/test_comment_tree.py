@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from praw.models import MoreComments
+
+from sotd_collator.comment_tree import CommentTree
+from sotd_collator.rate_limiter import TokenBucket
+
+
+class FakeComment(object):
+
+    def __init__(self, comment_id, parent_id='t3_abc'):
+        self.id = comment_id
+        self.parent_id = parent_id
+
+
+class FakeMoreComments(MoreComments):
+
+    def __init__(self, children, comments=()):
+        self.parent_id = 't3_abc'
+        self.children = children
+        self._comments = list(comments)
+
+    def comments(self, update=True):
+        return self._comments
+
+
+class FakeThread(object):
+    fullname = 't3_abc'
+    comment_sort = 'confidence'
+
+    def __init__(self, comments):
+        self.comments = comments
+
+
+class FakeReddit(object):
+    """
+    Answers morechildren with a comment and a reply per id asked for, plus a further MoreComments the first time
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def post(self, path, data):
+        self.requests.append(data)
+        expanded = []
+        for x in data['children'].split(','):
+            expanded.extend([FakeComment(x), FakeComment(x + '_reply', 't1_' + x)])
+        if len(self.requests) == 1:
+            expanded.append(FakeMoreComments(['late']))
+        return expanded
+
+
+class TestCommentTree(TestCase):
+
+    def test_batched_expansion(self):
+        reddit = FakeReddit()
+        thread = FakeThread([
+            FakeComment('a'),
+            FakeMoreComments(['m{0}'.format(i) for i in range(150)]),
+            FakeMoreComments(['n1', 'n2']),
+            FakeMoreComments([], [FakeComment('continued')]),
+        ])
+        bucket = TokenBucket(1000, 1000)
+        tree = CommentTree(thread, reddit)
+        comments = tree.flatten(bucket)
+
+        self.assertEqual(155, len(comments))
+        self.assertEqual({'a', 'continued', 'late', 'm0', 'm149', 'n2'} - set(x.id for x in comments), set())
+        # the replies morechildren lists alongside each comment arent shaves
+        self.assertEqual([], [x.id for x in comments if x.id.endswith('_reply')])
+        # 152 ids in two batched requests rather than three, then the MoreComments they turned up
+        self.assertEqual([100, 52, 1], [len(x['children'].split(',')) for x in reddit.requests])
+        self.assertEqual('t3_abc', reddit.requests[0]['link_id'])
+        # load, continue this thread, two batches, the late MoreComments
+        self.assertEqual(5, tree.api_calls)
+        self.assertEqual(5, bucket.acquired)
+
+    def test_no_more_comments(self):
+        tree = CommentTree(FakeThread([FakeComment('a')]), FakeReddit())
+        self.assertEqual(['a'], [x.id for x in tree.flatten()])
+        self.assertEqual(1, tree.api_calls)
@@ -0,0 +1,53 @@
+import threading
+from unittest import TestCase
+
+from sotd_collator.rate_limiter import TokenBucket
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(TestCase):
+
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(0, clock.now)
+
+        # after the burst, one token every half second
+        bucket.acquire()
+        bucket.acquire()
+        self.assertAlmostEqual(1.0, clock.now)
+        self.assertEqual(5, bucket.stats()['acquired'])
+
+        # tokens build back up to capacity and no further
+        clock.now += 60
+        for _ in range(3):
+            bucket.acquire()
+        self.assertAlmostEqual(61.0, clock.now)
+        bucket.acquire()
+        self.assertAlmostEqual(61.5, clock.now)
+
+    def test_shared_between_threads(self):
+        bucket = TokenBucket(1000, 50)
+        workers = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(20)]) for _ in range(5)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(100, bucket.acquired)
+
+    def test_bad_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0, 1)
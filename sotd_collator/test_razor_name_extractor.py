@@ -1,6 +1,20 @@
+import inspect
+import shutil
+import tempfile
 from unittest import TestCase
 
 from razor_name_extractor import RazorNameExtractor
+from sotd_collator import sotd_post_parser
+from sotd_collator.extraction_store import ExtractionStore
+from sotd_collator.sotd_post_parser import SotdPost
+
+
+class UpperRazorNameExtractor(RazorNameExtractor):
+    # same detect regexps, different fixup
+
+    def get_detected_name(self, post):
+        name = super().get_detected_name(post)
+        return name and name.upper()
 
 
 class TestRazorNameExtractor(TestCase):
@@ -63,3 +77,32 @@ Stay safe and have a great day!""",
         for case in self.razor_name_cases:
             r_name = rn.get_name(case['comment'])
             self.assertEqual(case['expected_result'], r_name)
+
+    def test_extraction_store(self):
+        cache_dir = tempfile.mkdtemp() + '/'
+        self.addCleanup(shutil.rmtree, cache_dir)
+        comment = self.razor_name_cases[0]['comment']
+        try:
+            store = RazorNameExtractor.use_extraction_store(cache_dir)
+            self.assertEqual('Karve CB (Plate C)', RazorNameExtractor().get_name(SotdPost(comment)))
+            self.assertEqual('Karve CB (Plate C)', store[SotdPost(comment).digest])
+            RazorNameExtractor.save_extraction_stores()
+
+            # a fresh run answers from disk without parsing the comment
+            store = RazorNameExtractor.use_extraction_store(cache_dir)
+            post = SotdPost(comment)
+            self.assertEqual('Karve CB (Plate C)', RazorNameExtractor().get_name(post))
+            self.assertNotIn('_lines', post.__dict__)
+
+            # new extraction code - here a get_detected_name fixup - throws stored names away
+            self.assertNotEqual(RazorNameExtractor.extraction_sources(), UpperRazorNameExtractor.extraction_sources())
+            # as does a change to how comments are normalised and parsed in to fields
+            self.assertIn(inspect.getsource(sotd_post_parser), RazorNameExtractor.extraction_sources())
+            store = ExtractionStore(
+                'RazorNameExtractor', RazorNameExtractor().detect_regexps, UpperRazorNameExtractor.extraction_sources(),
+                cache_dir,
+            ).load()
+            self.assertEqual(0, len(store))
+            self.assertEqual(1, store.invalidated)
+        finally:
+            RazorNameExtractor._extraction_stores.pop(RazorNameExtractor, None)
@@ -0,0 +1,90 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import praw
+
+from sotd_collator.rate_limiter import TokenBucket
+from sotd_collator.reddit_transport import (
+    Cassette, RecordingRequestor, ReplayRequestor, SyntheticReddit, _make_response, replay_reddit,
+)
+from sotd_collator.sotd_post_locator import SotdPostLocator
+
+
+class BackendSession(object):
+    """
+    Stands in for the requests session under a RecordingRequestor, so recording can be tested without reddit
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.headers = {}
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        if url.endswith('access_token'):
+            return _make_response(url, 200, {}, json.dumps(ReplayRequestor.TOKEN).encode('utf-8'))
+        return _make_response(url, *self.backend.respond(method, url, params, data))
+
+
+class TestRedditTransport(TestCase):
+
+    MONTH = datetime.date(2021, 5, 1)
+
+    def _temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        return temp_dir
+
+    def _locator(self, reddit, max_workers=1, reddit_factory=None):
+        spl = SotdPostLocator(
+            reddit, max_workers=max_workers, request_bucket=TokenBucket(1e6, 1e6), reddit_factory=reddit_factory,
+        )
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        return spl
+
+    def test_synthetic_month(self):
+        backend = SyntheticReddit(self.MONTH, 3, comments_per_thread=(250, 300), seed=1)
+        spl = self._locator(replay_reddit(backend), max_workers=2, reddit_factory=lambda: replay_reddit(backend))
+        comments = spl.get_comments_for_given_month_cached(self.MONTH)
+
+        # every top level comment and no replies, the threads past INITIAL_COMMENTS needing a morechildren each
+        self.assertEqual(sum(len(x['top_level']) for x in backend.threads), len(comments))
+        self.assertNotIn('Nice shave!', [body for body, author in comments])
+        self.assertEqual(3, backend.served['/api/morechildren'])
+        self.assertEqual('shaver', comments.column('author_name')[0][:6])
+
+    def test_record_and_replay(self):
+        cassette = Cassette(os.path.join(self._temp_dir(), 'may.cassette'))
+        reddit = praw.Reddit(
+            client_id='record', client_secret='record', user_agent='sotd_collator test', check_for_updates=False,
+            requestor_class=RecordingRequestor,
+            requestor_kwargs={'cassette': cassette, 'session': BackendSession(SyntheticReddit(self.MONTH, 2, seed=2))},
+        )
+        recorded = list(self._locator(reddit).get_comments_for_given_month_cached(self.MONTH))
+        cassette.save()
+
+        replayed = Cassette(cassette.path).load()
+        self.assertEqual(recorded, list(self._locator(replay_reddit(replayed)).get_comments_for_given_month_cached(self.MONTH)))
+        self.assertFalse(any('access_token' in x for x in replayed.responses))
+
+    def test_cassette_replay_order(self):
+        cassette = Cassette('unused')
+        for body in (b'first', b'second'):
+            cassette.record('GET', 'https://oauth.reddit.com/api/info/', {'id': 't3_a'}, None, 200, {'x-ratelimit-remaining': '5'}, body)
+
+        url = 'https://www.reddit.com/api/info?id=t3_a'
+        self.assertEqual((200, {}, b'first'), cassette.respond('get', url))
+        self.assertEqual(b'second', cassette.respond('GET', url)[2])
+        self.assertEqual(b'second', cassette.respond('GET', url)[2])
+        with self.assertRaises(KeyError):
+            cassette.respond('GET', 'https://oauth.reddit.com/api/info/', {'id': 't3_b'})
+
+    def test_synthetic_search(self):
+        backend = SyntheticReddit(datetime.date(2021, 5, 30), 4)
+        status, headers, body = backend.respond('GET', '/r/wetshaving/search/', {'q': 'flair_name:SOTD (jun OR june) 2021', 'limit': 100})
+        titles = [x['data']['title'] for x in json.loads(body)['data']['children']]
+        self.assertEqual(['Lather Games 2021 - Day 2 - Jun 02, 2021', 'Lather Games 2021 - Day 1 - Jun 01, 2021'], titles)
+        self.assertEqual(404, backend.respond('GET', '/comments/nope/')[0])
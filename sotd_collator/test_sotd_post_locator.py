@@ -1,17 +1,459 @@
 import datetime
+import os
+import pickle
 import re
+import shutil
+import tempfile
+import threading
+from types import SimpleNamespace
 from unittest import TestCase
 from calendar import monthrange
 import praw
 from dateutil import relativedelta
+from praw.models import MoreComments
 
 from sotd_post_locator import SotdPostLocator
+from sotd_collator.comment_store import StoredComments
+from sotd_collator.razor_alternate_namer import RazorAlternateNamer
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.rate_limiter import TokenBucket
+from sotd_collator.sotd_post_parser import SotdComment
+from sotd_collator.utils import get_entity_shave_data_for_year, get_shave_data_for_year
+
+try:
+    import resource
+except ImportError:
+    # not on windows
+    resource = None
+
+
+class FakeComment(object):
+
+    def __init__(self, comment_id, created_utc):
+        self.id = comment_id
+        self.created_utc = created_utc
+        self.body = '* Razor: {0}'.format(comment_id)
+        self.author = None
+
+
+class FakeRedditor(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def id(self):
+        raise AssertionError('Redditor fetched')
+
+
+class FakeReddit(object):
+
+    def __init__(self, threads=()):
+        # threads newest first, as a listing sorted by new
+        self.threads = list(threads)
+        self.lookups = []
+        self.searches = []
+        self.used_from = set()
+
+    def subreddit(self, name):
+        return self
+
+    def search(self, query, sort=None, limit=None):
+        self.searches.append(query)
+        return iter(self.threads)
+
+    def info(self, fullnames):
+        by_fullname = {x.fullname: x for x in self.threads}
+        return [by_fullname[x] for x in fullnames]
+
+    def submission(self, id):
+        # a thread again, on this instance - noting the worker thread that asked
+        self.used_from.add(threading.get_ident())
+        return {x.id: x for x in self.threads}[id]
+
+    def redditor(self, name):
+        # a looked up redditor, id fetched
+        self.lookups.append(name)
+        return SimpleNamespace(name=name, id='id_' + name)
+
+
+class FakeMoreComments(MoreComments):
+
+    def __init__(self, comments, fails=0):
+        # no children - a continue this thread link, expanded on its own. the first fails expansions break
+        self.children = []
+        self._comments = comments
+        self.fails = fails
+
+    def comments(self, update=True):
+        if self.fails:
+            self.fails -= 1
+            raise AttributeError('expansion failed')
+        return self._comments
+
+
+class FakeThread(object):
+
+    def __init__(self, thread_id, comments, title='SOTD Thread', created_utc=None):
+        self.id = thread_id
+        self.title = title
+        self.created_utc = created_utc or datetime.datetime.utcnow().timestamp()
+        self._comments = comments
+        self.num_comments = len(comments)
+        self.fullname = 't3_{0}'.format(thread_id)
+        self.comment_sort = 'confidence'
+        self.link_flair_text = 'SOTD'
+        self.fetches = 0
+        # the next fails loads break
+        self.fails = 0
+
+    @property
+    def comments(self):
+        self.fetches += 1
+        if self.fails:
+            self.fails -= 1
+            raise AttributeError('load failed')
+        return self._comments
 
 
 class TestSotdPostLocator(TestCase):
 
     #CONCLUDE WE CAN GO BACK TO 2016-05-01
 
+    def _temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        return temp_dir
+
+    def test_cache_upgrade(self):
+        cache_file = os.path.join(self._temp_dir(), '20201.cache')
+        with open(cache_file, 'wb') as f_cache:
+            pickle.dump([('* Razor: Caf\u00e9 &amp; Co', 'abc'), ('no body', '')], f_cache)
+
+        comments = SotdPostLocator._read_cache(cache_file)
+        self.assertEqual([('* Razor: Caf\u00e9 &amp; Co', 'abc'), ('no body', '')], comments)
+        self.assertEqual('* Razor: Cafe & Co', comments[0][0].text)
+
+        # upgraded on disk too
+        with open(cache_file, 'rb') as f_cache:
+            self.assertTrue(all(isinstance(body, SotdComment) for body, author in pickle.load(f_cache)))
+
+    def test_incremental_month_refresh(self):
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        this_month = datetime.date.today().replace(day=1)
+        yesterday = FakeThread('t1', [FakeComment('a', 100), FakeComment('b', 200), FakeComment('c', 300)])
+        today = FakeThread('t2', [FakeComment('d', 400)])
+        spl.get_threads_for_given_month = lambda given_month: [yesterday, today]
+
+        self.assertEqual(4, len(spl.get_comments_for_given_month_cached(this_month)))
+
+        # only the thread with new comments gets fetched again, and only its new comments are added
+        today._comments.append(FakeComment('e', 500))
+        today.num_comments += 1
+        comments = spl.get_comments_for_given_month_cached(this_month)
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], comments.column('comment_id'))
+        self.assertEqual((1, 2), (yesterday.fetches, today.fetches))
+        self.assertEqual({'num_comments': 2}, spl.thread_cache.get_thread('t2').meta['mark'])
+
+        # a comment older than the mark - approved late, or missed last time - still gets added on the next refresh
+        yesterday._comments.insert(1, FakeComment('late', 150))
+        yesterday.num_comments += 1
+        comments = spl.get_comments_for_given_month_cached(this_month)
+        self.assertEqual(['a', 'b', 'c', 'late', 'd', 'e'], comments.column('comment_id'))
+        self.assertEqual({'num_comments': 4}, spl.thread_cache.get_thread('t1').meta['mark'])
+
+    def test_partial_thread_fetched_again(self):
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        this_month = datetime.date.today().replace(day=1)
+        thread = FakeThread('t1', [FakeComment('a', 100), FakeMoreComments([FakeComment('b', 200)], fails=1)])
+        spl.get_threads_for_given_month = lambda given_month: [thread]
+
+        # the expansion breaks part way, what came back is kept but the thread isnt marked as fetched
+        self.assertEqual(['a'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual({'num_comments': 0}, spl.thread_cache.get_thread('t1').meta['mark'])
+
+        # so the next run fetches it again, with no new comments on reddit, and gets the rest
+        self.assertEqual(['a', 'b'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual({'num_comments': 2}, spl.thread_cache.get_thread('t1').meta['mark'])
+        spl.get_comments_for_given_month_cached(this_month)
+        self.assertEqual(2, thread.fetches)
+
+    def test_partial_thread_fetched_again_concurrently(self):
+        # same through the workers, each thread loaded again on a worker's own instance
+        this_month = datetime.date.today().replace(day=1)
+        threads = [
+            FakeThread('t1', [FakeComment('a', 100), FakeMoreComments([FakeComment('b', 200)], fails=1)]),
+            FakeThread('t2', [FakeComment('c', 300)]),
+        ]
+        spl = SotdPostLocator(
+            None, max_workers=2, request_bucket=TokenBucket(1000, 1000), reddit_factory=lambda: FakeReddit(threads),
+        )
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        spl.get_threads_for_given_month = lambda given_month: threads
+
+        self.assertEqual(['a', 'c'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual({'num_comments': 0}, spl.thread_cache.get_thread('t1').meta['mark'])
+        self.assertEqual({'num_comments': 1}, spl.thread_cache.get_thread('t2').meta['mark'])
+
+        # a thread that doesnt load at all is left as stored, and still fetched next time
+        threads[0].fails = 1
+        self.assertEqual(['a', 'c'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual(['a', 'b', 'c'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual({'num_comments': 2}, spl.thread_cache.get_thread('t1').meta['mark'])
+        self.assertEqual((3, 1), (threads[0].fetches, threads[1].fetches))
+
+    def test_year_of_thread_stores(self):
+        # a year is every thread of every month, a store each - far more than can be mapped at once
+        spl = SotdPostLocator(None)
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        for month in range(1, 13):
+            threads = {}
+            for day in range(1, monthrange(2021, month)[1] + 1):
+                thread_day = datetime.date(2021, month, day)
+                thread_id = 't' + thread_day.strftime('%m%d')
+                records = [
+                    ('* **Razor:** Karve CB', 'u1', thread_id, thread_day, thread_id + 'a'),
+                    ('* **Razor:** Gillette Tech', 'u{0}'.format(day), thread_id, thread_day, thread_id + 'b'),
+                ]
+                spl.thread_cache.put_thread(thread_id, records, {'num_comments': 2})
+                threads[thread_id] = {'title': 'SOTD', 'day': thread_day.isoformat()}
+            spl.thread_cache.put_view('months', '2021-{0:02d}'.format(month), threads, True)
+
+        if resource is not None:
+            # well under the 365 stores' worth of column files
+            limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, limits[0]), limits[1]))
+            self.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE, limits)
+
+        self.assertEqual(730, sum(1 for _ in spl.get_comments_for_given_year_cached(2021)))
+        usage = get_shave_data_for_year(2021, spl, RazorNameExtractor(), RazorAlternateNamer())
+        self.assertEqual([365, 365], list(usage['shaves']))
+        usage = get_entity_shave_data_for_year(
+            2021, spl, [{'name': 'Razor', 'extractor': RazorNameExtractor(), 'renamer': RazorAlternateNamer()}],
+        )
+        self.assertEqual([31, 1], list(usage.sort_values('name')['unique users']))
+
+    def test_day_served_from_month(self):
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        june_5 = datetime.datetime(2021, 6, 5, 12).replace(tzinfo=datetime.timezone.utc).timestamp()
+        june_6 = datetime.datetime(2021, 6, 6, 12).replace(tzinfo=datetime.timezone.utc).timestamp()
+        threads = [
+            FakeThread('t1', [FakeComment('a', 1)], 'SOTD Thread - Jun 05, 2021', june_5),
+            FakeThread('t2', [FakeComment('b', 1)], 'Lather Games 2021 - Day 5 - Jun 05, 2021', june_5),
+            FakeThread('t3', [FakeComment('c', 1)], 'SOTD Thread - Jun 06, 2021', june_6),
+        ]
+        spl.get_threads_for_given_month = lambda given_month: threads
+        self.assertEqual(3, len(spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))))
+
+        def _no_search(*args, **kwargs):
+            raise AssertionError('searched reddit')
+
+        # the month is over, so the month, its days and its threads are all served from the cache
+        spl.get_threads_for_given_month = spl.get_threads_for_given_day = _no_search
+        june_5 = datetime.date(2021, 6, 5)
+        self.assertEqual([('* Razor: a', ''), ('* Razor: b', '')], spl.get_comments_for_given_day_cached(june_5))
+        self.assertEqual([('* Razor: b', '')], spl.get_comments_for_given_day_cached(june_5, filter_pattern='games'))
+        self.assertEqual(3, len(spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))))
+        self.assertEqual([1, 1, 1], [x.fetches for x in threads])
+
+    def test_day_threads_shared_with_month(self):
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        june_5 = datetime.datetime(2021, 6, 5, 12).replace(tzinfo=datetime.timezone.utc).timestamp()
+        thread = FakeThread('t1', [FakeComment('a', 1)], 'SOTD Thread - Jun 05, 2021', june_5)
+        spl.get_threads_for_given_day = lambda given_day: [thread]
+        spl.get_threads_for_given_month = lambda given_month: [thread]
+
+        self.assertEqual([('* Razor: a', '')], spl.get_comments_for_given_day_cached(datetime.date(2021, 6, 5)))
+        # fetched for the day, not fetched again for the month
+        self.assertEqual(1, len(spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))))
+        self.assertEqual(1, thread.fetches)
+
+    def test_thread_index_lookups(self):
+        def _thread(thread_id, day, title):
+            created_utc = datetime.datetime(2021, 6, day, 12, tzinfo=datetime.timezone.utc).timestamp()
+            return FakeThread(thread_id, [], title, created_utc)
+
+        reddit = FakeReddit([
+            _thread('t4', 4, 'SOTD Thread - Jun 04, 2021'),
+            _thread('g3', 3, 'Lather Games 2021 - Day 3'),
+            _thread('t3', 3, 'SOTD Thread - Jun 03, 2021'),
+            _thread('t2', 2, 'SOTD Thread - Jun 02, 2021'),
+            _thread('t1', 1, 'SOTD Thread - Jun 01, 2021'),
+        ])
+        cache_dir = self._temp_dir() + '/'
+        spl = SotdPostLocator(reddit, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = cache_dir
+
+        # one discovery search serves every day it covers
+        june_3 = datetime.date(2021, 6, 3)
+        self.assertEqual({'t3', 'g3'}, {x.id for x in spl.get_threads_for_given_day(june_3)})
+        self.assertEqual(['g3'], [x.id for x in spl.get_threads_for_given_day(june_3, filter_pattern='games')])
+        self.assertEqual(['t2'], [x.id for x in spl.get_threads_for_given_day(datetime.date(2021, 6, 2))])
+        self.assertEqual(1, len(reddit.searches))
+
+        # the oldest day listed may be incomplete, so its month gets searched - once
+        self.assertEqual(['t1'], [x.id for x in spl.get_threads_for_given_day(datetime.date(2021, 6, 1))])
+        self.assertEqual(5, len(spl.get_threads_for_given_month(datetime.date(2021, 6, 1))))
+        self.assertEqual(2, len(reddit.searches))
+
+        # the index persists, days before the newest indexed dont need discovery
+        spl = SotdPostLocator(reddit, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = cache_dir
+        self.assertEqual(['t2'], [x.id for x in spl.get_threads_for_given_day(datetime.date(2021, 6, 2))])
+        self.assertEqual(2, len(reddit.searches))
+
+    def test_audit_and_fill_month(self):
+        def _thread(thread_id, day, title):
+            created_utc = datetime.datetime(2021, 6, day, 12, tzinfo=datetime.timezone.utc).timestamp()
+            return FakeThread(thread_id, [FakeComment(thread_id + 'a', 1)], title, created_utc)
+
+        june = [_thread('t{0}'.format(x), x, 'SOTD Thread - Jun {0:02d}, 2021'.format(x)) for x in range(1, 31)]
+        # posted a day early but for the 10th by its title, and the 20th twice
+        june[9] = _thread('t10', 9, 'SOTD Thread - June 10th, 2021')
+        cached = [x for x in june if x.id not in ('t3', 't4')] + [_thread('x20', 20, 'SOTD Thread - Jun 20, 2021')]
+
+        spl = SotdPostLocator(FakeReddit(june), request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        spl.get_threads_for_given_month = lambda given_month: cached
+        self.assertEqual(29, len(spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))))
+
+        audit = spl.audit_month(datetime.date(2021, 6, 1))
+        self.assertEqual([datetime.date(2021, 6, 3), datetime.date(2021, 6, 4)], audit['missing'])
+        self.assertEqual({datetime.date(2021, 6, 20): ['t20', 'x20']}, audit['duplicates'])
+
+        # only the missing days are searched for, and what they find joins the month
+        audit = spl.fill_month_gaps(datetime.date(2021, 6, 1))
+        self.assertEqual([], audit['missing'])
+        self.assertEqual(2, len(spl.praw.searches))
+        self.assertEqual(31, len(spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))))
+        self.assertTrue(all(x.fetches == 1 for x in june if x.id != 't10'))
+
+    def test_iter_comments(self):
+        def _thread(thread_id, day):
+            created_utc = datetime.datetime(day.year, day.month, day.day, 12, tzinfo=datetime.timezone.utc).timestamp()
+            return FakeThread(thread_id, [FakeComment(thread_id + 'a', 1), FakeComment(thread_id + 'b', 2)], 'SOTD Thread', created_utc)
+
+        may = [_thread('may{0}'.format(x), datetime.date(2021, 5, x)) for x in range(1, 32)]
+        june = [_thread('jun{0}'.format(x), datetime.date(2021, 6, x)) for x in range(1, 31)]
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        spl.get_threads_for_given_month = lambda given_month: may if given_month.month == 5 else june
+        spl.get_comments_for_given_month_cached(datetime.date(2021, 6, 1))
+
+        # may whole, june by its days
+        records = spl.iter_comments(datetime.date(2021, 5, 1), datetime.date(2021, 6, 2))
+        self.assertEqual(66, sum(1 for _ in records))
+        records = spl.iter_comments(
+            datetime.date(2021, 5, 30), datetime.date(2021, 6, 2), filter=lambda x: x.comment_id.endswith('a'),
+        )
+        self.assertEqual(['may30a', 'may31a', 'jun1a', 'jun2a'], [x.comment_id for x in records])
+        self.assertEqual(datetime.date(2021, 6, 1), next(spl.iter_comments(datetime.date(2021, 6, 1), datetime.date(2021, 6, 1))).day)
+
+    def test_split_month_store(self):
+        spl = SotdPostLocator(None, request_bucket=TokenBucket(1000, 1000))
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        this_month = datetime.date.today().replace(day=1)
+        StoredComments.write(
+            spl._get_month_store_path(this_month),
+            [('* Razor: a', 'u1', 't1', this_month, 'a'), ('* Razor: b', 'u2', 't1', this_month, 'b')],
+            {'thread_marks': {'t1': {'num_comments': 2, 'created_utc': 200}}},
+        )
+        thread = FakeThread('t1', [FakeComment('a', 100), FakeComment('b', 200)])
+        spl.get_threads_for_given_month = lambda given_month: [thread]
+
+        # a month in progress stored whole carries on per thread, with nothing new to fetch
+        self.assertEqual(['a', 'b'], spl.get_comments_for_given_month_cached(this_month).column('comment_id'))
+        self.assertEqual(0, thread.fetches)
+        self.assertFalse(StoredComments.exists(spl._get_month_store_path(this_month)))
+        self.assertEqual({'num_comments': 2}, spl.thread_cache.get_thread('t1').meta['mark'])
+
+    def test_concurrent_fetch(self):
+        bucket = TokenBucket(1000, 1000)
+        threads = [
+            FakeThread('t{0}'.format(i), [
+                FakeComment('{0}a'.format(i), 1),
+                FakeMoreComments([FakeComment('{0}b'.format(i), 2), FakeMoreComments([FakeComment('{0}c'.format(i), 3)])]),
+            ])
+            for i in range(10)
+        ]
+        instances = []
+
+        def _reddit_factory():
+            instances.append(FakeReddit(threads))
+            return instances[-1]
+
+        spl = SotdPostLocator(FakeReddit(threads), max_workers=4, request_bucket=bucket, reddit_factory=_reddit_factory)
+        fetched = spl._fetch_thread_comments(threads)
+        self.assertEqual(['0a', '0b', '0c'], [x.id for x in fetched['t0'].comments])
+        self.assertEqual(30, sum(len(x.comments) for x in fetched.values()))
+        # one request per thread and per MoreComments
+        self.assertEqual(30, bucket.acquired)
+        self.assertEqual(3, spl.thread_api_calls['t0'])
+
+        # every thread went through a worker's own instance, never the shared one, and no instance was used by two
+        # worker threads
+        self.assertEqual(set(), spl.praw.used_from)
+        self.assertLessEqual(len(instances), 4)
+        self.assertEqual([1] * len(instances), [len(x.used_from) for x in instances])
+
+        with self.assertRaises(ValueError):
+            SotdPostLocator(FakeReddit(threads), max_workers=4)
+
+    def test_listing_paced_per_page(self):
+        # a long listing pages through reddit, a token per request rather than one for the whole listing
+        bucket = TokenBucket(1000, 1000)
+        spl = SotdPostLocator(None, request_bucket=bucket)
+        self.assertEqual(list(range(250)), list(spl._paced(range(250))))
+        self.assertEqual(3, bucket.acquired)
+
+    def test_get_author(self):
+        reddit = FakeReddit()
+        spl = SotdPostLocator(reddit, request_bucket=TokenBucket(1000, 1000))
+
+        comment = FakeComment('a', 1)
+        self.assertEqual(('', ''), spl._get_author(comment))
+
+        # straight from the listing data
+        comment.author = FakeRedditor('shaver1')
+        comment.author_fullname = 't2_abc1'
+        self.assertEqual(('abc1', 'shaver1'), spl._get_author(comment))
+
+        # no fullname in the listing, looked up once per name
+        for comment_id in ('b', 'c'):
+            comment = FakeComment(comment_id, 1)
+            comment.author = FakeRedditor('shaver2')
+            self.assertEqual(('id_shaver2', 'shaver2'), spl._get_author(comment))
+        self.assertEqual(['shaver2'], reddit.lookups)
+
+    def test_day_cache_serves_ids_and_names(self):
+        spl = SotdPostLocator(None)
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        with open(spl.CACHE_DIR + '20210430.cache', 'wb') as f_cache:
+            pickle.dump([(SotdComment('one'), 'abc1', 'shaver1')], f_cache)
+
+        day = datetime.date(2021, 4, 30)
+        self.assertEqual([('one', 'abc1')], spl.get_comments_for_given_day_cached(day))
+        self.assertEqual([('one', 'shaver1')], spl.get_comments_for_given_day_cached(day, use_author_name=True))
+
+    def test_convert_month_caches(self):
+        spl = SotdPostLocator(None)
+        spl.CACHE_DIR = self._temp_dir() + '/'
+        for name, comments in (('202011', [('* Razor: Tech', 'abc')]), ('20210430', [('day', 'xyz')])):
+            with open('{0}{1}.cache'.format(spl.CACHE_DIR, name), 'wb') as f_cache:
+                pickle.dump(comments, f_cache)
+
+        converted = spl.convert_month_caches()
+        self.assertEqual(1, len(converted))
+        self.assertEqual([('* Razor: Tech', 'abc')], list(converted[0]))
+        self.assertTrue(os.path.exists(spl.CACHE_DIR + 'comments/2020-11/meta.json'))
+
+        # read from the store from then on
+        self.assertEqual([('* Razor: Tech', 'abc')], list(spl.get_comments_for_given_month_cached(datetime.date(2020, 11, 1))))
+
 
     def test_get_threads_for_given_month(self):
 
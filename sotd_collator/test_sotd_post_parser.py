@@ -0,0 +1,86 @@
+import pickle
+import re
+from unittest import TestCase
+
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.sotd_post_parser import FieldDetector, SotdComment, SotdPost
+
+
+class TestSotdPostParser(TestCase):
+
+    tts_post = """**[Feb. 21, 2020 - Forgotten Friday](https://i.imgur.com/AiXQGG1.jpg)**
+
+* **Brush:** Washington Blue Steel B6
+* **Razor:** Karve CB (Plate C)
+* **Blade:** Gillette Nacet (3)
+* **Lather:** Declaration Grooming - Sweet Lemon - Soap
+
+Better late than never."""
+
+    sgrddy_post = """*Razor*: **Gillette Tech** *Blade*: **Astra SP**
+*Brush*: **Semogue 1305** *Lather*: **Stirling Executive Man**"""
+
+    def test_fields(self):
+        post = SotdPost(self.tts_post)
+        self.assertEqual('Karve CB (Plate C)', post.field('razor'))
+        self.assertEqual('Gillette Nacet (3)', post.field('Blade'))
+        self.assertEqual('Declaration Grooming - Sweet Lemon - Soap', post.field('lather'))
+        self.assertIsNone(post.field('aftershave'))
+
+        post = SotdPost('**Safety Razor** - RazoRock - Gamechanger 0.84P\n')
+        self.assertEqual([0], post.lead_lines['safety'])
+
+        post = SotdPost(self.sgrddy_post)
+        self.assertEqual({'razor': 0, 'blade': 0, 'brush': 49, 'lather': 49}, post.inline_lines)
+
+    def test_detector_layouts(self):
+        lead = FieldDetector(
+            re.compile(r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([\w ()]+)', re.MULTILINE | re.IGNORECASE),
+            ['razor'], FieldDetector.LEAD,
+        )
+        inline = FieldDetector(
+            re.compile(r'\*Blade\*:.*\*\*([\w ]+)\*\*', re.MULTILINE | re.IGNORECASE), ['blade'], FieldDetector.INLINE,
+        )
+        self.assertEqual('Karve CB (Plate C)', lead.search(SotdPost(self.tts_post)).group(1))
+        self.assertIsNone(lead.search(SotdPost('Blade: Astra\nthe razor: was great')))
+        self.assertEqual('Astra SP', inline.search(SotdPost(self.sgrddy_post)).group(1))
+        self.assertIsNone(inline.search(SotdPost(self.tts_post)))
+
+        # a detector can match across lines, as it would searching the whole post
+        size = FieldDetector(
+            re.compile(r'^[*\s\-+/]*brush\s*[:*\-\\+\s/]+[^:]*(\d{2}\s*mm)', re.MULTILINE | re.IGNORECASE),
+            ['brush'], FieldDetector.LEAD,
+        )
+        self.assertEqual('24mm', size.search(SotdPost('* Razor: Karve\n* Brush - Simpson\n  24mm knot')).group(1))
+
+        with self.assertRaises(ValueError):
+            FieldDetector(re.compile('x'), layout=FieldDetector.LEAD)
+
+    def test_detector_results_shared(self):
+        post = SotdPost(self.tts_post)
+        razor_re = r'^[*\s\-+/]*Razor\s*[:*\-\\+\s/]+\s*([\w ()]+)'
+        first = FieldDetector(re.compile(razor_re, re.MULTILINE | re.IGNORECASE), ['razor'], FieldDetector.LEAD)
+        second = FieldDetector(re.compile(razor_re, re.MULTILINE | re.IGNORECASE), ['razor'], FieldDetector.LEAD)
+        self.assertIs(first.search(post), second.search(post))
+        self.assertIsNot(first.search(post), first.search(SotdPost(self.tts_post)))
+
+    def test_parsed_once(self):
+        post = SotdPost.of(self.tts_post)
+        self.assertIs(post, SotdPost.of(self.tts_post))
+        self.assertIs(post, SotdPost.of(post))
+        self.assertEqual('e', SotdPost.of('é ').text)
+
+    def test_cached_comment(self):
+        comment = SotdComment('* **Soap:** B&amp;M &quot;Seville&quot; ')
+        self.assertEqual('* **Soap:** B&amp;M &quot;Seville&quot; ', comment)
+        self.assertEqual('* **Soap:** B&M "Seville"', comment.text)
+
+        restored = pickle.loads(pickle.dumps(comment))
+        self.assertIsInstance(restored, SotdComment)
+        self.assertEqual(comment.text, restored.text)
+        self.assertEqual('B&M "Seville"', SotdPost(restored).field('soap'))
+
+    def test_entities_decoded_before_matching(self):
+        # no razor line, so the name comes from the namer matching the whole comment - which only finds w&b once
+        # &amp; is decoded
+        self.assertEqual('Wade & Butcher Straight', RazorNameExtractor().get_name('Shaved with the W&amp;B straight today'))
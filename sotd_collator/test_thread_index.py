@@ -0,0 +1,52 @@
+import datetime
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import TestCase
+
+from sotd_collator.thread_index import ThreadIndex
+
+
+def thread(thread_id, day, title='SOTD Thread'):
+    created_utc = datetime.datetime(day.year, day.month, day.day, 12, tzinfo=datetime.timezone.utc).timestamp()
+    return SimpleNamespace(id=thread_id, title=title, link_flair_text='SOTD', created_utc=created_utc)
+
+
+class TestThreadIndex(TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'sotd_threads.json')
+
+    def test_discover(self):
+        index = ThreadIndex(self.path)
+        listing = [thread('t3', datetime.date(2021, 6, 3)), thread('t2', datetime.date(2021, 6, 2)), thread('t1', datetime.date(2021, 6, 1))]
+        self.assertEqual(3, index.discover(listing))
+        # the oldest day listed may be missing threads
+        self.assertEqual('2021-06-02', index.covered_from)
+        self.assertFalse(index.covers_day(datetime.date(2021, 6, 1)))
+        self.assertTrue(index.covers_day(datetime.date(2021, 6, 2)))
+
+        # stops at the first thread already indexed
+        listing = [thread('t5', datetime.date(2021, 6, 5)), thread('t4', datetime.date(2021, 6, 4))] + listing
+        self.assertEqual(2, index.discover(iter(listing)))
+        self.assertEqual('2021-06-02', index.covered_from)
+        self.assertEqual(['t2', 't3', 't4'], index.threads_for(datetime.date(2021, 6, 2), datetime.date(2021, 6, 4)))
+
+    def test_index_month(self):
+        index = ThreadIndex(self.path)
+        self.assertFalse(index.covers_month(datetime.date(2016, 5, 1)))
+        index.index_month(datetime.date(2016, 5, 1), [thread('a', datetime.date(2016, 5, 31))])
+        self.assertTrue(index.covers_month(datetime.date(2016, 5, 1)))
+        self.assertTrue(index.covers_day(datetime.date(2016, 5, 2)))
+        self.assertFalse(index.covers_day(datetime.date(2016, 6, 2)))
+
+    def test_save_load(self):
+        index = ThreadIndex(self.path)
+        index.discover([thread('t1', datetime.date(2021, 6, 1), 'Lather Games - Day 1')])
+        index.index_month(datetime.date(2016, 5, 1), [])
+        index.save()
+
+        loaded = ThreadIndex(self.path).load()
+        self.assertEqual(index.threads, loaded.threads)
+        self.assertEqual(('2021-06-02', {'2016-05'}), (loaded.covered_from, loaded.months))
+        self.assertEqual('SOTD', loaded.threads['t1']['flair'])
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from unittest import TestCase
+
+from sotd_collator.user_sketch import UserSketch
+
+
+class TestUserSketch(TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # skewed like real posting, a few users shave with a name far more often than most
+        self.user_ids = pd.Series(['u{0}'.format(x) for x in rng.zipf(1.3, 200000) % 120000])
+
+    def test_sparse_exact(self):
+        user_ids = self.user_ids[:300]
+        sketch = UserSketch.from_users(user_ids)
+        self.assertIsNotNone(sketch.hashes)
+        self.assertEqual(user_ids.nunique(), len(sketch))
+
+    def test_missing_users(self):
+        # left out, as nunique leaves them out
+        user_ids = pd.Series(['u1', None, 'u2', float('nan'), 'u1'])
+        self.assertEqual(user_ids.nunique(), len(UserSketch.from_users(user_ids)))
+
+    def test_dense_within_bounds(self):
+        sketch = UserSketch.from_users(self.user_ids)
+        self.assertIsNotNone(sketch.registers)
+        # 3 standard errors
+        self.assertAlmostEqual(1, len(sketch) / self.user_ids.nunique(), delta=3 * 1.04 / np.sqrt(UserSketch.REGISTERS))
+
+    def test_union(self):
+        halves = [self.user_ids[:120000], self.user_ids[80000:]]
+        union = UserSketch.from_users(halves[0]).union(UserSketch.from_users(halves[1]))
+        np.testing.assert_array_equal(UserSketch.from_users(self.user_ids).registers, union.registers)
+
+        # sparse sketches that outgrow SPARSE_LIMIT together go dense
+        parts = [UserSketch.from_users(self.user_ids[x:x + 100]) for x in range(0, 5000, 100)]
+        self.assertEqual(
+            len(UserSketch.from_users(self.user_ids[:5000])), len(UserSketch.union_all(parts)),
+        )
+
+    def test_count_groups(self):
+        groups = np.array([0, 0, 1, 2, 2])
+        sketches = [
+            UserSketch.from_users(self.user_ids[:200]), UserSketch.from_users(self.user_ids[100:300]),
+            UserSketch.from_users(self.user_ids[:50]),
+            UserSketch.from_users(self.user_ids[:100]), UserSketch.from_users(self.user_ids),
+        ]
+        self.assertEqual(
+            [len(UserSketch.union_all(sketches[:2])), len(sketches[2]), len(UserSketch.union_all(sketches[3:]))],
+            list(UserSketch.count_groups(groups, sketches, 3)),
+        )
+        self.assertEqual(self.user_ids[:300].nunique(), UserSketch.count_groups(groups, sketches, 3)[0])
@@ -0,0 +1,101 @@
+import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+import pandas as pd
+
+from sotd_collator.blade_alternate_namer import BladeAlternateNamer
+from sotd_collator.blade_name_extractor import BladeNameExtractor
+from sotd_collator.knot_size_extractor import KnotSizeExtractor
+from sotd_collator.razor_alternate_namer import RazorAlternateNamer
+from sotd_collator.razor_name_extractor import RazorNameExtractor
+from sotd_collator.sotd_post_parser import SotdComment
+from sotd_collator.utils import (
+    _get_entity_usage, _get_principal_or_entity_name, _get_usage_stats, get_entity_shave_data, get_entity_slice,
+    get_rollup_shave_data, get_shave_cells, get_shave_table, get_shaving_histogram, get_sketch_cells,
+)
+
+
+class TestUtils(TestCase):
+
+    def test_usage_stats(self):
+        df = _get_usage_stats(
+            pd.Series(['Karve CB', 'Karve CB', 'Karve CB', 'Gillette Tech', 'None', 'none']),
+            pd.Series(['u1', 'u1', 'u2', 'u3', 'u1', 'u2']),
+        )
+        self.assertEqual(['Gillette Tech', 'Karve CB'], list(df['name']))
+        self.assertEqual([1, 3], list(df['shaves']))
+        self.assertEqual([1, 2], list(df['unique users']))
+        self.assertEqual(['1.00', '1.50'], list(df['avg shaves per user']))
+        self.assertEqual([2.0, 1.0], list(df['rank']))
+
+    def test_usage_stats_empty(self):
+        df = _get_usage_stats(pd.Series([], dtype=object), pd.Series([], dtype=object))
+        self.assertEqual(['name', 'shaves', 'unique users', 'avg shaves per user', 'rank'], list(df.columns))
+        self.assertEqual(0, len(df))
+
+    def test_entity_shave_data(self):
+        comments = [
+            (SotdComment('* **Razor:** Karve CB\n* **Blade:** Astra SP\n* **Brush:** Maggard 24mm synthetic'), 'u1'),
+            (SotdComment('* **Razor:** Karve Christopher Bradley\n* **Blade:** Feather'), 'u2'),
+            (SotdComment('* **Razor:** Gillette Tech\n* **Blade:** Astra Superior Platinum'), 'u1'),
+            (SotdComment('no hardware here'), 'u3'),
+        ]
+        entities = [
+            {'name': 'Razor', 'extractor': RazorNameExtractor(), 'renamer': RazorAlternateNamer()},
+            {'name': 'Blade', 'extractor': BladeNameExtractor(), 'renamer': BladeAlternateNamer()},
+            {'name': 'Knot Size', 'extractor': KnotSizeExtractor(), 'renamer': None},
+        ]
+
+        table = get_shave_table(comments, entities)
+        for column in ['user_id', 'entity_type', 'entity_name', 'principal_name']:
+            self.assertIsInstance(table[column].dtype, pd.CategoricalDtype)
+        self.assertEqual([0, 1, 2], sorted(table.loc[table['entity_type'] == 'Razor', 'comment']))
+
+        # every entity type sliced from the one aggregation matches aggregating it on its own
+        entity_data = get_entity_shave_data(table)
+        for entity in entities:
+            usage = _get_entity_usage(comments, entity['extractor'], entity['renamer'])
+            expected = _get_usage_stats(_get_principal_or_entity_name(usage), usage['user_id']).reset_index(drop=True)
+            pd.testing.assert_frame_equal(expected, get_entity_slice(entity_data, entity['name']), check_dtype=False)
+
+        # encoded the same as aggregating the plain strings
+        names = _get_principal_or_entity_name(table).astype(object)
+        pd.testing.assert_frame_equal(
+            _get_usage_stats(names, table['user_id'].astype(object), table['entity_type'].astype(object)),
+            entity_data, check_dtype=False,
+        )
+
+    def test_shaving_histogram(self):
+        comments = [(None, x) for x in ['u1'] * 40 + ['u2', 'u2', 'u3', 'u4', 'u4', '', None]]
+        locator = SimpleNamespace(get_comments_for_given_month_cached=lambda given_month: comments)
+        df = get_shaving_histogram(datetime.date(2023, 2, 1), locator)
+        # u1's 40 posts count as 28 shaves, the days in the month
+        self.assertEqual([28, 2, 1], list(df['#shaves']))
+        self.assertEqual([1, 2, 1], list(df['number of users who shaved this many times this month']))
+
+    def test_rollup_differing_categories(self):
+        # months encode different users and names, one with no principal names at all
+        entities = [{'name': 'Razor', 'extractor': RazorNameExtractor(), 'renamer': RazorAlternateNamer()}]
+        months = [
+            [(SotdComment('* **Razor:** Karve CB'), 'u1'), (SotdComment('* **Razor:** Gillette Tech'), 'u2')],
+            [(SotdComment('* **Razor:** Some Unknown Razor'), 'u3')],
+            [(SotdComment('* **Razor:** Karve Christopher Bradley'), 'u1')],
+        ]
+        rollup = get_rollup_shave_data([get_shave_cells(get_shave_table(x, entities)) for x in months])
+        expected = get_entity_shave_data(get_shave_table([x for month in months for x in month], entities))
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), rollup.reset_index(drop=True), check_dtype=False)
+        self.assertIsInstance(get_shave_cells(get_shave_table(months[0], entities))['user_id'].dtype, pd.CategoricalDtype)
+
+    def test_sketch_cells_skip_missing_users(self):
+        # comments with no known author count as shaves but not users, sketched or not
+        entities = [{'name': 'Razor', 'extractor': RazorNameExtractor(), 'renamer': None}]
+        comments = [
+            (SotdComment('* **Razor:** Karve CB'), 'u1'), (SotdComment('* **Razor:** Karve CB'), None),
+            (SotdComment('* **Razor:** Gillette Tech'), None),
+        ]
+        cells = get_shave_cells(get_shave_table(comments, entities))
+        exact = get_rollup_shave_data([cells])
+        sketched = get_rollup_shave_data([get_sketch_cells(cells)])
+        pd.testing.assert_frame_equal(exact, sketched, check_dtype=False)
+        self.assertEqual([0, 1], exact['unique users'].tolist())
@@ -0,0 +1,34 @@
+import argparse
+import datetime
+
+import praw
+
+from sotd_collator.sotd_post_locator import SotdPostLocator
+
+"""
+Check cached months have a SOTD thread for every day, and optionally fetch just the missing days
+
+    python -m sotd_collator.thread_audit 2021-06 2021-07 --fill
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Audit the SOTD threads cached for each month')
+    parser.add_argument('months', nargs='+', help='months to audit, as YYYY-MM')
+    parser.add_argument('--fill', action='store_true', help='search for the missing days and cache what turns up')
+    args = parser.parse_args()
+
+    pl = SotdPostLocator(praw.Reddit('standard_creds', user_agent='arach'))
+    for month in args.months:
+        given_month = datetime.datetime.strptime(month, '%Y-%m').date()
+        audit = pl.fill_month_gaps(given_month) if args.fill else pl.audit_month(given_month)
+
+        print('{0}: {1} missing, {2} duplicated'.format(month, len(audit['missing']), len(audit['duplicates'])))
+        for missing_day in audit['missing']:
+            print('  missing {0}'.format(missing_day))
+        for day, thread_ids in audit['duplicates'].items():
+            print('  {0} has {1}'.format(day, ', '.join(thread_ids)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import datetime
+import json
+import os
+
+from sotd_collator.comment_store import CommentChain, StoredComments
+
+
+class ThreadCache(object):
+    """
+    Comments cached per thread rather than per query, so a thread is only ever fetched once whether it was asked for
+    by day, month or year. Each thread is a comment store under comments/threads/<thread id>, with the high water
+    mark to carry on fetching it from in its meta.
+
+    Days and months are views - small json indexes of the threads they cover, with each thread's title and day -
+    under comments/days/YYYY-MM-DD.json and comments/months/YYYY-MM.json. A view is complete once its day or month
+    is over, from then on it is served without asking reddit anything
+    """
+
+    def __init__(self, cache_dir):
+        self.root = os.path.join(cache_dir, 'comments')
+
+    def _thread_path(self, thread_id):
+        return os.path.join(self.root, 'threads', thread_id)
+
+    def get_thread(self, thread_id):
+        path = self._thread_path(thread_id)
+        return StoredComments(path) if StoredComments.exists(path) else None
+
+    def put_thread(self, thread_id, records, mark):
+        # mark - {'num_comments'} as of the fetch records came from, a thread with more is fetched again
+        path = self._thread_path(thread_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return StoredComments.write(path, records, {'mark': mark})
+
+    def comments(self, thread_ids):
+        # threads that never loaded have nothing stored and are skipped
+        return CommentChain(x for x in (self.get_thread(y) for y in thread_ids) if x is not None)
+
+    def _view_path(self, kind, key):
+        return os.path.join(self.root, kind, '{0}.json'.format(key))
+
+    def get_view(self, kind, key):
+        """
+        The view of kind ('days' or 'months') for key, {'threads': {thread id: {'title', 'day'}}, 'complete',
+        'updated'}, or None where there isnt one yet
+        """
+        try:
+            with open(self._view_path(kind, key)) as f_view:
+                return json.load(f_view)
+        except FileNotFoundError:
+            return None
+
+    def put_view(self, kind, key, threads, complete):
+        path = self._view_path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        view = {'threads': threads, 'complete': complete, 'updated': datetime.date.today().isoformat()}
+
+        # written alongside then swapped in, a half written view would read as no threads at all
+        with open(path + '.tmp', 'w') as f_view:
+            json.dump(view, f_view)
+        os.replace(path + '.tmp', path)
+        return view
+
+    def get_day_threads(self, given_day):
+        """
+        The threads for given_day from whichever view covers it, or None if none does yet. A month still in progress
+        covers the days that were already over when it was last updated
+        """
+        month_view = self.get_view('months', given_day.strftime('%Y-%m'))
+        if month_view and (month_view['complete'] or given_day.isoformat() < month_view['updated']):
+            return {k: v for k, v in month_view['threads'].items() if v['day'] == given_day.isoformat()}
+
+        day_view = self.get_view('days', given_day.isoformat())
+        if day_view and day_view['complete']:
+            return day_view['threads']
+
+        return None
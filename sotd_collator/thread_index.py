@@ -0,0 +1,103 @@
+import datetime
+import json
+import os
+
+
+class ThreadIndex(object):
+    """
+    Disk backed index of every SOTD flaired thread seen - id -> title, flair, day and created_utc - so finding a day
+    or month's threads is a lookup rather than a reddit search.
+
+    New threads are discovered newest first until one already indexed turns up, which is usually a single request.
+    Reddit listings stop at around 1000 results, so discovery only vouches for the days from covered_from on. Months
+    before that are indexed whole by a month search, once, and remembered in months
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.threads = {}
+        self.covered_from = None
+        self.months = set()
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.threads)
+
+    def load(self):
+        try:
+            with open(self.path) as f_index:
+                stored = json.load(f_index)
+        except FileNotFoundError:
+            return self
+
+        self.threads = stored['threads']
+        self.covered_from = stored['covered_from']
+        self.months = set(stored['months'])
+        return self
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f_index:
+            json.dump({
+                'threads': self.threads,
+                'covered_from': self.covered_from,
+                'months': sorted(self.months),
+            }, f_index)
+        os.replace(self.path + '.tmp', self.path)
+        self._dirty = False
+
+    def add(self, thread):
+        self.threads[thread.id] = {
+            'title': thread.title,
+            'flair': thread.link_flair_text,
+            'day': datetime.datetime.utcfromtimestamp(thread.created_utc).date().isoformat(),
+            'created_utc': thread.created_utc,
+        }
+        self._dirty = True
+
+    def discover(self, newest_first):
+        """
+        Index threads from a newest first listing until reaching one already indexed. Returns how many were new
+        """
+        added = 0
+        oldest_day = None
+        for thread in newest_first:
+            if thread.id in self.threads:
+                return added
+            self.add(thread)
+            added += 1
+            oldest_day = self.threads[thread.id]['day']
+
+        if oldest_day is not None:
+            # ran out of listing before reaching anything indexed - the oldest day listed may be missing threads,
+            # and anything between it and what was indexed before certainly is
+            self.covered_from = (datetime.date.fromisoformat(oldest_day) + datetime.timedelta(days=1)).isoformat()
+            self._dirty = True
+        return added
+
+    def index_month(self, given_month, threads):
+        # every thread of a month, from a month search
+        for thread in threads:
+            self.add(thread)
+        self.months.add(given_month.strftime('%Y-%m'))
+        self._dirty = True
+
+    def covers_month(self, given_month):
+        return given_month.strftime('%Y-%m') in self.months or (
+            self.covered_from is not None and given_month.replace(day=1).isoformat() >= self.covered_from
+        )
+
+    def covers_day(self, given_day):
+        return given_day.strftime('%Y-%m') in self.months or (
+            self.covered_from is not None and given_day.isoformat() >= self.covered_from
+        )
+
+    def threads_for(self, first_day, last_day):
+        # ids of the threads posted first_day to last_day inclusive, oldest first
+        first_day, last_day = first_day.isoformat(), last_day.isoformat()
+        return sorted(
+            (k for k, v in self.threads.items() if first_day <= v['day'] <= last_day),
+            key=lambda x: self.threads[x]['created_utc'],
+        )
@@ -9,6 +9,8 @@ c = Cache(directory='/tmp')
 class TtsScraper(object):
 
     ssl._create_default_https_context = ssl._create_unverified_context
+    # swap for reddit_transport's recording_urlopen or a backend's urlopen to record / run offline
+    urlopen = staticmethod(urllib.request.urlopen)
 
     MANUAL_ADDITIONS = [
         'arko',
@@ -40,7 +42,7 @@ class TtsScraper(object):
 
             return name
 
-        with urllib.request.urlopen('https://trythatsoap.com/soap/#!') as response:
+        with cls.urlopen('https://trythatsoap.com/soap/#!') as response:
             html = response.read()
             soaps = re.findall(r'>([^<>]+) - (?:Soap|Cream|Soap \(Vegan\)|Soap \(LE\))</div', html.decode('utf-8'))
             soaps.extend(cls.MANUAL_ADDITIONS)
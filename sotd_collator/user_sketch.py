@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+
+class UserSketch(object):
+    """
+    Mergeable count of distinct users - a HyperLogLog sketch, so a name's users over months or years is the union of
+    its monthly sketches rather than a rescan of every comment.
+
+    Small sets (up to SPARSE_LIMIT users, most names in most months) are kept as the users' 64 bit hashes and counted
+    exactly, barring hash collisions (around 1 in 10^10 for a few hundred thousand users). Past that the sketch is
+    2^PRECISION one byte registers, 4KB, with a relative standard error of 1.04 / sqrt(2^PRECISION) - 1.6%, so 95%
+    of counts land within 3.3% of the true count and practically all within 5%. Unions are exact - the union of two
+    sketches is the sketch of the union - so a union of sparse sketches stays exact until it outgrows SPARSE_LIMIT and
+    goes dense like any other sketch. count_groups alone counts all sparse groups exactly, however many users they have
+    """
+
+    PRECISION = 12
+    REGISTERS = 1 << PRECISION
+    SPARSE_LIMIT = REGISTERS // 8
+
+    def __init__(self, hashes=None, registers=None):
+        # exactly one of - sorted unique hashes (sparse), registers (dense)
+        self.hashes = hashes
+        self.registers = registers
+
+    @staticmethod
+    def hash_users(user_ids):
+        # stable across runs and processes, unlike hash(). one hash per id, missing ones included - see from_users
+        return pd.util.hash_array(np.asarray(user_ids, dtype=object))
+
+    @classmethod
+    def from_hashes(cls, hashes):
+        hashes = np.unique(np.asarray(hashes, dtype=np.uint64))
+        if len(hashes) <= cls.SPARSE_LIMIT:
+            return cls(hashes=hashes)
+        return cls(registers=cls._registers(hashes))
+
+    @classmethod
+    def from_users(cls, user_ids):
+        # missing users (None / NaN) arent counted, as nunique leaves them out
+        user_ids = pd.Series(user_ids, dtype=object)
+        return cls.from_hashes(cls.hash_users(user_ids[user_ids.notna()]))
+
+    @classmethod
+    def _registers(cls, hashes):
+        # top PRECISION bits pick the register, which keeps the longest run of leading zeros (+1) of the rest
+        index = (hashes >> np.uint64(64 - cls.PRECISION)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - cls.PRECISION)) - 1)
+        # rest fits a float exactly, so frexp's exponent is its bit length
+        rank = (64 - cls.PRECISION) - np.frexp(rest.astype(np.float64))[1] + 1
+
+        registers = np.zeros(cls.REGISTERS, dtype=np.uint8)
+        np.maximum.at(registers, index, rank.astype(np.uint8))
+        return registers
+
+    def _dense(self):
+        return self.registers if self.registers is not None else self._registers(self.hashes)
+
+    def union(self, other):
+        if self.hashes is not None and other.hashes is not None:
+            return self.from_hashes(np.union1d(self.hashes, other.hashes))
+        return UserSketch(registers=np.maximum(self._dense(), other._dense()))
+
+    @classmethod
+    def union_all(cls, sketches):
+        sketches = list(sketches)
+        if len(sketches) == 1:
+            return sketches[0]
+        if all(x.hashes is not None for x in sketches):
+            return cls.from_hashes(np.concatenate([x.hashes for x in sketches]))
+        return cls(registers=np.maximum.reduce([x._dense() for x in sketches]))
+
+    @classmethod
+    def count_groups(cls, groups, sketches, n_groups):
+        """
+        Distinct users of each group's union of sketches, groups numbered 0 to n_groups - 1. The same as union_all
+        per group, but groups that are all sparse - nearly all of them - are counted in one go rather than one by one
+        """
+        groups = np.asarray(groups)
+        sparse = np.array([x.hashes is not None for x in sketches], dtype=bool)
+        counts = np.zeros(n_groups, dtype=np.int64)
+
+        sparse_sketches = [x for x, y in zip(sketches, sparse) if y]
+        if sparse_sketches:
+            hashes = pd.DataFrame({
+                'group': np.repeat(groups[sparse], [len(x.hashes) for x in sparse_sketches]),
+                'hash': np.concatenate([x.hashes for x in sparse_sketches]),
+            })
+            sparse_counts = hashes.groupby('group')['hash'].nunique()
+            counts[sparse_counts.index.to_numpy()] = sparse_counts.to_numpy()
+
+        for group in np.unique(groups[~sparse]):
+            counts[group] = len(cls.union_all(x for x, y in zip(sketches, groups) if y == group))
+        return counts
+
+    def __len__(self):
+        if self.hashes is not None:
+            return len(self.hashes)
+
+        m = self.REGISTERS
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros:
+            # small range correction, linear counting
+            estimate = m * np.log(m / zeros)
+        # 64 bit hashes, no large range correction needed
+        return int(round(estimate))
@@ -1,113 +1,293 @@
 # shared functions and the like
+from array import array
+
+import numpy as np
 import pandas as pd
 from calendar import monthrange
+from pandas.api.types import union_categoricals
 
+from sotd_collator.user_sketch import UserSketch
 
-def get_shave_data_for_month(given_month, post_locator, name_extractor, alternate_namer, name_fallback=True):
-    # pull comments and user ids from reddit, generate per-entity dataframe with shaves, unique users
-    raw_usage = {'name': [], 'user_id': []}
 
-    for comment, user_id in post_locator.get_comments_for_given_month_cached(given_month):
-        entity_name = name_extractor.get_name(comment)
-        if entity_name is not None:
-            principal_name = None
-            if alternate_namer:
-                principal_name = alternate_namer.get_principal_name(entity_name)
-            if not principal_name:
-                if not name_fallback:
-                    # skip this one if we dont want to fall back to the base entity name
-                    continue
-                else:
-                    # no renamer or no principal name found, so avoid nulls and use raw entity name
-                    principal_name = entity_name
-
-            raw_usage['name'].append(principal_name)
-            raw_usage['user_id'].append(user_id)
+def _intern(codes, value):
+    # value's integer code, adding it to codes the first time it is seen. None is missing, -1
+    return -1 if value is None else codes.setdefault(value, len(codes))
 
-    df = pd.DataFrame(raw_usage)
-    df = df.groupby('name').agg({"user_id": ['count', 'nunique']}).reset_index()
-    df.columns = ['name', 'shaves', 'unique users']
-    df = df[df.apply(lambda x: x['name'].lower() != 'none', axis=1)]
-    df.loc[:, 'avg shaves per user'] = df.apply(lambda x: '{0:.2f}'.format(x['shaves'] / x['unique users']), axis=1)
-    df.loc[:, 'rank'] = df['shaves'].rank(method='dense', ascending=False)
+
+def _categorical(codes, categories):
+    # dictionary encoded column from the codes and distinct values interned while collecting rows. categories are
+    # sorted so groupby orders them as it would the strings themselves
+    categories = np.asarray(list(categories), dtype=object)
+    order = np.argsort(categories, kind='stable')
+    remap = np.full(len(order) + 1, -1, dtype=np.int32)
+    remap[order] = np.arange(len(order))
+    # -1 (missing) picks up the trailing -1
+    return pd.Categorical.from_codes(remap[np.asarray(codes, dtype=np.intp)], pd.Index(categories[order], dtype=object))
+
+
+def _get_principal_codes(entity_names, alternate_namer, principal_codes):
+    # principal name codes for a dictionary encoded column of entity names, resolving each distinct name once and
+    # interning what it resolves to in principal_codes. no principal name found is missing
+    codes = entity_names.cat.codes.to_numpy()
+    distinct = np.unique(codes)
+    resolved = alternate_namer.get_principal_names(list(entity_names.cat.categories[distinct]))
+    lookup = np.full(len(entity_names.cat.categories), -1, dtype=np.intp)
+    lookup[distinct] = [_intern(principal_codes, x or None) for x in resolved]
+    return lookup[codes]
+
+
+def _decode_keys(df, keys):
+    # categorical group keys back to plain columns, the results are small and get merged and printed
+    for key in keys:
+        if isinstance(df[key].dtype, pd.CategoricalDtype):
+            df[key] = df[key].astype(df[key].cat.categories.dtype)
     return df
 
-def get_shave_data_for_year(given_year, post_locator, name_extractor, alternate_namer):
-    # pull comments and user ids from reddit, generate per-entity dataframe with shaves, unique users
-    raw_usage = {'name': [], 'user_id': []}
 
-    for comment, user_id in post_locator.get_comments_for_given_year_cached(given_year):
+def _concat_cells(cells):
+    # pd.concat falls back to object columns where categories differ, union them instead to stay encoded
+    df = pd.concat(cells, ignore_index=True)
+    for column in df.columns:
+        if all(isinstance(x[column].dtype, pd.CategoricalDtype) for x in cells) and df[column].dtype == object:
+            df[column] = union_categoricals([x[column] for x in cells], sort_categories=True)
+    return df
+
+
+def _get_entity_usage(comments, name_extractor, alternate_namer):
+    # extract the entity name from every comment, then resolve each distinct name to its principal name once
+    # rather than once per comment. names and user ids are dictionary encoded as they are collected
+    names, users = {}, {}
+    name_codes, user_codes = array('q'), array('q')
+    for comment, user_id in comments:
         entity_name = name_extractor.get_name(comment)
         if entity_name is not None:
-            principal_name = None
-            if alternate_namer:
-                principal_name = alternate_namer.get_principal_name(entity_name)
-            if not principal_name:
-                # no renamer or no principal name found, so avoid nulls and use raw entity name
-                principal_name = entity_name
+            name_codes.append(names.setdefault(entity_name, len(names)))
+            user_codes.append(_intern(users, user_id))
 
-            raw_usage['name'].append(principal_name)
-            raw_usage['user_id'].append(user_id)
+    usage = pd.DataFrame({
+        'entity_name': _categorical(np.frombuffer(name_codes, dtype=np.int64), names),
+        'user_id': _categorical(np.frombuffer(user_codes, dtype=np.int64), users),
+    })
 
-    df = pd.DataFrame(raw_usage)
-    df = df.groupby('name').agg({"user_id": ['count', 'nunique']}).reset_index()
-    df.columns = ['name', 'shaves', 'unique users']
-    df = df[df.apply(lambda x: x['name'].lower() != 'none', axis=1)]
-    df.loc[:, 'avg shaves per user'] = df.apply(lambda x: '{0:.2f}'.format(x['shaves'] / x['unique users']), axis=1)
-    df.loc[:, 'rank'] = df['shaves'].rank(method='dense', ascending=False)
+    principal_names = {}
+    principal_codes = np.full(len(usage), -1, dtype=np.intp)
+    if alternate_namer:
+        principal_codes = _get_principal_codes(usage['entity_name'], alternate_namer, principal_names)
+    usage['principal_name'] = _categorical(principal_codes, principal_names)
+
+    # no renamer or no principal name found
+    usage['unlinked'] = usage['principal_name'].isna()
+    return usage
+
+
+def _get_principal_or_entity_name(usage):
+    # avoid nulls and use the raw entity name wherever there is no principal name
+    principal_names, entity_names = usage['principal_name'], usage['entity_name']
+    if not all(isinstance(x.dtype, pd.CategoricalDtype) for x in [principal_names, entity_names]):
+        return principal_names.where(~usage['unlinked'], entity_names)
+
+    # picked between on codes, recoded to one set of categories for both, so the result stays encoded
+    categories = entity_names.cat.categories.union(principal_names.cat.categories)
+
+    def _recode(names):
+        # -1 (missing) picks up the trailing -1
+        lookup = np.append(categories.get_indexer(names.cat.categories), -1)
+        return lookup[names.cat.codes.to_numpy()]
+
+    codes = np.where(usage['unlinked'].to_numpy(), _recode(entity_names), _recode(principal_names))
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=usage.index)
+
+
+def _get_usage_stats(names, user_ids, entity_types=None):
+    # shaves, unique users, avg shaves per user and rank per name - the table every shave data function reports.
+    # given entity types, per entity type and name in one aggregation, ranked within each entity type
+    df = pd.DataFrame({'name': names, 'user_id': user_ids})
+    keys = ['name']
+    if entity_types is not None:
+        df.insert(0, 'entity_type', entity_types)
+        keys = ['entity_type', 'name']
+
+    df = df.groupby(keys, observed=True).agg({"user_id": ['count', 'nunique']}).reset_index()
+    df.columns = keys + ['shaves', 'unique users']
+    df = _decode_keys(df, keys)
+    return _add_usage_ratios(df)
+
+
+def _add_usage_ratios(df):
+    # drop none names, add avg shaves per user and rank (within each entity type where there is one) to shaves and
+    # unique users per name
+    df = df[df['name'].str.lower() != 'none']
+    # formatted all at once by numpy rather than row by row
+    df.loc[:, 'avg shaves per user'] = np.char.mod('%.2f', (df['shaves'] / df['unique users']).to_numpy(dtype=float))
+    shaves = df.groupby('entity_type')['shaves'] if 'entity_type' in df.columns else df['shaves']
+    df.loc[:, 'rank'] = shaves.rank(method='dense', ascending=False)
     return df
 
 
+def get_shave_table(comments, entities):
+    """
+    Long format table of every entity named in comments, in a single pass over them - one row per comment and entity
+    type it names: comment (its position in comments), user_id, entity_type, entity_name, principal_name, unlinked.
+    user_id, entity_type and the names are categoricals - integer codes into their distinct values.
+    entities - dicts of name (the entity type), extractor and renamer, as the runners list them
+    """
+    # user ids, entity types and names are dictionary encoded as they are collected - a year names the same few
+    # thousand users and products hundreds of thousands of times. codes go in typed arrays, not tuples of ints
+    entity_types = {x['name']: i for i, x in enumerate(entities)}
+    names, users = {}, {}
+    rows = {x: array('q') for x in ['comment', 'user_id', 'entity_type', 'entity_name']}
+    for i, (comment, user_id) in enumerate(comments):
+        user_code = _intern(users, user_id)
+        for entity in entities:
+            entity_name = entity['extractor'].get_name(comment)
+            if entity_name is not None:
+                rows['comment'].append(i)
+                rows['user_id'].append(user_code)
+                rows['entity_type'].append(entity_types[entity['name']])
+                rows['entity_name'].append(names.setdefault(entity_name, len(names)))
+
+    table = pd.DataFrame({
+        'comment': np.frombuffer(rows['comment'], dtype=np.int64).astype(np.int32),
+        'user_id': _categorical(np.frombuffer(rows['user_id'], dtype=np.int64), users),
+        'entity_type': _categorical(np.frombuffer(rows['entity_type'], dtype=np.int64), entity_types),
+        'entity_name': _categorical(np.frombuffer(rows['entity_name'], dtype=np.int64), names),
+    })
+
+    principal_names = {}
+    principal_codes = np.full(len(table), -1, dtype=np.intp)
+    for entity in entities:
+        if entity['renamer']:
+            of_type = (table['entity_type'] == entity['name']).to_numpy()
+            principal_codes[of_type] = _get_principal_codes(
+                table.loc[of_type, 'entity_name'], entity['renamer'], principal_names,
+            )
+    table['principal_name'] = _categorical(principal_codes, principal_names)
+
+    # no renamer or no principal name found
+    table['unlinked'] = table['principal_name'].isna()
+    return table
+
+
+def get_entity_shave_data(table, name_fallback=True):
+    # shaves, unique users etc for every entity type in a shave table at once. slice out one with get_entity_slice
+    if not name_fallback:
+        table = table[~table['unlinked']]
+    return _get_usage_stats(_get_principal_or_entity_name(table), table['user_id'], table['entity_type'])
+
+
+def get_shave_cells(table):
+    # a shave table boiled down to shaves per entity type, name and user - small, and still enough to work out unique
+    # users across any number of them
+    cells = table.assign(name=_get_principal_or_entity_name(table)).groupby(
+        ['entity_type', 'name', 'unlinked', 'user_id'], dropna=False, observed=True,
+    ).size().reset_index()
+    cells.columns = ['entity_type', 'name', 'unlinked', 'user_id', 'shaves']
+    return cells
+
+
+def get_sketch_cells(cells):
+    # shave cells with each name's users folded into a UserSketch - one row per entity type and name rather than per
+    # user, at the cost of approximate unique users for names with many of them
+    grouped = cells.groupby(['entity_type', 'name', 'unlinked'], dropna=False, observed=True)
+    df = grouped['shaves'].sum().reset_index()
+
+    # missing users arent counted, as in the exact cells' nunique - a name only they shaved with gets an empty sketch
+    known = cells['user_id'].notna().to_numpy()
+    hashes = pd.Series(UserSketch.hash_users(cells['user_id'][known]))
+    sketches = hashes.groupby(grouped.ngroup().to_numpy()[known]).agg(UserSketch.from_hashes)
+    empty = UserSketch.from_hashes([])
+    df['users'] = [sketches.get(i, empty) for i in range(len(df))]
+    return df
+
+
+def get_rollup_shave_data(cells, name_fallback=True):
+    # get_entity_shave_data from the shave cells, or sketch cells, of any number of periods, eg the months of a year
+    cells = _concat_cells(cells)
+    if not name_fallback:
+        cells = cells[~cells['unlinked']]
+    grouped = cells.groupby(['entity_type', 'name'], observed=True)
+    if 'users' in cells.columns:
+        df = grouped['shaves'].sum().reset_index()
+        df['users'] = UserSketch.count_groups(grouped.ngroup().to_numpy(), cells['users'].to_numpy(), len(df))
+    else:
+        df = grouped.agg({'shaves': 'sum', 'user_id': 'nunique'}).reset_index()
+    df.columns = ['entity_type', 'name', 'shaves', 'unique users']
+    df = _decode_keys(df, ['entity_type', 'name'])
+    return _add_usage_ratios(df)
+
+
+def get_entity_slice(entity_data, entity_type):
+    # one entity type's rows of get_entity_shave_data, as get_shave_data_for_month would give them
+    return entity_data[entity_data['entity_type'] == entity_type].drop('entity_type', axis=1).reset_index(drop=True)
+
+
+def get_entity_shave_data_for_month(given_month, post_locator, entities, name_fallback=True):
+    table = get_shave_table(post_locator.get_comments_for_given_month_cached(given_month), entities)
+    return get_entity_shave_data(table, name_fallback)
+
+
+def get_entity_shave_data_for_year(given_year, post_locator, entities):
+    return get_entity_shave_data(get_shave_table(post_locator.get_comments_for_given_year_cached(given_year), entities))
+
+
+def get_shave_data_for_month(given_month, post_locator, name_extractor, alternate_namer, name_fallback=True):
+    # pull comments and user ids from reddit, generate per-entity dataframe with shaves, unique users
+    usage = _get_entity_usage(
+        post_locator.get_comments_for_given_month_cached(given_month), name_extractor, alternate_namer
+    )
+    if not name_fallback:
+        # skip these if we dont want to fall back to the base entity name
+        usage = usage[~usage['unlinked']]
+
+    return _get_usage_stats(_get_principal_or_entity_name(usage), usage['user_id'])
+
+def get_shave_data_for_year(given_year, post_locator, name_extractor, alternate_namer):
+    # pull comments and user ids from reddit, generate per-entity dataframe with shaves, unique users
+    usage = _get_entity_usage(
+        post_locator.get_comments_for_given_year_cached(given_year), name_extractor, alternate_namer
+    )
+    return _get_usage_stats(_get_principal_or_entity_name(usage), usage['user_id'])
+
+
+def get_shave_data_for_range(start, end, post_locator, name_extractor, alternate_namer):
+    # as for a month or year, over any span of days. comments are streamed from the cache rather than pulled in whole
+    usage = _get_entity_usage(
+        ((x.body, x.author) for x in post_locator.iter_comments(start, end)), name_extractor, alternate_namer
+    )
+    return _get_usage_stats(_get_principal_or_entity_name(usage), usage['user_id'])
+
+
 def get_shaving_histogram(given_month, post_locator):
     # pull comments and user ids from reddit, generate per-entity dataframe with shaves, unique users
     # note this is not 100% accurate - if a user posts twice in the same sotd thread we cant prevent double counting that
-    raw_usage = {'user_id': []}
-
-    def _enforce_max_shaves(shaves):
-        # because we can over count if people post twice in a given thread, limit max shaves to num days in month
-        days_in_month = monthrange(given_month.year, given_month.month)[1]
-        if shaves > days_in_month:
-            shaves = days_in_month
-        return shaves
+    users = {}
+    user_codes = [
+        _intern(users, user_id) for comment, user_id in post_locator.get_comments_for_given_month_cached(given_month)
+        if user_id
+    ]
 
-    for comment, user_id in post_locator.get_comments_for_given_month_cached(given_month):
-        users_for_day = set()
-        if user_id:
-            users_for_day.add(user_id)
-        raw_usage['user_id'].extend(list(users_for_day))
+    # shaves per user, counted over their codes. because we can over count if people post twice in a given thread,
+    # limit max shaves to num days in month
+    shaves = np.bincount(np.asarray(user_codes, dtype=np.intp), minlength=len(users))
+    shaves = np.minimum(shaves, monthrange(given_month.year, given_month.month)[1])
 
-    df = pd.DataFrame(raw_usage)
-    df = df.groupby('user_id').size().reset_index()
-    df.columns = ['user_id', 'shaves']
-    df.loc[:, 'shaves'] = df['shaves'].apply(_enforce_max_shaves)
-    df = df.groupby(['shaves']).agg({'user_id': 'nunique'}).reset_index()
+    df = pd.Series(shaves).value_counts().reset_index()
     df.columns = ['#shaves', 'number of users who shaved this many times this month']
     df.sort_values(['#shaves'], ascending=False, inplace=True)
     return df
 
 def get_entity_histogram(given_month, post_locator, name_extractor, alternate_namer, entity_title):
     # get number of users who used 1, 2, 3, n razors / brushes / etc per month
-    raw_usage = {'name': [], 'user_id': []}
     entity_title = '#' + entity_title
 
-    for comment, user_id in post_locator.get_comments_for_given_month_cached(given_month):
-        entity_name = name_extractor.get_name(comment)
-        if not user_id:
-            continue
-
-        if entity_name is not None:
-            principal_name = None
-            if alternate_namer:
-                principal_name = alternate_namer.get_principal_name(entity_name)
-            if not principal_name:
-                # no renamer or no principal name found, so avoid nulls and use raw entity name
-                principal_name = entity_name
-
-            raw_usage['name'].append(principal_name)
-            raw_usage['user_id'].append(user_id)
+    usage = _get_entity_usage(
+        post_locator.get_comments_for_given_month_cached(given_month), name_extractor, alternate_namer
+    )
+    usage = usage[usage['user_id'].notnull() & (usage['user_id'] != '')]
+    raw_usage = {'name': _get_principal_or_entity_name(usage), 'user_id': usage['user_id']}
 
     df = pd.DataFrame(raw_usage)
-    df = df.groupby('user_id').agg({'name': 'nunique'}).reset_index()
+    df = df.groupby('user_id', observed=True).agg({'name': 'nunique'}).reset_index()
     df.columns = ['user_id', entity_title]
     df = df.groupby([entity_title]).agg({'user_id': 'nunique'}).reset_index()
     df.columns = [entity_title, 'number of users who used this many {0} this month'.format(entity_title[1:].lower())]
@@ -147,24 +327,8 @@ def add_ranking_delta(df_curr, df_prev, historic_name):
 
 def get_unlinked_entity_data_for_month(given_month, post_locator, name_extractor, alternate_namer):
     # all the cases where we cant match a razor / brush / etc as posted by the user
-    raw_unlinked = {'name': [], 'user_id': []}
-
-    for comment, user_id in post_locator.get_comments_for_given_month_cached(given_month):
-        entity_name = name_extractor.get_name(comment)
-        if entity_name is not None:
-            principal_name = None
-            if alternate_namer:
-                principal_name = alternate_namer.get_principal_name(entity_name)
-            if not principal_name:
-
-
-                raw_unlinked['name'].append(entity_name)
-                raw_unlinked['user_id'].append(user_id)
-
-    df = pd.DataFrame(raw_unlinked)
-    df = df.groupby('name').agg({"user_id": ['count', 'nunique']}).reset_index()
-    df.columns = ['name', 'shaves', 'unique users']
-    df = df[df.apply(lambda x: x['name'].lower() != 'none', axis=1)]
-    df.loc[:, 'avg shaves per user'] = df.apply(lambda x: '{0:.2f}'.format(x['shaves'] / x['unique users']), axis=1)
-    df.loc[:, 'rank'] = df['shaves'].rank(method='dense', ascending=False)
-    return df
+    usage = _get_entity_usage(
+        post_locator.get_comments_for_given_month_cached(given_month), name_extractor, alternate_namer
+    )
+    usage = usage[usage['unlinked']]
+    return _get_usage_stats(usage['entity_name'], usage['user_id'])
@@ -3,6 +3,9 @@ import pandas as pd
 
 import praw
 
+from sotd_collator.aggregate_cube import AggregateCube
+from sotd_collator.base_alternate_namer import BaseAlternateNamer
+from sotd_collator.base_name_extractor import BaseNameExtractor
 from sotd_collator.blade_alternate_namer import BladeAlternateNamer
 from sotd_collator.blade_format_extractor import BladeFormatExtractor
 from sotd_collator.blade_name_extractor import BladeNameExtractor
@@ -16,12 +19,20 @@ from sotd_collator.razor_alternate_namer import RazorAlternateNamer
 from sotd_collator.razor_plus_blade_alternate_namer import RazorPlusBladeAlternateNamer
 from sotd_collator.razor_plus_blade_name_extractor import RazorPlusBladeNameExtractor
 from sotd_collator.sotd_post_locator import SotdPostLocator
-from sotd_collator.utils import add_ranking_delta, get_shave_data_for_year
+from sotd_collator.utils import add_ranking_delta, get_entity_slice
 
 pr = praw.Reddit('standard_creds', user_agent='arach')
 pl = SotdPostLocator(pr)
 inf_engine = inflect.engine()
 
+# remember raw name -> principal name resolutions between runs, only names touched by namer edits get re-resolved
+for namer_class in (RazorAlternateNamer, BladeAlternateNamer, BrushAlternateNamer):
+    namer_class.use_resolution_store()
+
+# remember what the detect regexps pull out of each comment between runs, so tuning the namers skips re-extraction
+for extractor_class in (RazorNameExtractor, BladeNameExtractor, BrushNameExtractor, KnotSizeExtractor, KarvePlateExtractor):
+    extractor_class.use_extraction_store()
+
 # only report entities with >= this many shaves
 MIN_SHAVES = 50
 MAX_ENTITIES = 50
@@ -71,9 +82,20 @@ previous_year = stats_year - 1
 
 
 
+# every entity type, razor plus blade included, aggregated together - one pass over each year's comments
+razor_plus_blade = {
+    'name': 'Razor Plus Blade',
+    'extractor': RazorPlusBladeNameExtractor(),
+    'renamer': RazorPlusBladeAlternateNamer(),
+}
+# a year is a rollup of its months' cells, months unchanged since they were last aggregated arent extracted again
+cube = AggregateCube(pl, process_entities + [razor_plus_blade])
+usage_by_entity = cube.get_year(stats_year)
+py_usage_by_entity = cube.get_year(previous_year)
+
 for entity in process_entities:
-    usage = get_shave_data_for_year(stats_year, pl, entity['extractor'], entity['renamer'])
-    py_usage = get_shave_data_for_year(previous_year, pl, entity['extractor'], entity['renamer'])
+    usage = get_entity_slice(usage_by_entity, entity['name'])
+    py_usage = get_entity_slice(py_usage_by_entity, entity['name'])
 
     usage = add_ranking_delta(usage, py_usage, previous_year)
     usage.drop('rank', inplace=True, axis=1)
@@ -97,8 +119,8 @@ for entity in process_entities:
 print('## Most Used Blades in Most Used Razors\n')
 
 # do razor plus blade combo, filtered on most popular razors...
-razor_usage = get_shave_data_for_year(stats_year, pl, RazorNameExtractor(), RazorAlternateNamer())
-rpb_usage = get_shave_data_for_year(stats_year, pl, RazorPlusBladeNameExtractor(), RazorPlusBladeAlternateNamer())
+razor_usage = get_entity_slice(usage_by_entity, 'Razor')
+rpb_usage = get_entity_slice(usage_by_entity, 'Razor Plus Blade')
 razor_usage.sort_values(['shaves', 'unique users'], ascending=False, inplace=True)
 
 # get most popular razors in use this year
@@ -121,7 +143,5 @@ rpb_usage = rpb_usage.where(rpb_usage['shaves'] >= MIN_SHAVES).where(rpb_usage['
 print(rpb_usage.to_markdown(index=False))
 print('\n')
 
-
-
-
-
+BaseAlternateNamer.save_resolution_stores()
+BaseNameExtractor.save_extraction_stores()